@@ -10,5 +10,91 @@ FIASP_URL = "https://servizi.fiaspitalia.it/www_eventi.php"
 REQUEST_DELAY = 1  # secondi tra richieste
 REQUEST_TIMEOUT = 10  # timeout in secondi
 
+# Scraper plugins
+# Ogni voce è "modulo:Classe"; altri plugin possono registrarsi tramite
+# l'entry point SCRAPER_ENTRY_POINT_GROUP o la variabile d'ambiente TAPASCIATE_SCRAPERS.
+SCRAPER_PLUGINS = [
+    "scraper.scrapers.csi_scraper:CSIScraper",
+    "scraper.scrapers.fiasp_scraper:FIASPScraper",
+]
+SCRAPER_ENTRY_POINT_GROUP = "tapasciate.scrapers"
+
+# Scheduler
+MAX_PARALLEL_SOURCES = 8  # sorgenti eseguite in parallelo
+MAX_CONCURRENT_REQUESTS = 16  # richieste HTTP simultanee in totale
+DEFAULT_HOST_CONCURRENCY = 2  # richieste simultanee per host non dichiarato
+
+# Cache dei fallimenti: URL che falliscono vengono riprovati a intervalli crescenti
+# (8 giorni = salta la prossima esecuzione settimanale, poi 16, 32, ... fino a 90)
+FAILURE_CACHE_PATH = ".cache/failures.json"
+FAILURE_BASE_INTERVAL = 8 * 24 * 3600
+FAILURE_MAX_INTERVAL = 90 * 24 * 3600
+# Errori temporanei (timeout, connessione, 429/5xx): riprovati dopo un intervallo breve e fisso
+FAILURE_TRANSIENT_INTERVAL = 3600
+
+# Date senza anno: un evento può essere elencato fino a questi giorni dopo la sua data
+DATE_PAST_WINDOW_DAYS = 60
+
+# Chiavi evento cercate su Supabase per ogni query IN
+EVENT_KEY_BATCH_SIZE = 200
+
+# Righe lette per pagina dalle query che scorrono intere tabelle (max-rows di PostgREST: 1000)
+DB_PAGE_SIZE = 1000
+
+# Deduplicazione tra sorgenti: similarità minima dei titoli normalizzati (stessa data e provincia)
+DEDUP_THRESHOLD = 0.7  # un titolo contenuto in un altro deve coprirne buona parte
+
+# Poster
+POSTER_WORKERS = 4  # poster costruiti in parallelo per sorgente
+POSTER_PATCH_BATCH_SIZE = 50  # poster attaccati agli eventi per ogni chiamata al database
+
+# Budget di tempo per sorgente (--budget): None = nessun limite
+SOURCE_TIME_BUDGET = None  # secondi
+POSTER_BUDGET_SHARE = 0.7  # oltre questa frazione del budget i poster vengono rimandati
+
+# Logging
+LOG_LEVEL = "INFO"  # DEBUG elenca anche ogni evento salvato
+LOG_SAMPLE_FIRST = 5  # warning con lo stesso template scritti sempre...
+LOG_SAMPLE_EVERY = 100  # ...poi uno ogni N, con il numero di quelli soppressi
+
+# Metriche (--metrics-file / --pushgateway)
+METRICS_PREFIX = "tapasciate"
+METRICS_JOB = "tapasciate_scraper"
+METRICS_STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)  # secondi
+METRICS_HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # secondi
+
+# Profilazione della memoria (--profile-memory)
+MEMORY_POSTER_THRESHOLD_MB = 20  # pipeline di un poster oltre questa soglia viene segnalata
+MEMORY_TOP_ALLOCATIONS = 5  # punti di allocazione riportati per stadio
+MEMORY_TRACEBACK_FRAMES = 1  # frame salvati da tracemalloc per ogni allocazione
+
+# Google Drive
+GDRIVE_DOWNLOAD_URL = "https://drive.usercontent.google.com/download"
+GDRIVE_MAX_CONCURRENCY = 4  # download simultanei verso Google Drive
+
+# Coda locale dei task (SQLite)
+TASK_QUEUE_PATH = ".cache/tasks.sqlite3"
+TASK_MAX_ATTEMPTS = 3
+TASK_LEASE_SECONDS = 300  # dopo questo tempo un task RUNNING può essere reclamato da un altro worker
+TASK_RETRY_DELAY = 30  # secondi, raddoppiati ad ogni tentativo fallito
+
 # Supabase Storage
 SUPABASE_STORAGE_BUCKET = "posters"
+STORAGE_UPLOAD_WORKERS = 4  # upload simultanei (--upload-workers)
+STORAGE_TUS_THRESHOLD_MB = 6  # file più grandi caricati con upload TUS riprendibile
+STORAGE_TUS_CHUNK_MB = 6  # dimensione dei blocchi TUS richiesta da Supabase
+STORAGE_MAX_RETRIES = 3  # nuovi tentativi dopo un errore temporaneo (rete, 429, 5xx)
+STORAGE_RETRY_DELAY = 1  # secondi, raddoppiati ad ogni tentativo
+STORAGE_UPLOAD_TIMEOUT = 60  # secondi per richiesta (un file o un blocco TUS)
+
+# Pulizia dei poster orfani (--gc)
+STORAGE_GC_PAGE_SIZE = 1000  # file elencati per pagina
+STORAGE_GC_BATCH_SIZE = 100  # file cancellati per chiamata
+STORAGE_GC_MIN_AGE_HOURS = 24  # i file più recenti non vengono mai cancellati (poster non ancora attaccati)
+
+# Pubblicazione: shard JSON statici (gzip) degli eventi per regione e mese
+PUBLISH_DIR = "public-data"
+PUBLISH_BUCKET = "events"
+PUBLISH_CACHE_CONTROL = "300"  # secondi; gli shard vengono riscritti ad ogni esecuzione
+PUBLISH_SNAPSHOT_CACHE_CONTROL = "31536000"  # lo snapshot ha l'hash nel nome, quindi non cambia mai
+PUBLISH_SNAPSHOTS_KEPT = 5  # snapshot conservati nel bucket, compreso quello corrente
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Rebuild data/comuni.tsv from the official ISTAT list of Italian municipalities.
+Usage: python scraper/data/build_gazetteer.py Elenco-comuni-italiani.csv
+
+The ISTAT CSV (https://www.istat.it/classificazione/codici-dei-comuni-delle-province-e-delle-regioni/)
+is ';'-separated and latin-1 encoded.
+"""
+import csv
+import sys
+from pathlib import Path
+
+OUTPUT = Path(__file__).parent / "comuni.tsv"
+NAME_COLUMN = "Denominazione in italiano"
+PROVINCE_COLUMN = "Sigla automobilistica"
+
+
+def main(source: str):
+    with open(source, encoding="latin-1", newline="") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        rows = sorted(
+            {(row[NAME_COLUMN].strip(), row[PROVINCE_COLUMN].strip().upper()) for row in reader},
+            key=lambda r: (r[0].lower(), r[1]),
+        )
+
+    with open(OUTPUT, "w", encoding="utf-8", newline="") as f:
+        f.write("comune\tsigla\n")
+        for name, province in rows:
+            f.write(f"{name}\t{province}\n")
+
+    print(f"✅ Wrote {len(rows)} comuni to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    main(sys.argv[1])
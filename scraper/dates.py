@@ -0,0 +1,134 @@
+"""
+Date normalization shared by the scrapers, the models and the database layer.
+
+- to_iso: cached parser for the formats found on the sources (DD/MM/YYYY and
+  variants, already-ISO dates), raising DateFormatError on anything else;
+- to_iso_many: batch conversion that parses each distinct value only once;
+- infer_year / italian_date: year for sources that show only day and month,
+  correct across the December/January rollover.
+"""
+from __future__ import annotations
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from scraper.config import DATE_PAST_WINDOW_DAYS
+
+ITALIAN_MONTHS: Dict[str, int] = {
+    "gennaio": 1, "febbraio": 2, "marzo": 3, "aprile": 4, "maggio": 5, "giugno": 6,
+    "luglio": 7, "agosto": 8, "settembre": 9, "ottobre": 10, "novembre": 11, "dicembre": 12,
+}
+
+_DAY_FIRST = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$")
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+
+
+class DateFormatError(ValueError):
+    """Data in un formato non riconosciuto o inesistente (es. 31/02/2026)."""
+
+
+def _iso(year: int, month: int, day: int, value: str) -> str:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        raise DateFormatError(f"Invalid date '{value}'") from None
+
+
+@lru_cache(maxsize=4096)
+def to_iso(value: str) -> str:
+    """
+    Converte una data in YYYY-MM-DD.
+
+    Formati supportati: DD/MM/YYYY (percorso veloce), D/M/YYYY, DD-MM-YYYY,
+    DD.MM.YYYY e YYYY-MM-DD.
+
+    Raises:
+        DateFormatError: se il formato non è riconosciuto o la data non esiste
+    """
+    # Percorso veloce per il formato usato da tutte le sorgenti: DD/MM/YYYY
+    if len(value) == 10 and value[2] == "/" and value[5] == "/":
+        day, month, year = value[:2], value[3:5], value[6:]
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            return _iso(int(year), int(month), int(day), value)
+
+    value = value.strip()
+    match = _ISO.match(value)
+    if match:
+        year, month, day = map(int, match.groups())
+        return _iso(year, month, day, value)
+
+    match = _DAY_FIRST.match(value)
+    if match:
+        day, month, year = map(int, match.groups())
+        return _iso(year, month, day, value)
+
+    raise DateFormatError(f"Unrecognized date format '{value}'")
+
+
+def to_iso_or_none(value: str) -> Optional[str]:
+    """Come to_iso, ma ritorna None invece di sollevare DateFormatError."""
+    try:
+        return to_iso(value)
+    except DateFormatError:
+        return None
+
+
+def to_iso_many(values: Iterable[str]) -> List[Optional[str]]:
+    """
+    Converte in blocco una colonna di date (es. tutta la tabella di una sorgente):
+    ogni valore distinto viene parsato una sola volta.
+
+    Returns:
+        Date ISO nello stesso ordine, None per i valori non riconosciuti
+    """
+    values = list(values)
+    converted = {value: to_iso_or_none(value) for value in set(values)}
+    return [converted[value] for value in values]
+
+
+def infer_year(month: int, day: int, today: Optional[date] = None, past_window_days: int = DATE_PAST_WINDOW_DAYS) -> int:
+    """
+    Anno di una data di cui si conoscono solo giorno e mese.
+
+    Sceglie la prima occorrenza a partire da past_window_days giorni fa: a dicembre
+    un evento "10 gennaio" è dell'anno successivo, a gennaio un evento "20 dicembre"
+    appena passato resta dell'anno precedente.
+
+    Args:
+        month: Mese (1-12)
+        day: Giorno del mese
+        today: Data di riferimento (default: oggi), iniettabile nei test
+        past_window_days: Quanti giorni nel passato può cadere un evento ancora elencato
+
+    Raises:
+        DateFormatError: se giorno e mese non formano una data valida
+    """
+    start = (today or date.today()) - timedelta(days=past_window_days)
+    # Cinque anni coprono anche il 29 febbraio
+    for year in range(start.year, start.year + 5):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= start:
+            return year
+    raise DateFormatError(f"Invalid day/month {day}/{month}")
+
+
+def italian_date(day: str, month_name: str, today: Optional[date] = None) -> Optional[str]:
+    """
+    Converte giorno e nome del mese italiano in DD/MM/YYYY con l'anno inferito.
+
+    Es. ("5", "Gennaio") a dicembre 2025 → "05/01/2026"
+
+    Returns:
+        La data, o None se il mese non è riconosciuto o il giorno non è valido
+    """
+    month = ITALIAN_MONTHS.get(month_name.strip().lower())
+    if month is None or not day.strip().isdigit():
+        return None
+    try:
+        year = infer_year(month, int(day), today)
+    except DateFormatError:
+        return None
+    return f"{int(day):02d}/{month:02d}/{year}"
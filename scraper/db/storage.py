@@ -0,0 +1,279 @@
+"""
+Concurrent uploads to Supabase Storage.
+
+Files are sent straight to the Storage REST API by a pool of upload workers,
+so posters and publication shards are uploaded in parallel instead of one at
+a time through the SDK:
+
+- small files are uploaded with a single request (upsert);
+- files above STORAGE_TUS_THRESHOLD_MB use the resumable TUS endpoint in
+  fixed-size chunks: a chunk that fails is resumed from the offset the server
+  acknowledged instead of restarting the whole file;
+- transient failures (connection errors, timeouts, 408/429/5xx) are retried
+  with exponential backoff;
+- public URLs are computed locally from bucket and path, without a second call.
+
+The uploader measures its sustained throughput: bytes uploaded over the time
+during which at least one upload was in flight.
+"""
+from __future__ import annotations
+import base64
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional, TypeVar
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from scraper.config import (
+    STORAGE_UPLOAD_WORKERS, STORAGE_TUS_THRESHOLD_MB, STORAGE_TUS_CHUNK_MB,
+    STORAGE_MAX_RETRIES, STORAGE_RETRY_DELAY, STORAGE_UPLOAD_TIMEOUT,
+)
+from scraper.utils import metrics
+
+MB = 1024 * 1024
+TUS_VERSION = "1.0.0"
+# Risposte dopo le quali ha senso riprovare
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class TransientStorageError(requests.HTTPError):
+    """Risposta di Storage temporanea (es. 503): l'upload viene riprovato."""
+
+
+class UploadStats(NamedTuple):
+    files: int
+    bytes: int
+    seconds: float  # tempo con almeno un upload in corso
+    retries: int
+    failed: int
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / MB / self.seconds if self.seconds else 0.0
+
+
+class StorageUploader:
+    """Carica file su Supabase Storage con un pool di worker. Thread-safe."""
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        workers: int = STORAGE_UPLOAD_WORKERS,
+        tus_threshold: int = STORAGE_TUS_THRESHOLD_MB * MB,
+        chunk_size: int = STORAGE_TUS_CHUNK_MB * MB,
+        max_retries: int = STORAGE_MAX_RETRIES,
+        retry_delay: float = STORAGE_RETRY_DELAY,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """
+        Args:
+            url: URL del progetto Supabase (SUPABASE_URL)
+            key: Chiave del progetto (SUPABASE_KEY)
+            workers: Upload simultanei
+            tus_threshold: Byte oltre i quali il file è caricato con TUS
+            chunk_size: Dimensione dei blocchi TUS (Supabase richiede 6 MB)
+            max_retries: Nuovi tentativi dopo un errore temporaneo
+            retry_delay: Attesa prima del primo nuovo tentativo, raddoppiata ad ogni tentativo
+            sleep, clock: Iniettabili nei test
+        """
+        self.base_url = url.rstrip("/") + "/storage/v1"
+        self.workers = workers
+        self.tus_threshold = tus_threshold
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._sleep = sleep
+        self._clock = clock
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {key}", "apikey": key})
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+
+        self._lock = threading.Lock()
+        self._files = 0
+        self._bytes = 0
+        self._retries = 0
+        self._failed = 0
+        self._active = 0
+        self._busy = 0.0
+        self._busy_since = 0.0
+
+    def public_url(self, bucket: str, path: str) -> str:
+        """URL pubblico di un file, calcolato senza chiamate a Storage."""
+        return f"{self.base_url}/object/public/{bucket}/{quote(path)}"
+
+    def submit(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> "Future[Optional[str]]":
+        """Accoda un upload; il future restituisce l'URL pubblico, o None in caso di errore."""
+        return self._executor.submit(self._upload, bucket, path, data, content_type, cache_control)
+
+    def upload(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> Optional[str]:
+        """
+        Carica un file sovrascrivendo quello esistente, attendendo il proprio turno nel pool.
+
+        Args:
+            bucket: Bucket di destinazione
+            path: Percorso nel bucket (es. "csi-camminata-2026-05-01.pdf")
+            data: Contenuto del file
+            content_type: MIME type
+            cache_control: max-age in secondi per la CDN (default di Storage se None)
+
+        Returns:
+            URL pubblico del file, o None in caso di errore
+        """
+        return self.submit(bucket, path, data, content_type, cache_control).result()
+
+    def _upload(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: Optional[str]) -> Optional[str]:
+        method = "tus" if len(data) > self.tus_threshold else "standard"
+        self._begin()
+        ok = False
+        try:
+            if method == "tus":
+                self._upload_resumable(bucket, path, data, content_type, cache_control)
+            else:
+                self._retry(path, lambda attempt: self._upload_object(bucket, path, data, content_type, cache_control))
+            ok = True
+        except Exception as e:
+            logger.error("❌ Failed to upload %s/%s: %s", bucket, path, e)
+            return None
+        finally:
+            self._end(len(data), ok)
+        metrics.inc("storage_uploads", bucket=bucket, method=method)
+        metrics.inc("storage_bytes", len(data), bucket=bucket)
+        return self.public_url(bucket, path)
+
+    def _upload_object(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: Optional[str]):
+        headers = {"Content-Type": content_type, "x-upsert": "true"}
+        if cache_control:
+            headers["Cache-Control"] = f"max-age={cache_control}"
+        resp = self.session.post(
+            f"{self.base_url}/object/{bucket}/{quote(path)}", data=data, headers=headers, timeout=STORAGE_UPLOAD_TIMEOUT,
+        )
+        _check(resp)
+
+    def _upload_resumable(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: Optional[str]):
+        """Upload TUS: crea l'upload, poi invia i blocchi riprendendo dall'offset confermato dal server."""
+        metadata = {"bucketName": bucket, "objectName": path, "contentType": content_type}
+        if cache_control:
+            metadata["cacheControl"] = cache_control
+        location = self._retry(path, lambda attempt: self._tus_create(len(data), metadata))
+
+        offset = 0
+        while offset < len(data):
+            # Dopo un errore l'offset locale non è affidabile: si chiede al server quanto ha ricevuto
+            offset = self._retry(path, lambda attempt: self._tus_send(
+                location, data, offset if attempt == 0 else self._tus_offset(location),
+            ))
+
+    def _tus_create(self, length: int, metadata: dict) -> str:
+        resp = self.session.post(
+            f"{self.base_url}/upload/resumable",
+            headers={
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Length": str(length),
+                "Upload-Metadata": ",".join(
+                    f"{name} {base64.b64encode(value.encode()).decode()}" for name, value in metadata.items()
+                ),
+                "x-upsert": "true",
+            },
+            timeout=STORAGE_UPLOAD_TIMEOUT,
+        )
+        _check(resp)
+        return resp.headers["Location"]
+
+    def _tus_offset(self, location: str) -> int:
+        resp = self.session.head(location, headers={"Tus-Resumable": TUS_VERSION}, timeout=STORAGE_UPLOAD_TIMEOUT)
+        _check(resp)
+        return int(resp.headers["Upload-Offset"])
+
+    def _tus_send(self, location: str, data: bytes, offset: int) -> int:
+        """Invia il blocco che inizia a offset e ritorna il nuovo offset confermato."""
+        if offset >= len(data):
+            return offset
+        resp = self.session.patch(
+            location,
+            data=data[offset:offset + self.chunk_size],
+            headers={
+                "Tus-Resumable": TUS_VERSION,
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            },
+            timeout=STORAGE_UPLOAD_TIMEOUT,
+        )
+        _check(resp)
+        return int(resp.headers["Upload-Offset"])
+
+    def _retry(self, path: str, call: Callable[[int], T]) -> T:
+        """Esegue call(tentativo), riprovando con backoff esponenziale sugli errori temporanei."""
+        attempt = 0
+        while True:
+            try:
+                return call(attempt)
+            except (requests.ConnectionError, requests.Timeout, TransientStorageError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                with self._lock:
+                    self._retries += 1
+                metrics.inc("storage_retries")
+                logger.warning("🔁 Upload of %s failed (attempt %d/%d), retrying in %.1fs: %s",
+                               path, attempt + 1, self.max_retries + 1, delay, e)
+                self._sleep(delay)
+                attempt += 1
+
+    def _begin(self):
+        with self._lock:
+            if self._active == 0:
+                self._busy_since = self._clock()
+            self._active += 1
+
+    def _end(self, nbytes: int, ok: bool):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._busy += self._clock() - self._busy_since
+            if ok:
+                self._files += 1
+                self._bytes += nbytes
+            else:
+                self._failed += 1
+
+    def stats(self) -> UploadStats:
+        with self._lock:
+            busy = self._busy + (self._clock() - self._busy_since if self._active else 0.0)
+            return UploadStats(self._files, self._bytes, busy, self._retries, self._failed)
+
+    def report(self):
+        """Registra file caricati, throughput sostenuto, nuovi tentativi e fallimenti."""
+        stats = self.stats()
+        if not stats.files and not stats.failed:
+            return
+        extra = "".join([
+            f", {stats.retries} retries" if stats.retries else "",
+            f", {stats.failed} failed" if stats.failed else "",
+        ])
+        logger.info("☁️  Uploaded %d files (%.1f MB) in %.1fs, %.2f MB/s with %d workers%s",
+                    stats.files, stats.bytes / MB, stats.seconds, stats.mb_per_s, self.workers, extra)
+
+    def close(self):
+        """Attende gli upload in corso e chiude il pool."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+def _check(resp: requests.Response):
+    """Solleva TransientStorageError per le risposte da riprovare, HTTPError per gli altri errori."""
+    if resp.status_code in RETRY_STATUS:
+        raise TransientStorageError(f"{resp.status_code} {resp.reason}: {resp.text[:200]}", response=resp)
+    if resp.status_code >= 400:
+        raise requests.HTTPError(f"{resp.status_code} {resp.reason}: {resp.text[:200]}", response=resp)
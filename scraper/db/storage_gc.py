@@ -0,0 +1,122 @@
+"""
+Garbage collection of orphaned posters in Supabase Storage.
+
+Poster files are named after the event title and date (see
+BaseScraper._make_poster_filename): when a title changes the new poster gets
+a new name and the old file is no longer referenced by any event, but stays
+in the bucket. The collector lists the whole bucket in pages, compares it
+with the set of poster URLs stored in the events table (read in pages and
+checked against an exact count) and deletes the unreferenced files in batches.
+
+Files younger than STORAGE_GC_MIN_AGE_HOURS are never deleted: with the
+two-phase save a poster is uploaded before its URL is attached to the event,
+so a run in progress would otherwise lose its fresh uploads.
+"""
+from __future__ import annotations
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, NamedTuple, Optional, Set
+from scraper.config import STORAGE_GC_BATCH_SIZE, STORAGE_GC_MIN_AGE_HOURS
+from scraper.db.supabase_client import IncompleteQueryError, SupabaseManager
+from scraper.utils import metrics
+
+MB = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class StorageObject(NamedTuple):
+    name: str
+    size: int
+    updated_at: Optional[datetime]
+
+    @classmethod
+    def from_listing(cls, entry: dict) -> "StorageObject":
+        """Oggetto dalla risposta di list() di Storage."""
+        stamp = entry.get("updated_at") or entry.get("created_at")
+        return cls(
+            name=entry["name"],
+            size=int((entry.get("metadata") or {}).get("size") or 0),
+            updated_at=datetime.fromisoformat(stamp.replace("Z", "+00:00")) if stamp else None,
+        )
+
+
+class GcReport(NamedTuple):
+    listed: int  # file nel bucket
+    referenced: int  # file usati da almeno un evento
+    orphans: int  # file non usati e abbastanza vecchi da essere cancellati
+    deleted: int
+    reclaimed: int  # byte liberati
+
+
+def find_orphans(objects: Iterable[StorageObject], referenced: Set[str], min_age: timedelta, now: datetime) -> List[StorageObject]:
+    """
+    File non referenziati da nessun evento e non modificati da almeno min_age.
+    Un file senza data non viene mai considerato orfano.
+    """
+    cutoff = now - min_age
+    return [
+        obj for obj in objects
+        if obj.name not in referenced and obj.updated_at is not None and obj.updated_at <= cutoff
+    ]
+
+
+def collect_garbage(
+    dry_run: bool = False,
+    min_age_hours: float = STORAGE_GC_MIN_AGE_HOURS,
+    batch_size: int = STORAGE_GC_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> GcReport:
+    """
+    Cancella dal bucket dei poster i file non più referenziati dalla tabella events.
+
+    Args:
+        dry_run: Se True elenca gli orfani senza cancellarli
+        min_age_hours: Età minima di un file per poter essere cancellato
+        batch_size: File cancellati per ogni chiamata a Storage
+        now: Istante di riferimento per l'età dei file (default adesso, iniettabile nei test)
+
+    Returns:
+        Il riepilogo della pulizia
+    """
+    # Prima l'elenco completo: cancellare durante la paginazione sposterebbe gli offset
+    objects = [StorageObject.from_listing(entry) for entry in SupabaseManager.list_posters() if entry.get("id")]
+    try:
+        referenced = {SupabaseManager.poster_filename(url) for url in SupabaseManager.fetch_poster_urls()}
+    except IncompleteQueryError as e:
+        logger.warning("⚠️  Poster references could not be read completely (%s): garbage collection skipped", e)
+        return GcReport(len(objects), 0, 0, 0, 0)
+
+    if objects and not referenced:
+        # Una query vuota (es. permessi sbagliati) cancellerebbe tutto il bucket
+        logger.warning("⚠️  No event references a poster but the bucket has %d files: garbage collection skipped", len(objects))
+        return GcReport(len(objects), 0, 0, 0, 0)
+
+    orphans = find_orphans(objects, referenced, timedelta(hours=min_age_hours), now or datetime.now(timezone.utc))
+    in_use = sum(1 for obj in objects if obj.name in referenced)
+    orphan_bytes = sum(obj.size for obj in orphans)
+    logger.info("🧹 %d posters in Storage, %d in use, %d orphaned (%.1f MB)",
+                len(objects), in_use, len(orphans), orphan_bytes / MB)
+
+    if dry_run:
+        for obj in orphans:
+            logger.info("  %s (%.1f KB)", obj.name, obj.size / 1024)
+        return GcReport(len(objects), in_use, len(orphans), 0, 0)
+
+    deleted = 0
+    reclaimed = 0
+    for i in range(0, len(orphans), batch_size):
+        batch = orphans[i:i + batch_size]
+        try:
+            # Storage ritorna solo i file effettivamente cancellati
+            removed = set(SupabaseManager.delete_posters([obj.name for obj in batch]))
+        except Exception as e:
+            logger.warning("⚠️  Failed to delete %d orphaned posters: %s", len(batch), e)
+            continue
+        deleted += len(removed)
+        reclaimed += sum(obj.size for obj in batch if obj.name in removed)
+
+    metrics.inc("storage_gc_deleted", deleted)
+    metrics.inc("storage_gc_reclaimed_bytes", reclaimed)
+    logger.info("🧹 Deleted %d orphaned posters, %.1f MB reclaimed", deleted, reclaimed / MB)
+    return GcReport(len(objects), in_use, len(orphans), deleted, reclaimed)
@@ -1,30 +1,121 @@
+import logging
 import os
-from supabase import create_client, Client
-from typing import Optional, List
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, List, Dict, Set, Tuple
+from urllib.parse import unquote
 from datetime import datetime, date
 from scraper.models.operation import Operation
-from scraper.config import SUPABASE_STORAGE_BUCKET
+from scraper.models.event import make_event_key
+from scraper.dates import to_iso
+from scraper.db.storage import StorageUploader
+from scraper.utils.gazetteer import resolve_city_province
+from scraper.config import (
+    SUPABASE_STORAGE_BUCKET, PUBLISH_BUCKET, EVENT_KEY_BATCH_SIZE, POSTER_PATCH_BATCH_SIZE, STORAGE_UPLOAD_WORKERS,
+    STORAGE_GC_PAGE_SIZE, DB_PAGE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Il SDK supabase (httpx, gotrue, postgrest, storage) è importato solo alla creazione del client
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+class IncompleteQueryError(RuntimeError):
+    """Le righe lette a pagine non corrispondono al conteggio esatto: il risultato non è affidabile."""
 
 
 class SupabaseManager:
-    _instance: Optional[Client] = None
+    _instance: Optional["Client"] = None
+    _uploader: Optional[StorageUploader] = None
+    _lock = threading.Lock()  # gli scraper girano in parallelo nello scheduler
+    
+    # Upload simultanei verso Storage (main --upload-workers), letto alla creazione dell'uploader
+    upload_workers: int = STORAGE_UPLOAD_WORKERS
     
     @classmethod
-    def get_client(cls) -> Client:
-        if cls._instance is None:
-            url = os.getenv("SUPABASE_URL")
-            key = os.getenv("SUPABASE_KEY")
-            
-            if not url or not key:
-                raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
-            
-            cls._instance = create_client(url, key)
+    def get_client(cls) -> "Client":
+        with cls._lock:
+            if cls._instance is None:
+                url, key = cls._credentials()
+                from supabase import create_client
+                cls._instance = create_client(url, key)
         
         return cls._instance
 
     @classmethod
-    def upsert_location(cls, city: str, province: str, province_name: str, region: str) -> int:
-        """Inserisce o recupera una location, ritorna l'ID"""
+    def get_uploader(cls) -> StorageUploader:
+        """Uploader concorrente verso Storage (vedi db.storage), creato al primo upload."""
+        with cls._lock:
+            if cls._uploader is None:
+                url, key = cls._credentials()
+                cls._uploader = StorageUploader(url, key, workers=cls.upload_workers)
+        
+        return cls._uploader
+
+    @classmethod
+    def close_uploader(cls):
+        """Attende gli upload in corso, registra il throughput ottenuto e chiude l'uploader, se creato."""
+        with cls._lock:
+            uploader, cls._uploader = cls._uploader, None
+        if uploader is not None:
+            uploader.close()
+            uploader.report()
+
+    @staticmethod
+    def _credentials() -> Tuple[str, str]:
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+        
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+        return url, key
+
+    @classmethod
+    def _fetch_all(cls, build: Callable[[], Any], page_size: Optional[int] = None, exact: bool = False) -> List[dict]:
+        """
+        Legge tutte le righe di una query a pagine con .range(): una singola SELECT
+        è troncata al max-rows di PostgREST (1000 di default).
+        
+        Args:
+            build: Crea la query (select, filtri e un order stabile) da eseguire per ogni pagina
+            page_size: Righe per pagina, non oltre il max-rows di PostgREST (default DB_PAGE_SIZE)
+            exact: Se True la select deve chiedere count="exact" e le righe lette vengono confrontate con il conteggio
+        
+        Raises:
+            IncompleteQueryError: con exact, se le righe lette sono diverse dal conteggio
+        """
+        page_size = page_size or DB_PAGE_SIZE
+        rows: List[dict] = []
+        count: Optional[int] = None
+        while True:
+            result = build().range(len(rows), len(rows) + page_size - 1).execute()
+            if count is None:
+                count = result.count
+            rows.extend(result.data)
+            if len(result.data) < page_size:
+                break
+        if exact and (count is None or len(rows) != count):
+            raise IncompleteQueryError(f"read {len(rows)} rows, expected {count}")
+        return rows
+
+    @classmethod
+    def upsert_location(
+        cls,
+        city: str,
+        province: str,
+        province_name: str,
+        region: str,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        approximate: bool = False
+    ) -> int:
+        """
+        Inserisce o recupera una location, ritorna l'ID. lat/lon aggiornano le coordinate se indicate.
+        
+        Args:
+            approximate: True se lat/lon sono quelle del capoluogo di provincia (colonna locations.approximate)
+        """
         client = cls.get_client()
 
         # Normalizza
@@ -34,7 +125,7 @@ class SupabaseManager:
         region = region.strip().title()
 
         # Cerca esistente
-        result = client.table("locations").select("id, province_name, region").eq("city", city).eq("province", province).execute()
+        result = client.table("locations").select("id, province_name, region, lat, lon, approximate").eq("city", city).eq("province", province).execute()
 
         if result.data:
             location_id = result.data[0]["id"]
@@ -43,6 +134,11 @@ class SupabaseManager:
                 updates["region"] = region
             if result.data[0]["province_name"] != province_name:
                 updates["province_name"] = province_name
+            stored = (result.data[0].get("lat"), result.data[0].get("lon"), bool(result.data[0].get("approximate")))
+            if lat is not None and stored != (lat, lon, approximate):
+                updates["lat"] = lat
+                updates["lon"] = lon
+                updates["approximate"] = approximate
             if updates:
                 client.table("locations").update(updates).eq("id", location_id).execute()
             return location_id
@@ -52,7 +148,10 @@ class SupabaseManager:
             "city": city,
             "province": province,
             "province_name": province_name,
-            "region": region
+            "region": region,
+            "lat": lat,
+            "lon": lon,
+            "approximate": approximate
         }).execute()
 
         return result.data[0]["id"]
@@ -66,10 +165,24 @@ class SupabaseManager:
         organizer: str, 
         url: Optional[str] = None,
         poster: Optional[str] = None,
-        distances: Optional[List[str]] = None
+        distances: Optional[List[str]] = None,
+        distances_km: Optional[List[float]] = None,
+        poster_source: Optional[str] = None,
+        poster_fingerprint: Optional[str] = None,
+        event_key: Optional[str] = None,
+        event_ids: Optional[Dict[str, int]] = None,
+        keep_poster: bool = False
     ) -> Operation:
         """
-        Inserisce o aggiorna un evento (UPSERT basato su name + date)
+        Inserisce o aggiorna un evento (UPSERT basato su event_key)
+        
+        Args:
+            event_key: Chiave normalizzata (Event.event_key); se assente viene cercato per name + date
+            event_ids: Risultato di fetch_event_ids: se indicato evita la SELECT per evento
+                e viene aggiornato con gli eventi inseriti
+            keep_poster: Se True e poster è None, l'UPDATE non tocca il poster già salvato
+                (poster in attesa del backfill). Altrimenti un poster None lo cancella,
+                es. quando la sorgente lo ha rimosso
         
         Returns:
             Operation.INSERTED se nuovo evento, Operation.UPDATED se aggiornato
@@ -82,8 +195,17 @@ class SupabaseManager:
         # Converti HttpUrl in stringa se necessario
         poster_str = str(poster) if poster else None
         
-        # Cerca evento esistente (solo name + date)
-        result = client.table("events").select("id").eq("name", name).eq("date", parsed_date).execute()
+        # Cerca evento esistente
+        if event_key and event_ids is not None:
+            event_id = event_ids.get(event_key)
+        else:
+            query = client.table("events").select("id")
+            if event_key:
+                query = query.eq("event_key", event_key)
+            else:
+                query = query.eq("name", name).eq("date", parsed_date)
+            result = query.execute()
+            event_id = result.data[0]["id"] if result.data else None
         
         event_data = {
             "name": name,
@@ -92,20 +214,223 @@ class SupabaseManager:
             "organizer": organizer,
             "url": url,
             "poster": poster_str,
-            "distances": distances or []
+            "poster_source": poster_source,
+            "poster_fingerprint": poster_fingerprint,
+            "distances": distances or [],
+            "distances_km": distances_km or []
         }
+        if event_key:
+            event_data["event_key"] = event_key
         
-        if result.data:
-            # UPDATE
-            event_id = result.data[0]["id"]
+        if event_id is not None:
+            # UPDATE: un poster ancora da costruire (che può essere rimandato o fallire) non cancella quello salvato
+            if poster_str is None and keep_poster:
+                for column in ("poster", "poster_source", "poster_fingerprint"):
+                    del event_data[column]
             event_data["updated_at"] = datetime.now().isoformat()
             client.table("events").update(event_data).eq("id", event_id).execute()
             return Operation.UPDATED
         else:
             # INSERT
-            client.table("events").insert(event_data).execute()
+            result = client.table("events").insert(event_data).execute()
+            if event_key and event_ids is not None and result.data:
+                event_ids[event_key] = result.data[0]["id"]
             return Operation.INSERTED
 
+    @classmethod
+    def fetch_event_ids(cls, event_keys: List[str]) -> Dict[str, int]:
+        """
+        Cerca gli eventi esistenti per event_key con poche query a blocchi (IN).
+        
+        Returns:
+            Dizionario event_key → id per le chiavi già presenti
+        """
+        client = cls.get_client()
+        keys = sorted(set(event_keys))
+        
+        found: Dict[str, int] = {}
+        for i in range(0, len(keys), EVENT_KEY_BATCH_SIZE):
+            result = client.table("events") \
+                .select("id, event_key") \
+                .in_("event_key", keys[i:i + EVENT_KEY_BATCH_SIZE]) \
+                .execute()
+            found.update({row["event_key"]: row["id"] for row in result.data})
+        return found
+
+    @classmethod
+    def backfill_event_keys(cls) -> int:
+        """
+        Calcola event_key per gli eventi salvati prima dell'introduzione della colonna.
+        
+        La provincia è ricavata di nuovo dal nome del comune, come fa parse_location: gli eventi
+        salvati con la provincia di default sbagliata riceverebbero altrimenti una chiave che
+        lo scraper non produce più. Gli eventi la cui chiave esiste già (duplicati di un evento
+        salvato dopo) vengono cancellati, invece di restare senza chiave ad ogni esecuzione.
+        
+        Returns:
+            Numero di eventi aggiornati
+        """
+        client = cls.get_client()
+        
+        # Tutte le pagine prima degli UPDATE: le righe aggiornate escono dal filtro e sposterebbero gli offset
+        rows = cls._fetch_all(
+            lambda: client.table("events")
+            .select("id, name, date, location:locations (city, province)")
+            .is_("event_key", "null")
+            .order("id")
+        )
+        if not rows:
+            return 0
+        
+        keys: Dict[int, str] = {}
+        for row in rows:
+            location = row.get("location") or {}
+            keys[row["id"]] = make_event_key(row["name"], row["date"], cls._backfill_province(location))
+        
+        existing = cls.fetch_event_ids(list(keys.values()))
+        seen: Set[str] = set(existing)
+        duplicates = []
+        updated = 0
+        for event_id, key in keys.items():
+            if key in seen:
+                duplicates.append(event_id)
+                continue
+            seen.add(key)
+            try:
+                client.table("events").update({"event_key": key}).eq("id", event_id).execute()
+                updated += 1
+            except Exception as e:
+                logger.warning("⚠️ Failed to key event %s (%s): %s", event_id, key, e)
+        
+        if duplicates:
+            client.table("events").delete().in_("id", duplicates).execute()
+            logger.info("🗑️  Removed %d unkeyed events duplicating an existing event_key", len(duplicates))
+        return updated
+
+    @staticmethod
+    def _backfill_province(location: dict) -> str:
+        """Sigla della provincia ricavata dal comune (match esatto, poi fuzzy), o quella salvata se il comune è sconosciuto."""
+        stored = location.get("province") or ""
+        city = location.get("city") or ""
+        return (
+            resolve_city_province(city, prefer=stored or None, fuzzy=False)
+            or resolve_city_province(city, prefer=stored or None)
+            or stored
+        )
+
+    @classmethod
+    def patch_posters(cls, patches: List[dict]) -> int:
+        """
+        Attacca i poster a eventi già salvati, con una chiamata ogni POSTER_PATCH_BATCH_SIZE eventi
+        (funzione patch_event_posters, vedi README). Le righe senza poster sono ignorate:
+        un poster già salvato non viene mai sovrascritto con NULL.
+        
+        Args:
+            patches: Righe {"event_key", "poster", "poster_source", "poster_fingerprint"}
+        
+        Returns:
+            Numero di eventi aggiornati
+        """
+        client = cls.get_client()
+        rows = [patch for patch in patches if patch.get("poster")]
+        
+        updated = 0
+        for i in range(0, len(rows), POSTER_PATCH_BATCH_SIZE):
+            result = client.rpc("patch_event_posters", {"patches": rows[i:i + POSTER_PATCH_BATCH_SIZE]}).execute()
+            updated += result.data or 0
+        return updated
+
+    @classmethod
+    def fetch_poster_index(cls, organizer: str) -> Dict[Tuple[str, str], dict]:
+        """
+        Recupera a pagine i poster già caricati per un organizzatore, solo per gli eventi
+        da oggi in poi (quelli passati non compaiono più sulla sorgente).
+        
+        Returns:
+            Dizionario (name, date YYYY-MM-DD) → {"poster", "poster_source", "poster_fingerprint"}
+        """
+        client = cls.get_client()
+        today = date.today().isoformat()
+        
+        rows = cls._fetch_all(
+            lambda: client.table("events")
+            .select("name, date, poster, poster_source, poster_fingerprint")
+            .eq("organizer", organizer)
+            .gte("date", today)
+            .not_.is_("poster", "null")
+            .order("id")
+        )
+        return {(row["name"], row["date"]): row for row in rows}
+
+    @classmethod
+    def fetch_upcoming_events(cls) -> List[dict]:
+        """
+        Recupera tutti gli eventi da oggi in poi con la location, ordinati per data.
+        
+        Returns:
+            Righe di events con chiave "location" (city, province, province_name, region, lat, lon, approximate)
+        """
+        client = cls.get_client()
+        today = date.today().isoformat()
+        
+        # A pagine: l'ordine per id rende stabili le pagine a parità di data
+        return cls._fetch_all(
+            lambda: client.table("events")
+            .select("name, date, organizer, poster, distances, distances_km, location:locations (city, province, province_name, region, lat, lon, approximate)")
+            .gte("date", today)
+            .order("date")
+            .order("id")
+        )
+
+    @classmethod
+    def upload_public_file(cls, path: str, data: bytes, content_type: str, cache_control: str) -> Optional[str]:
+        """
+        Carica un file pubblico nel bucket di pubblicazione, sovrascrivendo quello esistente.
+        
+        Args:
+            path: percorso nel bucket (es. "lombardia/2026-05.json.gz")
+            data: contenuto del file
+            content_type: MIME type
+            cache_control: max-age in secondi per la CDN
+            
+        Returns:
+            URL pubblico del file, o None in caso di errore
+        """
+        return cls.get_uploader().upload(PUBLISH_BUCKET, path, data, content_type, cache_control)
+
+    @classmethod
+    def list_public_files(cls) -> List[dict]:
+        """
+        Tutti i file del bucket di pubblicazione. Le cartelle (una per regione e "snapshots")
+        sono elencate un livello sotto la radice.
+        
+        Returns:
+            Oggetti di Storage con "name" sostituito dal percorso (es. "lombardia/2026-05.json.gz")
+        """
+        files = []
+        for entry in cls._list_bucket(PUBLISH_BUCKET):
+            if entry.get("id") is not None:
+                files.append(entry)
+                continue
+            files.extend(
+                {**child, "name": f"{entry['name']}/{child['name']}"}
+                for child in cls._list_bucket(PUBLISH_BUCKET, entry["name"])
+            )
+        return files
+
+    @classmethod
+    def delete_public_files(cls, paths: List[str]) -> List[str]:
+        """
+        Cancella più file dal bucket di pubblicazione con una sola chiamata.
+        
+        Returns:
+            Percorsi dei file effettivamente cancellati
+        """
+        client = cls.get_client()
+        
+        removed = client.storage.from_(PUBLISH_BUCKET).remove(paths)
+        return [obj["name"] for obj in removed or []]
+
     @classmethod
     def upload_poster(cls, filename: str, pdf_bytes: bytes) -> Optional[str]:
         """
@@ -119,21 +444,8 @@ class SupabaseManager:
         Returns:
             URL pubblico del file, o None in caso di errore
         """
-        client = cls.get_client()
-        
-        try:
-            # upsert=True sovrascrive se il file esiste già
-            client.storage.from_(SUPABASE_STORAGE_BUCKET).upload(
-                path=filename,
-                file=pdf_bytes,
-                file_options={"content-type": "application/pdf", "upsert": "true"}
-            )
-            
-            url = client.storage.from_(SUPABASE_STORAGE_BUCKET).get_public_url(filename)
-            return url
-        except Exception as e:
-            print(f"❌ Failed to upload poster {filename}: {e}")
-            return None
+        # I PDF grandi passano dall'upload TUS riprendibile, gli errori temporanei sono riprovati
+        return cls.get_uploader().upload(SUPABASE_STORAGE_BUCKET, filename, pdf_bytes, "application/pdf")
 
     @classmethod
     def delete_poster(cls, poster_url: str):
@@ -146,11 +458,70 @@ class SupabaseManager:
         client = cls.get_client()
         
         try:
-            # Estrai il filename dall'URL (ultima parte del path)
-            filename = poster_url.split(f"/{SUPABASE_STORAGE_BUCKET}/")[-1]
-            client.storage.from_(SUPABASE_STORAGE_BUCKET).remove([filename])
+            client.storage.from_(SUPABASE_STORAGE_BUCKET).remove([cls.poster_filename(poster_url)])
         except Exception as e:
-            print(f"⚠️ Failed to delete poster {poster_url}: {e}")
+            logger.warning("⚠️ Failed to delete poster %s: %s", poster_url, e)
+
+    @staticmethod
+    def poster_filename(poster_url: str) -> str:
+        """Nome del file nel bucket dei poster dato il suo URL pubblico (ultima parte del path)."""
+        return unquote(poster_url.split(f"/{SUPABASE_STORAGE_BUCKET}/")[-1].split("?")[0])
+
+    @classmethod
+    def list_posters(cls, page_size: int = STORAGE_GC_PAGE_SIZE) -> Iterator[dict]:
+        """
+        Elenca i file del bucket dei poster a pagine di page_size, in ordine di nome.
+        
+        Returns:
+            Oggetti di Storage con "name", "created_at", "updated_at" e "metadata" ("size", ...)
+        """
+        return cls._list_bucket(SUPABASE_STORAGE_BUCKET, page_size=page_size)
+
+    @classmethod
+    def _list_bucket(cls, bucket: str, folder: str = "", page_size: int = STORAGE_GC_PAGE_SIZE) -> Iterator[dict]:
+        """Elenca una cartella di un bucket a pagine di page_size, in ordine di nome (le sottocartelle hanno "id" None)."""
+        client = cls.get_client()
+        
+        offset = 0
+        while True:
+            page = client.storage.from_(bucket).list(
+                folder, {"limit": page_size, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+            )
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    @classmethod
+    def fetch_poster_urls(cls) -> Set[str]:
+        """
+        Tutti i valori non nulli della colonna poster, letti a pagine.
+        
+        Raises:
+            IncompleteQueryError: se le righe lette non corrispondono a count="exact"
+                (es. eventi inseriti durante la lettura): un insieme incompleto farebbe
+                cancellare poster ancora in uso
+        """
+        client = cls.get_client()
+        
+        rows = cls._fetch_all(
+            lambda: client.table("events").select("poster", count="exact").not_.is_("poster", "null").order("id"),
+            exact=True,
+        )
+        return {row["poster"] for row in rows}
+
+    @classmethod
+    def delete_posters(cls, filenames: List[str]) -> List[str]:
+        """
+        Cancella più file dal bucket dei poster con una sola chiamata.
+        
+        Returns:
+            Nomi dei file effettivamente cancellati
+        """
+        client = cls.get_client()
+        
+        removed = client.storage.from_(SUPABASE_STORAGE_BUCKET).remove(filenames)
+        return [obj["name"] for obj in removed or []]
 
     @classmethod
     def delete_past_events(cls):
@@ -171,10 +542,10 @@ class SupabaseManager:
 
     @classmethod
     def _parse_date(cls, date_str: str) -> str:
-        """Converte DD/MM/YYYY in YYYY-MM-DD"""
-        try:
-            dt = datetime.strptime(date_str, "%d/%m/%Y")
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            # Se già in formato corretto o altro formato, ritorna così
-            return date_str
+        """
+        Converte DD/MM/YYYY (o una data già ISO) in YYYY-MM-DD.
+        
+        Raises:
+            DateFormatError: se il formato non è riconosciuto, invece di salvare una data non valida
+        """
+        return to_iso(date_str)
@@ -0,0 +1,333 @@
+"""
+Durable local task queue backed by SQLite.
+
+Several worker processes (or threads) can share the same database file:
+tasks are claimed atomically with a lease, failed tasks are retried with
+exponential backoff up to max_attempts, and a task whose worker died is
+claimable again once its lease expires (or marked FAILED if it has no
+attempts left). A dedupe key is unique only among pending and running
+tasks, so finished work can be queued again.
+
+Scrapers use the queue, when enabled with enable_queue, to remember the work
+they deferred because of the time budget and to resume it first at the next run.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from scraper.config import TASK_QUEUE_PATH, TASK_MAX_ATTEMPTS, TASK_LEASE_SECONDS, TASK_RETRY_DELAY
+from scraper.models.task import Task, TaskKind, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+_TABLE = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    dedupe_key    TEXT,
+    status        TEXT NOT NULL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    last_error    TEXT,
+    worker        TEXT,
+    available_at  REAL NOT NULL,
+    leased_until  REAL,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+)"""
+
+_SCHEMA = _TABLE + """;
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (status, kind, available_at);
+CREATE UNIQUE INDEX IF NOT EXISTS tasks_dedupe ON tasks (dedupe_key) WHERE status IN ('pending', 'running');
+"""
+
+# Colonne copiate dalle code create con dedupe_key UNIQUE su tutte le righe
+_COLUMNS = (
+    "id, kind, payload, dedupe_key, status, attempts, max_attempts, last_error,"
+    " worker, available_at, leased_until, created_at, updated_at"
+)
+
+# Un handler riceve il payload e può ritornare task successivi da accodare (kind, payload, dedupe_key)
+FollowUp = Tuple[TaskKind, Dict[str, Any], Optional[str]]
+Handler = Callable[[Dict[str, Any]], Optional[Iterable[FollowUp]]]
+
+
+class TaskQueue:
+    """Coda di task persistente su un file SQLite."""
+
+    def __init__(self, path: str | Path = TASK_QUEUE_PATH, lease_seconds: float = TASK_LEASE_SECONDS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Connessioni aperte da tutti i thread, chiuse insieme da close()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._migrate()
+        self._connection().executescript(_SCHEMA)
+
+    def _migrate(self):
+        """
+        Le code create con dedupe_key UNIQUE impediscono di riaccodare un task DONE o FAILED:
+        la tabella viene ricreata senza il vincolo (sostituito dall'indice parziale tasks_dedupe).
+        """
+        conn = self._connection()
+        unique = [row for row in conn.execute("PRAGMA index_list(tasks)") if row["origin"] == "u"]
+        if not unique:
+            return
+        with self._transaction():
+            conn.execute("ALTER TABLE tasks RENAME TO tasks_old")
+            conn.execute("DROP INDEX IF EXISTS tasks_claim")
+            conn.execute(_TABLE)
+            conn.execute(f"INSERT INTO tasks ({_COLUMNS}) SELECT {_COLUMNS} FROM tasks_old")
+            conn.execute("DROP TABLE tasks_old")
+        logger.info("🗃️  Migrated task queue %s: dedupe keys unique only among queued tasks", self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Una connessione per thread: sqlite3 non condivide le connessioni tra thread.
+        Ognuna è usata solo dal suo thread; check_same_thread=False permette a close()
+        di chiuderle tutte da quello che chiude la coda.
+        """
+        conn = getattr(self._local, "conn", None)
+        with self._connections_lock:
+            if conn is not None and conn in self._connections:
+                return conn
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._connections.add(conn)
+        self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def close(self):
+        """Chiude le connessioni di tutti i thread; un thread che riusa la coda ne apre una nuova."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+    def enqueue(
+        self,
+        kind: TaskKind,
+        payload: Dict[str, Any],
+        dedupe_key: Optional[str] = None,
+        max_attempts: int = TASK_MAX_ATTEMPTS,
+    ) -> Optional[int]:
+        """
+        Aggiunge un task alla coda.
+
+        Args:
+            kind: Tipo di task
+            payload: Dati serializzabili in JSON
+            dedupe_key: Se indicata, un task con la stessa chiave già in coda non viene duplicato
+            max_attempts: Tentativi prima di marcare il task come FAILED
+
+        Returns:
+            ID del task, o None se scartato come duplicato
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, payload, dedupe_key, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind.value, json.dumps(payload), dedupe_key, TaskStatus.PENDING.value, max_attempts, now, now, now),
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, worker: str, kinds: Optional[List[TaskKind]] = None, key_prefix: Optional[str] = None) -> Optional[Task]:
+        """
+        Reclama atomicamente il prossimo task disponibile.
+
+        Sono disponibili i task PENDING il cui backoff è scaduto e i task RUNNING
+        con lease scaduto (worker terminato senza completarli) che hanno ancora
+        tentativi; quelli senza tentativi rimasti diventano FAILED.
+
+        Args:
+            worker: Nome del worker che reclama il task
+            kinds: Tipi di task accettati (tutti se None)
+            key_prefix: Se indicato, solo i task la cui dedupe_key inizia così (es. "CSI:")
+
+        Returns:
+            Il task reclamato, o None se la coda è vuota
+        """
+        now = time.time()
+        query = (
+            "SELECT * FROM tasks WHERE ((status = ? AND available_at <= ?)"
+            " OR (status = ? AND leased_until < ? AND attempts < max_attempts))"
+        )
+        params: List[Any] = [TaskStatus.PENDING.value, now, TaskStatus.RUNNING.value, now]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params += [kind.value for kind in kinds]
+        if key_prefix:
+            query += " AND substr(dedupe_key, 1, ?) = ?"
+            params += [len(key_prefix), key_prefix]
+        query += " ORDER BY id LIMIT 1"
+
+        with self._transaction() as conn:
+            # Worker terminato all'ultimo tentativo: il task non viene ripreso all'infinito
+            conn.execute(
+                "UPDATE tasks SET status = ?, last_error = COALESCE(last_error, 'lease expired'), leased_until = NULL,"
+                " updated_at = ? WHERE status = ? AND leased_until < ? AND attempts >= max_attempts",
+                (TaskStatus.FAILED.value, now, TaskStatus.RUNNING.value, now),
+            )
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, worker = ?, leased_until = ?, updated_at = ?"
+                " WHERE id = ?",
+                (TaskStatus.RUNNING.value, worker, now + self.lease_seconds, now, row["id"]),
+            )
+        return Task(
+            id=row["id"],
+            kind=TaskKind(row["kind"]),
+            payload=json.loads(row["payload"]),
+            status=TaskStatus.RUNNING,
+            attempts=row["attempts"] + 1,
+            max_attempts=row["max_attempts"],
+            last_error=row["last_error"],
+            worker=worker,
+        )
+
+    def complete(self, task: Task) -> bool:
+        """
+        Marca un task come completato.
+
+        Returns:
+            False se il lease era scaduto e il task è stato reclamato da un altro worker
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, leased_until = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                (TaskStatus.DONE.value, time.time(), task.id, task.worker, TaskStatus.RUNNING.value),
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, task: Task, error: str, retry_delay: float = TASK_RETRY_DELAY) -> bool:
+        """
+        Registra un fallimento: il task torna PENDING con backoff esponenziale,
+        oppure diventa FAILED se ha esaurito i tentativi.
+
+        Returns:
+            False se il lease era scaduto e il task è stato reclamato da un altro worker
+        """
+        now = time.time()
+        if task.attempts >= task.max_attempts:
+            status, available_at = TaskStatus.FAILED, now
+        else:
+            status, available_at = TaskStatus.PENDING, now + retry_delay * 2 ** (task.attempts - 1)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, last_error = ?, available_at = ?, leased_until = NULL, updated_at = ?"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                (status.value, error[:500], available_at, now, task.id, task.worker, TaskStatus.RUNNING.value),
+            )
+            return cursor.rowcount > 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Conteggio dei task per tipo e stato, es. {"upload": {"pending": 3, "done": 10}}."""
+        result: Dict[str, Dict[str, int]] = {}
+        rows = self._connection().execute("SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status")
+        for row in rows:
+            result.setdefault(row["kind"], {})[row["status"]] = row["n"]
+        return result
+
+    def purge_done(self) -> int:
+        """Cancella i task completati, ritorna quanti ne ha rimossi."""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM tasks WHERE status = ?", (TaskStatus.DONE.value,)).rowcount
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: il lock di scrittura è preso subito, così due worker non reclamano lo stesso task."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# Coda condivisa dagli scraper, attiva solo se abilitata da enable_queue (es. da main)
+queue: Optional[TaskQueue] = None
+
+
+def enable_queue(path: str | Path = TASK_QUEUE_PATH) -> TaskQueue:
+    """Apre la coda in cui gli scraper registrano il lavoro rimandato."""
+    global queue
+    queue = TaskQueue(path)
+    return queue
+
+
+def close_queue():
+    """Chiude e disattiva la coda condivisa."""
+    global queue
+    if queue is not None:
+        queue.close()
+        queue = None
+
+
+def run_worker(
+    queue: TaskQueue,
+    handlers: Dict[TaskKind, Handler],
+    worker: Optional[str] = None,
+    max_tasks: Optional[int] = None,
+) -> int:
+    """
+    Elabora task finché la coda non è vuota (o fino a max_tasks).
+
+    Args:
+        queue: Coda da cui reclamare i task
+        handlers: Funzione da eseguire per ogni tipo di task gestito da questo worker
+        worker: Nome del worker registrato nel task (default "pid-thread")
+        max_tasks: Limite di task da elaborare
+
+    Returns:
+        Numero di task elaborati (completati o falliti)
+    """
+    worker = worker or f"{os.getpid()}-{threading.get_ident()}"
+    kinds = list(handlers)
+    processed = 0
+
+    while max_tasks is None or processed < max_tasks:
+        task = queue.claim(worker, kinds)
+        if task is None:
+            break
+        try:
+            follow_ups = handlers[task.kind](task.payload) or []
+            for kind, payload, dedupe_key in follow_ups:
+                queue.enqueue(kind, payload, dedupe_key)
+            finished = queue.complete(task)
+        except Exception as e:
+            logger.warning(
+                "⚠️ Task %s#%s failed (attempt %d/%d): %s", task.kind.value, task.id, task.attempts, task.max_attempts, e
+            )
+            finished = queue.fail(task, f"{type(e).__name__}: {e}")
+        if not finished:
+            logger.warning("⚠️ Task %s#%s lease expired before it finished: result discarded", task.kind.value, task.id)
+        processed += 1
+
+    return processed
+
+
+if __name__ == "__main__":
+    for kind, counts in sorted(TaskQueue().stats().items()):
+        print(f"{kind}: " + ", ".join(f"{status}={n}" for status, n in sorted(counts.items())))
@@ -1,9 +1,13 @@
 """
 Main entry point for the Tapasciate scraper.
 """
+import argparse
+import logging
 import os
 import sys
+import time
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Carica variabili d'ambiente dal file .env
@@ -12,49 +16,348 @@ load_dotenv()
 # Aggiungi la root del progetto al PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from scraper.scrapers.csi_scraper import CSIScraper
-from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.scrapers.base import BaseScraper
+from scraper.scrapers.registry import load_scrapers
+from scraper.scheduler import run_scrapers, stream_scrapers
+from scraper.sharding import Shard, ShardMode, ShardReport, merge_reports, missing_shards
+from scraper.models.source_result import SourceResult
+from scraper.db import task_queue
 from scraper.db.supabase_client import SupabaseManager
+from scraper.db.storage_gc import collect_garbage
+from scraper.publish import publish
+from scraper.utils import http
+from scraper.utils.http_archive import ArchiveMode
+from scraper.utils.jsonl import JsonlWriter
+from scraper.utils import memory, metrics
+from scraper.utils.log import setup_logging, shutdown_logging
+from scraper.config import (
+    FAILURE_CACHE_PATH, LOG_LEVEL, MAX_PARALLEL_SOURCES, MEMORY_POSTER_THRESHOLD_MB, STORAGE_UPLOAD_WORKERS,
+    STORAGE_GC_MIN_AGE_HOURS,
+)
 
+# Eseguito come script il modulo si chiama __main__: il nome esplicito lo mette sotto il logger "scraper"
+logger = logging.getLogger("scraper.main")
 
-def main():
-    """Esegue tutti gli scraper e salva su Supabase"""
-    
-    print("🚀 Starting Tapasciate scraper...")
-    
-    # Verifica env variables
-    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_KEY"):
-        print("❌ SUPABASE_URL and SUPABASE_KEY environment variables required")
+
+def shard_spec(value: str) -> str:
+    """Tipo argparse per --shard: valida "i/N" subito, con un messaggio d'errore leggibile"""
+    try:
+        Shard.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tapasciate scraper")
+    parser.add_argument("--shard", type=shard_spec, metavar="i/N",
+                        help="Esegue solo lo shard i di N (es. 1/4)")
+    parser.add_argument("--shard-by", choices=[mode.value for mode in ShardMode], default=ShardMode.SOURCE.value,
+                        help="Criterio di suddivisione: sorgente, intervallo di righe o provincia")
+    parser.add_argument("--results-out", type=Path, metavar="FILE",
+                        help="Scrive i risultati dello shard in FILE (JSON) per il merge")
+    parser.add_argument("--merge", type=Path, nargs="+", metavar="FILE",
+                        help="Unisce i risultati di più shard e stampa i totali, senza eseguire scraper")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Solo fetch e parse: scrive gli eventi in JSONL senza poster né database")
+    parser.add_argument("--output", type=Path, metavar="FILE",
+                        help="File JSONL per --dry-run (default: stdout)")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument("--record", type=Path, metavar="ARCHIVE",
+                         help="Registra tutte le richieste HTTP (pagine, immagini, poster) in un archivio zip")
+    archive.add_argument("--replay", type=Path, metavar="ARCHIVE",
+                         help="Serve le richieste HTTP da un archivio registrato con --record, senza rete")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Misura la memoria per stadio con tracemalloc e il picco RSS per sorgente (sorgenti eseguite una alla volta)")
+    parser.add_argument("--poster-memory-threshold", type=float, default=MEMORY_POSTER_THRESHOLD_MB, metavar="MB",
+                        help="Con --profile-memory segnala i poster la cui pipeline supera questa soglia")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=LOG_LEVEL,
+                        help="Livello minimo dei log (DEBUG elenca ogni evento salvato)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Log in formato JSON, un oggetto per riga")
+    parser.add_argument("--budget", type=float, metavar="SECONDS",
+                        help="Budget di tempo per sorgente: oltre il 70%% i poster sono rimandati, a budget esaurito gli eventi restanti")
+    parser.add_argument("--metrics-file", type=Path, metavar="FILE",
+                        help="Scrive le metriche dell'esecuzione in FILE (OpenMetrics, per il textfile collector)")
+    parser.add_argument("--pushgateway", metavar="URL",
+                        help="Invia le metriche dell'esecuzione al pushgateway Prometheus in URL")
+    parser.add_argument("--upload-workers", type=int, default=STORAGE_UPLOAD_WORKERS, metavar="N",
+                        help="Upload simultanei verso Supabase Storage (poster e shard pubblicati)")
+    parser.add_argument("--gc", action="store_true",
+                        help="Cancella dal bucket i poster non più usati da nessun evento, senza eseguire scraper (con --dry-run li elenca soltanto)")
+    parser.add_argument("--gc-min-age", type=float, default=STORAGE_GC_MIN_AGE_HOURS, metavar="HOURS",
+                        help="Con --gc non cancella i file modificati nelle ultime HOURS ore")
+    parser.add_argument("--publish", action="store_true",
+                        help="Al termine di un'esecuzione riuscita pubblica su Storage gli shard JSON statici e lo snapshot")
+    return parser.parse_args(argv)
+
+
+def format_deferred(result: SourceResult) -> str:
+    """Suffisso con quanto rimandato per il budget di tempo, vuoto se nulla"""
+    parts = []
+    if result.deferred_events:
+        parts.append(f"{result.deferred_events} events")
+    if result.deferred_posters:
+        parts.append(f"{result.deferred_posters} posters")
+    return f", ⏱️ deferred {' and '.join(parts)}" if parts else ""
+
+
+def format_memory(result: SourceResult) -> str:
+    """Suffisso con i picchi di memoria della sorgente, vuoto se non profilata"""
+    parts = []
+    if result.memory_peak is not None:
+        parts.append(f"traced peak {result.memory_peak / memory.MB:.1f} MB")
+    if result.peak_rss is not None:
+        # ru_maxrss è il picco dell'intero processo: non scende tra una sorgente e l'altra
+        parts.append(f"process peak RSS so far {result.peak_rss / memory.MB:.1f} MB")
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def annotate_memory(results: List[SourceResult]):
+    """Copia nei risultati i picchi di memoria misurati per sorgente, se il profiler è attivo"""
+    if memory.profiler is None:
         return
-    
-    # Pulisci eventi passati
-    print("\n🗑️  Deleting past events...")
+    peaks = memory.profiler.source_peaks()
+    for result in results:
+        if result.source in peaks:
+            result.memory_peak, result.peak_rss = peaks[result.source]
+
+
+def print_totals(results: List[SourceResult]):
+    """Stampa i totali per sorgente e complessivi"""
+    for result in results:
+        status = f"❌ {result.error}" if result.error else "✅"
+        duplicates = f", {result.duplicates} duplicates" if result.duplicates else ""
+        posters = f", {result.posters} posters" if result.posters else ""
+        logger.info("  %s %s: %d inserted, %d updated%s%s%s%s",
+                    status, result.source, result.inserted, result.updated, posters, duplicates, format_deferred(result), format_memory(result))
+
+    total_inserted = sum(result.inserted for result in results)
+    total_updated = sum(result.updated for result in results)
+    logger.info("✅ Total: %d inserted, %d updated", total_inserted, total_updated)
+
+
+def merge(paths: List[Path]) -> List[SourceResult]:
+    """Unisce i report scritti dai vari shard e ritorna i risultati per sorgente"""
+    reports = [ShardReport.read(path) for path in paths]
     try:
-        SupabaseManager.delete_past_events()
-        print("✅ Past events deleted")
-    except Exception as e:
-        print(f"⚠️  Failed to delete past events: {e}")
-    
-    scrapers = [
-        CSIScraper(),
-        FIASPScraper(),
-    ]
-    
-    total_inserted = 0
-    total_updated = 0
-    
+        missing = missing_shards(reports)
+    except ValueError as e:
+        logger.error("❌ Cannot merge shard results: %s", e)
+        raise SystemExit(1)
+    if missing:
+        logger.warning("⚠️  Missing shard results: %s", ", ".join(missing))
+        results = merge_reports(reports) + [SourceResult(source=f"shard {shard}", error="missing") for shard in missing]
+    else:
+        results = merge_reports(reports)
+
+    logger.info("🧩 Merged %d shard results:", len(reports))
+    print_totals(results)
+    return results
+
+
+def record_results(results: List[SourceResult]):
+    """Registra nelle metriche i totali per sorgente e lo stato di ciascuna"""
+    for result in results:
+        metrics.inc("events_scraped", result.parsed, source=result.source)
+        metrics.inc("events_inserted", result.inserted, source=result.source)
+        metrics.inc("events_updated", result.updated, source=result.source)
+        metrics.inc("events_duplicates", result.duplicates, source=result.source)
+        metrics.registry.set("source_up", 0 if result.error else 1, source=result.source)
+
+
+def export_metrics(args: argparse.Namespace, duration: float):
+    """Scrive e/o invia le metriche dell'esecuzione, se richiesto"""
+    if not args.metrics_file and not args.pushgateway:
+        return
+    metrics.registry.set("run_duration_seconds", duration)
+    metrics.registry.set("last_run_timestamp_seconds", time.time())
+
+    if args.metrics_file:
+        metrics.registry.write_textfile(args.metrics_file)
+        logger.info("📈 Metrics written to %s", args.metrics_file)
+    if args.pushgateway:
+        # Ogni shard ha il suo gruppo, altrimenti l'ultimo push sovrascrive gli altri
+        grouping = {"shard": args.shard.replace("/", "-")} if args.shard else None
+        try:
+            metrics.registry.push(args.pushgateway, grouping=grouping)
+            logger.info("📈 Metrics pushed to %s", args.pushgateway)
+        except Exception as e:
+            logger.warning("⚠️  Failed to push metrics to %s: %s", args.pushgateway, e)
+
+
+def publish_if_successful(results: List[SourceResult]):
+    """Pubblica shard e snapshot statici solo se tutte le sorgenti sono andate a buon fine"""
+    failed = [result.source for result in results if result.error]
+    if failed:
+        logger.warning("⚠️  Skipping publish, failed sources: %s", ", ".join(failed))
+        return
+    logger.info("📦 Publishing static event shards and snapshot...")
+    with metrics.timer("stage_duration_seconds", source="all", stage="publish"):
+        publish(upload=True)
+
+
+def select_scrapers(shard: Optional[Shard], dry_run: bool = False, budget: Optional[float] = None) -> List[BaseScraper]:
+    """Istanzia gli scraper registrati, filtrati e configurati per lo shard"""
+    scrapers = load_scrapers()
+    if shard and shard.mode == ShardMode.SOURCE:
+        scrapers = [scraper for scraper in scrapers if shard.owns(scraper.source_id)]
     for scraper in scrapers:
-        print(f"\n🔄 Running {scraper.source_name}...")
+        scraper.shard = shard
+        scraper.dry_run = dry_run
+        if budget is not None:
+            scraper.time_budget = budget
+    return scrapers
+
+
+def dry_run(
+    shard: Optional[Shard],
+    output: Optional[Path],
+    max_parallel: int = MAX_PARALLEL_SOURCES,
+    budget: Optional[float] = None,
+) -> List[SourceResult]:
+    """
+    Esegue solo fetch e parse e scrive gli eventi in JSONL man mano che sono pronti.
+    I log vanno su stderr, quindi su stdout escono solo gli eventi.
+    """
+    to_stdout = output is None or str(output) == "-"
+    with JsonlWriter(output) as writer:
+        logger.info("🧪 Dry run: no poster uploads, no database writes%s", f" (shard {shard} by {shard.mode.value})" if shard else "")
+        results = stream_scrapers(select_scrapers(shard, dry_run=True, budget=budget), writer.write, max_parallel)
+    annotate_memory(results)
+
+    for result in results:
+        status = f"❌ {result.error}" if result.error else "✅"
+        logger.info("  %s %s: %d events%s%s", status, result.source, result.parsed, format_deferred(result), format_memory(result))
+    logger.info("✅ Total: %d events written to %s", writer.count, "stdout" if to_stdout else output)
+    if memory.profiler is not None:
+        memory.profiler.report()
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Esegue tutti gli scraper e salva su Supabase"""
+    args = parse_args(argv)
+    # Log scritti in modo asincrono da una coda: va chiusa per non perdere gli ultimi record
+    log_session = setup_logging(args.log_level, json_format=args.log_json)
+    start = time.perf_counter()
+    try:
+        run(args)
+    finally:
+        # Attende gli upload ancora in corso e riporta il throughput ottenuto
+        SupabaseManager.close_uploader()
+        export_metrics(args, time.perf_counter() - start)
+        log_session.summary()
+        shutdown_logging()
+
+
+def run(args: argparse.Namespace):
+    """Esegue merge, dry run o scraping completo secondo gli argomenti"""
+    SupabaseManager.upload_workers = args.upload_workers
+    if args.merge:
+        results = merge(args.merge)
+        if args.publish:
+            publish_if_successful(results)
+        return
+
+    if args.gc:
+        logger.info("🧹 Collecting orphaned posters%s...", " (dry run)" if args.dry_run else "")
+        collect_garbage(dry_run=args.dry_run, min_age_hours=args.gc_min_age)
+        return
+
+    shard = Shard.parse(args.shard, ShardMode(args.shard_by)) if args.shard else None
+
+    if args.record or args.replay:
+        mode = ArchiveMode.RECORD if args.record else ArchiveMode.REPLAY
+        archive = http.enable_archive(args.record or args.replay, mode)
+        logger.info("📼 HTTP archive %s (%s)", archive.path, mode.value)
+
+    # Con la profilazione le sorgenti girano una alla volta, così le misure di tracemalloc sono attribuibili
+    max_parallel = MAX_PARALLEL_SOURCES
+    if args.profile_memory:
+        memory.enable_profiling(args.poster_memory_threshold)
+        max_parallel = 1
+
+    try:
+        if args.dry_run:
+            results = dry_run(shard, args.output, max_parallel, args.budget)
+        else:
+            results = scrape(args, shard, max_parallel)
+        record_results(results)
+    finally:
+        memory.disable_profiling()
+        archive = http.archive
+        http.close_archive()
+        if archive is not None:
+            misses = f", {archive.misses} requests not found in the archive" if archive.misses else ""
+            logger.info("📼 %d responses in %s%s", len(archive), archive.path, misses)
+
+
+def scrape(args: argparse.Namespace, shard: Optional[Shard], max_parallel: int = MAX_PARALLEL_SOURCES) -> List[SourceResult]:
+    """Esecuzione completa: pulizia del database, scraper, report dello shard e pubblicazione"""
+    logger.info("🚀 Starting Tapasciate scraper...%s", f" (shard {shard} by {shard.mode.value})" if shard else "")
+    # La deduplicazione confronta solo gli eventi raccolti da questo processo
+    if shard and shard.total > 1 and shard.mode != ShardMode.PROVINCE:
+        logger.warning("⚠️  Sharding by %s: duplicates in different shards are not merged (use --shard-by province)",
+                       shard.mode.value)
+
+    # Verifica env variables
+    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_KEY"):
+        logger.error("❌ SUPABASE_URL and SUPABASE_KEY environment variables required")
+        return []
+
+    # Pulisci eventi passati (una sola volta, dal primo shard)
+    if shard is None or shard.is_first:
+        logger.info("🗑️  Deleting past events...")
+        try:
+            SupabaseManager.delete_past_events()
+            logger.info("✅ Past events deleted")
+        except Exception as e:
+            logger.warning("⚠️  Failed to delete past events: %s", e)
+
+    # Chiavi normalizzate per gli eventi salvati prima della colonna event_key
+    if shard is None or shard.is_first:
         try:
-            inserted, updated = scraper.run()
-            print(f"✅ {scraper.source_name}: {inserted} inserted, {updated} updated")
-            total_inserted += inserted
-            total_updated += updated
+            keyed = SupabaseManager.backfill_event_keys()
+            if keyed:
+                logger.info("🔑 Computed event_key for %d existing events", keyed)
         except Exception as e:
-            print(f"❌ {scraper.source_name} failed: {e}")
-    
-    print(f"\n✅ Total: {total_inserted} inserted, {total_updated} updated")
-    print("✨ Scraping complete!")
+            logger.warning("⚠️  Failed to backfill event keys: %s", e)
+
+    # Con l'archivio HTTP la cache dei fallimenti resta in memoria, così il carico
+    # registrato e quello riprodotto non dipendono dalle esecuzioni precedenti
+    failure_cache = http.enable_failure_cache(None if http.archive is not None else FAILURE_CACHE_PATH)
+    # Lavoro rimandato dal budget di tempo, ripreso per primo alla prossima esecuzione (non con l'archivio)
+    if http.archive is None:
+        task_queue.enable_queue()
+
+    try:
+        results = run_scrapers(select_scrapers(shard, budget=args.budget), max_parallel)
+    finally:
+        task_queue.close_queue()
+    annotate_memory(results)
+
+    failure_cache.save()
+    if failure_cache.skipped:
+        logger.info("⏭️  Skipped %d known failing URLs (%d in failure cache)", failure_cache.skipped, len(failure_cache))
+
+    if args.results_out:
+        report_shard = shard or Shard(index=1, total=1)
+        ShardReport(shard=str(report_shard), mode=report_shard.mode, results=results).write(args.results_out)
+
+    logger.info("📊 Summary:")
+    print_totals(results)
+    if memory.profiler is not None:
+        memory.profiler.report()
+
+    if args.publish:
+        if shard is None:
+            publish_if_successful(results)
+        else:
+            logger.warning("⚠️  --publish ignored for a single shard: run it with --merge once all shards are done")
+
+    logger.info("✨ Scraping complete!")
+    return results
 
 
 if __name__ == "__main__":
@@ -3,5 +3,6 @@ Data models for the scraper.
 """
 from scraper.models.event import Event, Location
 from scraper.models.provinces import Province
+from scraper.models.source_result import SourceResult
 
-__all__ = ["Event", "Location", "Province"]
+__all__ = ["Event", "Location", "Province", "SourceResult"]
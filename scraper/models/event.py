@@ -1,9 +1,32 @@
 """
 Data models for events.
 """
-from typing import List, Optional, Literal
-from pydantic import BaseModel, HttpUrl
+import re
+import unicodedata
+from typing import List, Optional
+from pydantic import BaseModel, Field, HttpUrl
 from scraper.models.provinces import Province
+from scraper.dates import to_iso_or_none
+
+
+def canonical_title(title: str) -> str:
+    """
+    Titolo in forma canonica: minuscolo, senza accenti, punteggiatura e spazi superflui.
+
+    Es. "  38ª Camminata  dell'Amicizia! " → "38a camminata dell amicizia"
+    """
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(c for c in title if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", title).split())
+
+
+def make_event_key(title: str, date: str, province: str) -> str:
+    """
+    Chiave normalizzata di un evento: titolo canonico, data ISO e provincia.
+
+    Es. ("Camminata dei Colli", "01/05/2026", "BG") → "camminata dei colli|2026-05-01|BG"
+    """
+    return f"{canonical_title(title)}|{to_iso_or_none(date) or date}|{province}"
 
 
 class Location(BaseModel):
@@ -12,6 +35,16 @@ class Location(BaseModel):
     province: Province
     province_name: str
     region: str
+    lat: Optional[float] = None  # coordinate del comune (o del capoluogo se il comune non è in tabella)
+    lon: Optional[float] = None
+    approximate: bool = False  # True se lat/lon sono quelle del capoluogo di provincia
+
+
+class PosterJob(BaseModel):
+    """Poster da scaricare e caricare dopo il salvataggio dell'evento (vedi scraper.posters)."""
+    source: str  # source_id dello scraper che sa costruirlo
+    urls: List[str]  # file da scaricare (immagini CSI, link FIASP)
+    poster_source: Optional[str] = None  # link originale da salvare in events.poster_source
 
 
 class Event(BaseModel):
@@ -20,5 +53,15 @@ class Event(BaseModel):
     date: str  # format dd/mm/yyyy
     location: Location
     poster: Optional[HttpUrl] = None
-    source: Literal["CSI", "FIASP"]
-    distances: List[str]
\ No newline at end of file
+    poster_source: Optional[str] = None  # link originale del poster sulla sorgente
+    poster_fingerprint: Optional[str] = None  # sha256 del file scaricato da poster_source
+    source: str  # source_id dello scraper (es. "CSI", "FIASP")
+    distances: List[str]
+    distances_km: List[float] = []  # valori numerici di distances, per i filtri per intervallo
+    # Poster in attesa: l'evento è salvato con poster NULL e il poster aggiunto dopo
+    poster_job: Optional[PosterJob] = Field(default=None, exclude=True)
+
+    @property
+    def event_key(self) -> str:
+        """Chiave usata per riconoscere l'evento su Supabase (colonna events.event_key)."""
+        return make_event_key(self.title, self.date, self.location.province.value)
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+Per-source outcome of a scraper run.
+"""
+from typing import Optional
+from pydantic import BaseModel
+
+
+class SourceResult(BaseModel):
+    """Totali di una singola sorgente al termine dell'esecuzione."""
+    source: str
+    parsed: int = 0  # eventi raccolti dalla sorgente, prima della deduplicazione
+    inserted: int = 0
+    updated: int = 0
+    duplicates: int = 0  # eventi scartati perché già presenti in una sorgente prioritaria
+    posters: int = 0  # poster attaccati dopo il salvataggio degli eventi (vedi scraper.posters)
+    # Rimandati alla prossima esecuzione perché il budget di tempo della sorgente è esaurito
+    deferred_events: int = 0
+    deferred_posters: int = 0
+    error: Optional[str] = None
+    # Solo con --profile-memory: picco tracciato da tracemalloc tra gli stadi e picco RSS
+    # del processo raggiunto a fine sorgente (cumulativo, include le sorgenti precedenti), in byte
+    memory_peak: Optional[int] = None
+    peak_rss: Optional[int] = None
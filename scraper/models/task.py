@@ -0,0 +1,32 @@
+"""
+Task types and states for the local work queue.
+"""
+from enum import Enum
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+
+class TaskKind(str, Enum):
+    """Tipi di lavoro che possono essere messi in coda."""
+    FETCH_DETAIL = "fetch_detail"  # pagina di dettaglio rimandata dal budget di tempo
+    DOWNLOAD_POSTER = "download_poster"  # poster rimandato dal budget di tempo
+
+
+class TaskStatus(str, Enum):
+    """Stato di un task nella coda."""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Task(BaseModel):
+    """Task reclamato da un worker."""
+    id: int
+    kind: TaskKind
+    payload: Dict[str, Any]
+    status: TaskStatus
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    worker: Optional[str] = None
@@ -0,0 +1,116 @@
+"""
+Poster backfill, the second phase of saving events.
+
+Events are saved as soon as they are parsed, with poster NULL: downloading,
+converting and uploading a poster is slow, so scrapers only describe it with a
+PosterJob attached to the event. Once every source has saved its events, the
+pending posters of all sources are built by a pool of workers and the
+resulting Storage URLs are attached to the saved rows in batched updates.
+Posters that fail or are deferred by the time budget stay as they are in the
+database (never overwritten with NULL) and are retried at the next run; the
+deferred ones are remembered in the task queue and built first. A poster the
+source no longer links is cleared when the event is saved.
+"""
+from __future__ import annotations
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from scraper.config import POSTER_WORKERS, POSTER_PATCH_BATCH_SIZE
+from scraper.db.supabase_client import SupabaseManager
+from scraper.models.event import Event
+from scraper.utils import memory, metrics
+
+if TYPE_CHECKING:
+    from scraper.scrapers.base import BaseScraper
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_posters(
+    scrapers: Sequence["BaseScraper"],
+    events: Iterable[Event],
+    workers: Optional[int] = None,
+    batch_size: int = POSTER_PATCH_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Costruisce i poster in attesa degli eventi salvati e li attacca alle righe su Supabase.
+
+    Ogni poster è costruito dallo scraper indicato in PosterJob.source, anche quando
+    l'evento è stato fuso in quello di un'altra sorgente dalla deduplicazione.
+
+    Args:
+        scrapers: Scraper che hanno prodotto gli eventi
+        events: Eventi già salvati (dopo la deduplicazione)
+        workers: Poster costruiti in parallelo (default POSTER_WORKERS per sorgente con poster in attesa)
+        batch_size: Poster attaccati per ogni chiamata al database
+
+    Returns:
+        Numero di poster attaccati per source_id dello scraper che li ha costruiti
+    """
+    owners = {scraper.source_id: scraper for scraper in scrapers}
+    pending = [
+        event for event in events
+        if event.poster is None and event.poster_job is not None and event.poster_job.source in owners
+    ]
+    attached: Counter = Counter()
+    batch: List[Tuple[str, dict]] = []
+
+    def flush():
+        if not batch:
+            return
+        # Una chiamata per sorgente: il database conta solo le righe davvero aggiornate
+        by_source: Dict[str, List[dict]] = {}
+        for source, patch in batch:
+            by_source.setdefault(source, []).append(patch)
+        for source, patches in by_source.items():
+            try:
+                updated = SupabaseManager.patch_posters(patches)
+            except Exception as e:
+                logger.error("❌ Failed to attach %d %s posters: %s", len(patches), source, e)
+                continue
+            attached[source] += updated
+            if updated < len(patches):
+                logger.warning("⚠️ %d %s posters matched no saved event", len(patches) - updated, source)
+        batch.clear()
+
+    try:
+        # I poster rimandati dall'esecuzione precedente vengono costruiti per primi
+        resumed: Set[str] = set()
+        for scraper in scrapers:
+            resumed |= scraper.start_posters()
+        if not pending:
+            return {}
+        pending.sort(key=lambda event: event.event_key not in resumed)
+        sources = {event.poster_job.source for event in pending}
+        workers = workers or POSTER_WORKERS * len(sources)
+        logger.info("🖼️  Building %d pending posters...", len(pending))
+
+        with memory.stage("all", "posters"), metrics.timer("stage_duration_seconds", source="all", stage="posters"):
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poster") as executor:
+                futures = {executor.submit(_build, owners[event.poster_job.source], event): event for event in pending}
+                # I poster pronti sono attaccati a blocchi mentre gli altri sono ancora in costruzione
+                for future in as_completed(futures):
+                    event = futures[future]
+                    columns = future.result()
+                    if columns:
+                        batch.append((event.poster_job.source, {"event_key": event.event_key, **columns}))
+                    if len(batch) >= batch_size:
+                        flush()
+                flush()
+
+        total = sum(attached.values())
+        logger.info("🖼️  Attached %d posters%s", total, f", {len(pending) - total} left for the next run" if total < len(pending) else "")
+        return dict(attached)
+    finally:
+        for scraper in scrapers:
+            scraper.finish_posters()
+
+
+def _build(scraper: "BaseScraper", event: Event) -> Optional[dict]:
+    """Costruisce un poster isolando gli errori: un poster fallito non ferma gli altri."""
+    try:
+        return scraper.build_poster(event)
+    except Exception as e:
+        scraper.log.warning("⚠️ Failed to build poster for %s: %s", event.title, e)
+        return None
@@ -0,0 +1,264 @@
+"""
+Publish stage: precomputed static JSON shards of upcoming events.
+
+Events are partitioned by region and month into gzip-compressed JSON files
+(e.g. "lombardia/2026-05.json.gz") described by a small manifest.json, so the
+frontend can download only the slices it needs instead of the whole table.
+A full snapshot of all upcoming events is also written under a content-hashed
+name (e.g. "snapshots/events-3f2a….json.gz"), which can be cached forever by
+the CDN: the short-lived manifest points to the current version.
+The files are written to a local directory and optionally uploaded to
+Supabase Storage. The manifest is uploaded only when every file it points to
+(shards and snapshot) was uploaded; shards it no longer lists are then removed
+from the bucket, and only the most recent snapshots are kept.
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from scraper.config import PUBLISH_DIR, PUBLISH_CACHE_CONTROL, PUBLISH_SNAPSHOT_CACHE_CONTROL, PUBLISH_SNAPSHOTS_KEPT
+from scraper.db.supabase_client import SupabaseManager
+from scraper.utils.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+SNAPSHOT_DIR = "snapshots"
+
+
+def slugify(text: str) -> str:
+    """Es. "Friuli-Venezia Giulia" → "friuli-venezia-giulia"."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "unknown"
+
+
+def event_record(row: dict) -> dict:
+    """
+    Converte una riga di SupabaseManager.fetch_upcoming_events nel formato
+    Event del frontend (frontend/src/types), con le coordinate della location.
+    """
+    location = row.get("location") or {}
+    return {
+        "title": row["name"],
+        "date": row["date"],
+        "location": {
+            "city": location.get("city"),
+            "province": location.get("province"),
+            "province_name": location.get("province_name"),
+            "region": location.get("region"),
+            "lat": location.get("lat"),
+            "lon": location.get("lon"),
+            "approximate": bool(location.get("approximate")),
+        },
+        "poster": row.get("poster"),
+        "source": row.get("organizer"),
+        "distances": row.get("distances") or [],
+        "distances_km": row.get("distances_km") or [],
+    }
+
+
+def partition(records: Iterable[dict]) -> Dict[Tuple[str, str], List[dict]]:
+    """
+    Raggruppa gli eventi per (regione, mese YYYY-MM), mantenendo l'ordine per data.
+    """
+    shards: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+    for record in sorted(records, key=lambda r: (r["date"], r["title"])):
+        region = record["location"]["region"] or "Sconosciuta"
+        shards[(region, record["date"][:7])].append(record)
+    return dict(shards)
+
+
+def compress_json(data) -> bytes:
+    """JSON compatto compresso con gzip; mtime=0 rende l'output identico a parità di contenuto."""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def build_snapshot(records: Iterable[dict]) -> Tuple[str, bytes, dict]:
+    """
+    Costruisce lo snapshot completo degli eventi, versionato con l'hash del contenuto.
+
+    Returns:
+        (percorso relativo, bytes gzip, voce del manifest con count, bytes, sha256 ed etag)
+    """
+    events = sorted(records, key=lambda r: (r["date"], r["title"]))
+    content = compress_json(events)
+    digest = hashlib.sha256(content).hexdigest()
+    path = f"{SNAPSHOT_DIR}/events-{digest[:16]}.json.gz"
+    return path, content, {
+        "path": path,
+        "count": len(events),
+        "bytes": len(content),
+        "sha256": digest,
+        "etag": f'"{digest}"',
+    }
+
+
+def build_publication(records: Iterable[dict], generated_at: Optional[datetime] = None) -> Tuple[Dict[str, bytes], dict]:
+    """
+    Costruisce gli shard e il manifest.
+
+    Args:
+        records: Eventi nel formato di event_record
+        generated_at: Timestamp da scrivere nel manifest (default: adesso)
+
+    Returns:
+        ({percorso relativo: bytes gzip}, manifest)
+    """
+    records = list(records)
+    files: Dict[str, bytes] = {}
+    entries = []
+    for (region, month), events in sorted(partition(records).items()):
+        path = f"{slugify(region)}/{month}.json.gz"
+        content = compress_json(events)
+        files[path] = content
+        entries.append({
+            "region": region,
+            "month": month,
+            "path": path,
+            "count": len(events),
+            "bytes": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        })
+
+    snapshot_path, snapshot, snapshot_entry = build_snapshot(records)
+    files[snapshot_path] = snapshot
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": (generated_at or datetime.now(timezone.utc)).isoformat(timespec="seconds"),
+        "total": sum(entry["count"] for entry in entries),
+        "regions": sorted({entry["region"] for entry in entries}),
+        "months": sorted({entry["month"] for entry in entries}),
+        "shards": entries,
+        "snapshot": snapshot_entry,
+    }
+    return files, manifest
+
+
+def write_publication(files: Dict[str, bytes], manifest: dict, out_dir: Path | str):
+    """Scrive shard e manifest in out_dir, rimuovendo gli shard non più presenti."""
+    out_dir = Path(out_dir)
+    for stale in out_dir.glob("*/*.json.gz"):
+        if stale.relative_to(out_dir).as_posix() not in files:
+            stale.unlink()
+    for path, content in files.items():
+        target = out_dir / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def upload_publication(files: Dict[str, bytes], manifest: dict) -> int:
+    """
+    Carica shard e manifest su Supabase Storage.
+    Il manifest viene caricato per ultimo e solo se tutti i file (shard e snapshot) sono stati
+    caricati, così non punta mai a file mancanti; dopo il manifest vengono cancellati gli shard
+    non più elencati e gli snapshot oltre PUBLISH_SNAPSHOTS_KEPT.
+
+    Returns:
+        Numero di file caricati con successo
+    """
+    def upload_shard(item: Tuple[str, bytes]) -> Optional[str]:
+        path, content = item
+        cache_control = PUBLISH_SNAPSHOT_CACHE_CONTROL if path.startswith(f"{SNAPSHOT_DIR}/") else PUBLISH_CACHE_CONTROL
+        return SupabaseManager.upload_public_file(path, content, "application/gzip", cache_control)
+
+    # Gli shard sono indipendenti: caricati in parallelo, fino agli upload simultanei dell'uploader
+    with ThreadPoolExecutor(max_workers=SupabaseManager.upload_workers, thread_name_prefix="publish") as executor:
+        urls = list(executor.map(upload_shard, files.items()))
+    failed = [path for path, url in zip(files, urls) if not url]
+    uploaded = len(files) - len(failed)
+    if failed:
+        logger.error("❌ %d files failed to upload, manifest not updated: %s", len(failed), ", ".join(failed[:5]))
+        return uploaded
+
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+    if not SupabaseManager.upload_public_file(MANIFEST_NAME, manifest_bytes, "application/json", PUBLISH_CACHE_CONTROL):
+        return uploaded
+    try:
+        prune_publication(files)
+    except Exception as e:
+        logger.warning("⚠️  Failed to remove stale files from Storage: %s", e)
+    return uploaded + 1
+
+
+def prune_publication(files: Dict[str, bytes], keep_snapshots: int = PUBLISH_SNAPSHOTS_KEPT) -> List[str]:
+    """
+    Cancella dal bucket gli shard non più presenti nella pubblicazione (es. mesi passati)
+    e gli snapshot più vecchi. Gli snapshot precedenti restano per chi ha ancora in cache
+    un manifest che li indica.
+
+    Args:
+        files: File della pubblicazione appena caricata
+        keep_snapshots: Snapshot da conservare, compreso quello appena caricato
+
+    Returns:
+        Percorsi cancellati
+    """
+    shards, snapshots = [], []
+    for entry in SupabaseManager.list_public_files():
+        path = entry["name"]
+        if path.startswith(f"{SNAPSHOT_DIR}/"):
+            if path not in files:
+                snapshots.append(entry)
+        elif path.endswith(".json.gz") and path not in files:
+            shards.append(path)
+
+    # Dal più recente: quello corrente occupa già uno dei posti
+    snapshots.sort(key=lambda entry: entry.get("updated_at") or "", reverse=True)
+    old_snapshots = [entry["name"] for entry in snapshots[max(keep_snapshots - 1, 0):]]
+
+    stale = shards + old_snapshots
+    if not stale:
+        return []
+    removed = SupabaseManager.delete_public_files(stale)
+    logger.info("🧹 Removed %d stale shards and %d old snapshots from Storage", len(shards), len(old_snapshots))
+    return removed
+
+
+def publish(out_dir: Path | str = PUBLISH_DIR, upload: bool = False) -> dict:
+    """
+    Esegue lo stadio di pubblicazione sugli eventi futuri presenti su Supabase.
+
+    Args:
+        out_dir: Cartella locale in cui scrivere shard e manifest
+        upload: Se True carica anche i file su Supabase Storage
+
+    Returns:
+        Il manifest pubblicato
+    """
+    records = [event_record(row) for row in SupabaseManager.fetch_upcoming_events()]
+    files, manifest = build_publication(records)
+    write_publication(files, manifest, out_dir)
+
+    total_bytes = sum(entry["bytes"] for entry in manifest["shards"])
+    snapshot = manifest["snapshot"]
+    logger.info(
+        "📦 Published %d events in %d shards (%.1f KB) to %s",
+        manifest["total"], len(manifest["shards"]), total_bytes / 1024, out_dir,
+    )
+    logger.info("📸 Snapshot %s (%.1f KB)", snapshot["path"], snapshot["bytes"] / 1024)
+
+    if upload:
+        uploaded = upload_publication(files, manifest)
+        logger.info("☁️  Uploaded %d/%d files to Storage", uploaded, len(files) + 1)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pubblica gli eventi in shard JSON statici per regione e mese")
+    parser.add_argument("--out", type=Path, default=Path(PUBLISH_DIR), help="Cartella di output")
+    parser.add_argument("--upload", action="store_true", help="Carica i file su Supabase Storage")
+    args = parser.parse_args()
+    setup_logging()
+    publish(args.out, upload=args.upload)
@@ -0,0 +1,150 @@
+"""
+Parallel scheduler running many scraper sources under global limits.
+
+Sources run in phases: all of them are collected in parallel, the
+collected events are deduplicated across sources, then each source saves
+its remaining events (with poster NULL) and finally the pending posters of
+all sources are built and attached (see scraper.posters). In dry-run mode
+events are instead streamed to a writer as soon as they are parsed.
+"""
+from __future__ import annotations
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from scraper.config import MAX_PARALLEL_SOURCES
+from scraper.models.event import Event
+from scraper.models.source_result import SourceResult
+from scraper.posters import backfill_posters
+from scraper.scrapers.base import BaseScraper
+from scraper.utils import http, metrics
+from scraper.utils.dedup import deduplicate
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_one(scraper: BaseScraper) -> Tuple[Optional[List[Event]], Optional[str]]:
+    """Raccoglie gli eventi di un singolo scraper isolando gli errori."""
+    scraper.log.info("🔄 Running %s...", scraper.source_name)
+    try:
+        return scraper.collect(), None
+    except Exception as e:
+        scraper.log.error("❌ %s failed: %s", scraper.source_name, e)
+        return None, str(e)
+
+
+def _save_one(scraper: BaseScraper, events: List[Event]) -> SourceResult:
+    """Salva gli eventi di un singolo scraper isolando gli errori."""
+    try:
+        inserted, updated = scraper.save(events)
+    except Exception as e:
+        scraper.log.error("❌ %s failed: %s", scraper.source_name, e)
+        return SourceResult(source=scraper.source_id, error=str(e))
+
+    scraper.log.info("✅ %s: %d inserted, %d updated", scraper.source_name, inserted, updated)
+    return SourceResult(source=scraper.source_id, inserted=inserted, updated=updated)
+
+
+def _configure_hosts(scrapers: List[BaseScraper]):
+    for scraper in scrapers:
+        for host in scraper.hosts:
+            http.limiter.configure(host, scraper.max_concurrency)
+
+
+def _stream_one(scraper: BaseScraper, write: Callable[[Event], None]) -> SourceResult:
+    """Passa a write gli eventi di un singolo scraper man mano che sono pronti, isolando gli errori."""
+    scraper.log.info("🔄 Running %s...", scraper.source_name)
+    parsed = 0
+    try:
+        for event in scraper.stream():
+            write(event)
+            parsed += 1
+    except Exception as e:
+        scraper.log.error("❌ %s failed: %s", scraper.source_name, e)
+        return SourceResult(source=scraper.source_id, parsed=parsed, error=str(e))
+
+    scraper.log.info("✅ %s: %d events parsed", scraper.source_name, parsed)
+    return SourceResult(
+        source=scraper.source_id, parsed=parsed,
+        deferred_events=scraper.deferred_events, deferred_posters=scraper.deferred_posters,
+    )
+
+
+def stream_scrapers(
+    scrapers: List[BaseScraper],
+    write: Callable[[Event], None],
+    max_parallel: int = MAX_PARALLEL_SOURCES,
+) -> List[SourceResult]:
+    """
+    Esegue gli scraper in parallelo senza salvare: ogni evento è passato a write appena
+    parsato (senza deduplicazione tra sorgenti). write deve essere thread-safe.
+
+    Returns:
+        Un SourceResult per scraper con il numero di eventi parsati
+    """
+    if not scrapers:
+        return []
+
+    _configure_hosts(scrapers)
+    workers = max(1, min(max_parallel, len(scrapers)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="source") as executor:
+        return list(executor.map(lambda scraper: _stream_one(scraper, write), scrapers))
+
+
+def run_scrapers(
+    scrapers: List[BaseScraper],
+    max_parallel: int = MAX_PARALLEL_SOURCES,
+    dedup: bool = True,
+) -> List[SourceResult]:
+    """
+    Esegue gli scraper in parallelo applicando i limiti per host dichiarati da ciascuno.
+
+    Args:
+        scrapers: Istanze da eseguire, in ordine di priorità per la deduplicazione
+        max_parallel: Numero massimo di sorgenti eseguite contemporaneamente
+        dedup: Se True scarta gli eventi già raccolti da una sorgente precedente
+
+    Returns:
+        Un SourceResult per scraper, nello stesso ordine di input
+    """
+    if not scrapers:
+        return []
+
+    _configure_hosts(scrapers)
+
+    workers = max(1, min(max_parallel, len(scrapers)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="source") as executor:
+        collected = list(executor.map(_collect_one, scrapers))
+
+        batches = [events or [] for events, _ in collected]
+        if dedup:
+            with metrics.timer("stage_duration_seconds", source="all", stage="dedup"):
+                deduplicated, removed = deduplicate(batches)
+            if removed:
+                logger.info("🔗 Merged %d duplicate events across sources", removed)
+        else:
+            deduplicated = batches
+
+        to_save = [i for i, (events, _) in enumerate(collected) if events is not None]
+        saved = dict(zip(to_save, executor.map(lambda i: _save_one(scrapers[i], deduplicated[i]), to_save)))
+
+    # I dati degli eventi sono già sul database: i poster arrivano dopo, per tutte le sorgenti insieme
+    stored = [event for i in to_save if saved[i].error is None for event in deduplicated[i]]
+    try:
+        posters = backfill_posters(scrapers, stored)
+    except Exception as e:
+        logger.error("❌ Poster backfill failed: %s", e)
+        posters = {}
+
+    results = []
+    for i, (scraper, (events, error)) in enumerate(zip(scrapers, collected)):
+        if error is not None:
+            results.append(SourceResult(source=scraper.source_id, error=error))
+            continue
+        result = saved[i]
+        result.parsed = len(events)
+        result.duplicates = len(events) - len(deduplicated[i])
+        result.deferred_events = scraper.deferred_events
+        result.deferred_posters = scraper.deferred_posters
+        result.posters = posters.get(scraper.source_id, 0)
+        results.append(result)
+    return results
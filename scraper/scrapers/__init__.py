@@ -1,8 +1,22 @@
 """
 Scraper implementations.
+
+The concrete scrapers are imported on first access, so importing
+scraper.scrapers.base (e.g. from tests or tooling) does not load every source
+with its dependencies.
 """
+from importlib import import_module
 from scraper.scrapers.base import BaseScraper
-from scraper.scrapers.csi_scraper import CSIScraper
-from scraper.scrapers.fiasp_scraper import FIASPScraper
+
+_LAZY = {
+    "CSIScraper": "scraper.scrapers.csi_scraper",
+    "FIASPScraper": "scraper.scrapers.fiasp_scraper",
+}
 
 __all__ = ["BaseScraper", "CSIScraper", "FIASPScraper"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,18 +2,62 @@
 Base scraper class defining the interface for all scrapers.
 """
 from __future__ import annotations
+import logging
+import os
 import re
-import img2pdf
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple, List
-from scraper.models.event import Event
+from typing import ClassVar, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple, List, TypeVar
+from scraper.models.event import Event, Location, PosterJob
+from scraper.dates import to_iso_many
 from scraper.models.operation import Operation
+from scraper.sharding import Shard, ShardMode
+from scraper.db import task_queue
 from scraper.db.supabase_client import SupabaseManager
+from scraper.models.task import Task, TaskKind
+from scraper.posters import backfill_posters
+from scraper.utils.geocoder import enrich_events, geocode_event
+from scraper.utils import memory, metrics
+from scraper.utils.deadline import Deadline
+from scraper.config import POSTER_BUDGET_SHARE, SOURCE_TIME_BUDGET
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
 
 
 class BaseScraper(ABC):
     """Abstract base class for event scrapers."""
 
+    # Identificativo univoco della sorgente, usato come chiave nel registry e in Event.source
+    source_id: ClassVar[str]
+
+    # Host contattati dallo scraper e richieste simultanee consentite verso ciascuno
+    hosts: ClassVar[Tuple[str, ...]] = ()
+    max_concurrency: ClassVar[int] = 1
+
+    # Shard assegnato a questa esecuzione; None elabora tutto
+    shard: Optional[Shard] = None
+
+    # Solo fetch e parse: niente download/upload dei poster né accessi al database
+    dry_run: bool = False
+
+    # Budget di tempo della raccolta in secondi (None = nessun limite). Oltre POSTER_BUDGET_SHARE
+    # i poster vengono rimandati; a budget esaurito lo scraper smette di leggere nuovi eventi.
+    # Quanto rimandato resta com'è sul database; con la coda dei task attiva (task_queue.enable_queue)
+    # viene ricordato e ripreso per primo alla prossima esecuzione.
+    time_budget: Optional[float] = SOURCE_TIME_BUDGET
+    _defer_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self):
+        """Stato per istanza: gli scraper che ridefiniscono __init__ chiamano super().__init__()."""
+        self.deadline = Deadline()
+        self.deferred_posters = 0
+        self.deferred_events = 0
+        # Poster ripresi e rimandati durante il backfill (vedi start_posters/finish_posters)
+        self._resumed_posters: Dict[str, Task] = {}
+        self._deferred_poster_keys: List[str] = []
+
     @property
     @abstractmethod
     def source_name(self) -> str:
@@ -26,27 +70,230 @@ class BaseScraper(ABC):
         """Nome dell'organizzatore da salvare su Supabase"""
         pass
 
+    @property
+    def log(self) -> logging.LoggerAdapter:
+        """Logger del modulo dello scraper che etichetta i record con la sorgente (vedi utils.log)."""
+        return logging.LoggerAdapter(logging.getLogger(type(self).__module__), {"source": self.source_id})
+
     @abstractmethod
     def _fetch_events(self) -> list[Event]:
         """Scarica e parsa gli eventi dalla sorgente. Implementato da ogni scraper."""
         pass
 
+    def _iter_events(self) -> Iterator[Event]:
+        """
+        Come _fetch_events ma restituisce gli eventi man mano che sono pronti.
+        Gli scraper possono ridefinirlo per non accumulare la lista in memoria.
+        """
+        yield from self._fetch_events()
+
     def run(self) -> Tuple[int, int]:
-        """Esegue lo scraping e salva su Supabase. Comune a tutti gli scraper."""
-        events = self._fetch_events()
+        """Esegue lo scraping e salva su Supabase, poi attacca i poster. Comune a tutti gli scraper."""
+        events = self.collect()
+        result = self.save(events)
+        backfill_posters([self], events)
+        return result
+
+    def collect(self) -> List[Event]:
+        """
+        Fase 1: scarica, parsa e arricchisce gli eventi, senza scrivere sul database.
+        Il budget di tempo resta fermo da qui a start_posters: i poster di tutte le sorgenti
+        sono costruiti insieme, e l'attesa delle sorgenti più lente non deve consumarlo.
+        """
+        self._start_budget()
+        try:
+            with memory.stage(self.source_id, "collect"), metrics.timer("stage_duration_seconds", source=self.source_id, stage="collect"):
+                return enrich_events(self._fetch_events())
+        finally:
+            self.deadline.pause()
+
+    def stream(self) -> Iterator[Event]:
+        """Come collect, ma un evento alla volta (usato da --dry-run)."""
+        self._start_budget()
+        with memory.stage(self.source_id, "stream"), metrics.timer("stage_duration_seconds", source=self.source_id, stage="stream"):
+            for event in self._iter_events():
+                yield geocode_event(event)
 
+    def save(self, events: List[Event]) -> Tuple[int, int]:
+        """
+        Fase 2: salva su Supabase gli eventi raccolti (eventualmente già deduplicati).
+
+        Returns:
+            (inseriti, aggiornati)
+        """
+        with memory.stage(self.source_id, "save"), metrics.timer("stage_duration_seconds", source=self.source_id, stage="save"):
+            return self._save_events(events)
+
+    def _save_events(self, events: List[Event]) -> Tuple[int, int]:
         inserted = 0
         updated = 0
 
+        # Conversione in blocco delle date: gli eventi con data non valida non arrivano al database
+        iso_dates = to_iso_many(event.date for event in events)
+        invalid = [event for event, iso in zip(events, iso_dates) if iso is None]
+        if invalid:
+            self.log.warning(
+                "⚠️ Skipped %d events with invalid date: %s",
+                len(invalid), ", ".join(f"{e.title} ({e.date!r})" for e in invalid[:5]),
+            )
+            events = [event for event, iso in zip(events, iso_dates) if iso is not None]
+            metrics.inc("events_failed", len(invalid), source=self.source_id)
+
+        # Una sola ricerca a blocchi degli eventi esistenti invece di una SELECT per evento
+        event_ids = SupabaseManager.fetch_event_ids([event.event_key for event in events]) if events else {}
+
         for event in events:
-            result = self._save_event(event)
+            result = self._save_event(event, event_ids)
             if result == Operation.INSERTED:
                 inserted += 1
             elif result == Operation.UPDATED:
                 updated += 1
+            else:
+                metrics.inc("events_failed", source=self.source_id)
 
         return (inserted, updated)
 
+    def build_poster(self, event: Event) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Fase 3: costruisce il poster in attesa di un evento già salvato (vedi scraper.posters).
+
+        Returns:
+            Colonne poster, poster_source e poster_fingerprint da attaccare all'evento,
+            o None se il poster è fallito o rimandato per il budget di tempo
+        """
+        if event.poster_job is None:
+            return None
+        if not self._poster_allowed():
+            with self._defer_lock:
+                self._deferred_poster_keys.append(event.event_key)
+            return None
+        return self._build_poster(event)
+
+    def _build_poster(self, event: Event) -> Optional[Dict[str, Optional[str]]]:
+        """Scarica, converte e carica il poster descritto da event.poster_job. Implementato dagli scraper con poster."""
+        return None
+
+    def start_posters(self) -> Set[str]:
+        """
+        Chiamato a inizio backfill dei poster: riprende il budget di tempo fermato a fine collect.
+
+        Returns:
+            event_key dei poster rimandati dall'esecuzione precedente, da costruire per primi
+        """
+        self.deadline.resume()
+        self._deferred_poster_keys = []
+        self._resumed_posters = self._resume_deferred(TaskKind.DOWNLOAD_POSTER)
+        return set(self._resumed_posters)
+
+    def finish_posters(self):
+        """
+        Chiamato a fine backfill dei poster: ricorda i poster rimandati in questa esecuzione.
+        Gli scraper che lo ridefiniscono (es. per salvare le cache dei download) chiamano super().
+        """
+        self._finish_deferred(self._resumed_posters.values())
+        self._remember_deferred(TaskKind.DOWNLOAD_POSTER, self._deferred_poster_keys)
+        self._resumed_posters = {}
+        self._deferred_poster_keys = []
+
+    def _poster_job(self, urls: List[str], poster_source: Optional[str] = None) -> Optional[PosterJob]:
+        """PosterJob per i file in urls, o None se non ci sono file o in dry run."""
+        if not urls or self.dry_run:
+            return None
+        return PosterJob(source=self.source_id, urls=urls, poster_source=poster_source)
+
+    def _start_budget(self):
+        """Avvia il budget di tempo e azzera i contatori di quanto rimandato."""
+        self.deadline = Deadline(self.time_budget)
+        self.deferred_posters = 0
+        self.deferred_events = 0
+
+    def _poster_allowed(self) -> bool:
+        """
+        False se la quota del budget riservata ai poster è esaurita: il poster viene
+        rimandato e l'evento resta senza toccare quello già presente sul database.
+        """
+        if not self.deadline.expired(POSTER_BUDGET_SHARE):
+            return True
+        with self._defer_lock:
+            self.deferred_posters += 1
+            first = self.deferred_posters == 1
+        if first:
+            self.log.warning("⏱️ %s: poster budget exhausted after %.0fs, remaining posters deferred to next run",
+                             self.source_name, self.deadline.elapsed())
+        metrics.inc("deferred", source=self.source_id, kind="poster")
+        return False
+
+    def _defer_events(self, count: int, keys: Iterable[str] = ()):
+        """
+        Registra gli eventi non letti perché il budget di tempo è esaurito.
+
+        Args:
+            count: Eventi rimandati
+            keys: Chiavi degli eventi (es. URL di dettaglio) da riprendere per prime alla prossima esecuzione
+        """
+        if count <= 0:
+            return
+        with self._defer_lock:
+            self.deferred_events += count
+        self._remember_deferred(TaskKind.FETCH_DETAIL, keys)
+        self.log.warning("⏱️ %s: time budget exhausted after %.0fs, %d events deferred to next run",
+                         self.source_name, self.deadline.elapsed(), count)
+        metrics.inc("deferred", count, source=self.source_id, kind="event")
+
+    def _deferred_prefix(self, kind: TaskKind) -> str:
+        """Prefisso delle dedupe_key del lavoro rimandato da questa sorgente (e da questo shard)."""
+        shard = f"@{self.shard}" if self.shard else ""
+        return f"{self.source_id}{shard}:{kind.value}:"
+
+    def _resume_deferred(self, kind: TaskKind) -> Dict[str, Task]:
+        """
+        Reclama il lavoro rimandato dalle esecuzioni precedenti per questa sorgente.
+        I task vanno chiusi con _finish_deferred prima di rimandare di nuovo le stesse chiavi.
+
+        Returns:
+            Chiave → task reclamato (vuoto se la coda non è attiva o in dry run)
+        """
+        queue = task_queue.queue
+        if queue is None or self.dry_run:
+            return {}
+        worker = f"{self.source_id}-{os.getpid()}"
+        prefix = self._deferred_prefix(kind)
+        resumed: Dict[str, Task] = {}
+        while (task := queue.claim(worker, [kind], prefix)) is not None:
+            resumed[task.payload["key"]] = task
+        if resumed:
+            self.log.info("⏱️ %s: resuming %d %s deferred by the previous run", self.source_name, len(resumed), kind.value)
+        return resumed
+
+    def _finish_deferred(self, tasks: Iterable[Task]):
+        """Chiude i task ripresi con _resume_deferred."""
+        queue = task_queue.queue
+        if queue is None:
+            return
+        for task in tasks:
+            queue.complete(task)
+
+    def _remember_deferred(self, kind: TaskKind, keys: Iterable[str]):
+        """Accoda le chiavi rimandate, da riprendere per prime alla prossima esecuzione."""
+        queue = task_queue.queue
+        if queue is None or self.dry_run:
+            return
+        prefix = self._deferred_prefix(kind)
+        for key in keys:
+            queue.enqueue(kind, {"source": self.source_id, "key": key}, dedupe_key=prefix + key)
+
+    def _shard_rows(self, rows: Sequence[T]) -> Sequence[T]:
+        """In modalità ROW ritorna solo le righe assegnate a questo shard."""
+        if self.shard and self.shard.mode == ShardMode.ROW:
+            return self.shard.slice(rows)
+        return rows
+
+    def _in_shard(self, location: Location) -> bool:
+        """In modalità PROVINCE verifica che la provincia appartenga a questo shard."""
+        if self.shard and self.shard.mode == ShardMode.PROVINCE:
+            return self.shard.owns(location.province.value)
+        return True
+
     @staticmethod
     def _make_poster_filename(prefix: str, title: str, date: str) -> str:
         """
@@ -76,20 +323,32 @@ class BaseScraper(ABC):
         Returns:
             Bytes del PDF, o None in caso di errore.
         """
+        # Import al primo uso: img2pdf (con Pillow) rallenta l'avvio di chi non converte poster
+        import img2pdf
+
         try:
             return img2pdf.convert(image_bytes_list)
         except Exception as e:
-            print(f"⚠️ Failed to convert poster images to PDF: {e}")
+            logger.warning("⚠️ Failed to convert poster images to PDF: %s", e)
             return None
 
-    def _save_event(self, event: Event) -> Operation:
-        """Salva un evento su Supabase. Comune a tutti gli scraper."""
+    def _save_event(self, event: Event, event_ids: Optional[Dict[str, int]] = None) -> Operation:
+        """
+        Salva un evento su Supabase. Comune a tutti gli scraper.
+
+        Args:
+            event: Evento da salvare
+            event_ids: event_key → id degli eventi già presenti (vedi SupabaseManager.fetch_event_ids)
+        """
         try:
             location_id = SupabaseManager.upsert_location(
                 city=event.location.city,
                 province=event.location.province,
                 province_name=event.location.province_name,
-                region=event.location.region
+                region=event.location.region,
+                lat=event.location.lat,
+                lon=event.location.lon,
+                approximate=event.location.approximate
             )
 
             operation = SupabaseManager.upsert_event(
@@ -99,15 +358,22 @@ class BaseScraper(ABC):
                 organizer=self.organizer,
                 url=None,
                 poster=event.poster,
-                distances=event.distances
+                distances=event.distances,
+                distances_km=event.distances_km,
+                poster_source=event.poster_source,
+                poster_fingerprint=event.poster_fingerprint,
+                event_key=event.event_key,
+                event_ids=event_ids,
+                keep_poster=event.poster_job is not None
             )
 
+            # Un record per evento: solo a livello DEBUG
             if operation == Operation.INSERTED:
-                print(f"✅ Inserted: {event.title}")
+                self.log.debug("✅ Inserted: %s", event.title)
             else:
-                print(f"🔄 Updated: {event.title}")
+                self.log.debug("🔄 Updated: %s", event.title)
 
             return operation
         except Exception as e:
-            print(f"❌ Failed: {event.title} - {e}")
+            self.log.error("❌ Failed: %s - %s", event.title, e)
             return Operation.FAILED
@@ -2,14 +2,18 @@
 Scraper for CSI Bergamo events.
 """
 from __future__ import annotations
-import requests
 import time
-import datetime
-from typing import Optional
+from datetime import date
+from typing import Iterator, Optional
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from scraper.scrapers.base import BaseScraper
 from scraper.models.event import Event
+from scraper.dates import ITALIAN_MONTHS, italian_date
 from scraper.models.provinces import Province
+from scraper.models.task import TaskKind
+from scraper.sharding import ShardMode
+from scraper.utils import http, memory, metrics
 from scraper.utils.parsers import parse_location
 from scraper.config import BASE_CSI_BERGAMO, CSI_LIST, REQUEST_DELAY, REQUEST_TIMEOUT
 from scraper.db.supabase_client import SupabaseManager
@@ -18,6 +22,18 @@ from scraper.db.supabase_client import SupabaseManager
 class CSIScraper(BaseScraper):
     """Scraper for CSI Bergamo walking events."""
 
+    source_id = "CSI"
+    hosts = (urlparse(BASE_CSI_BERGAMO).netloc,)
+    max_concurrency = 1
+
+    # Data di riferimento per inferire l'anno degli eventi; None = oggi
+    today: Optional[date] = None
+
+    # Altri comitati CSI con lo stesso sito possono sottoclassare ridefinendo questi attributi
+    base_url = BASE_CSI_BERGAMO
+    list_url = CSI_LIST
+    default_province = Province.BG
+
     @property
     def source_name(self) -> str:
         return "CSI Bergamo"
@@ -28,28 +44,64 @@ class CSIScraper(BaseScraper):
     
     def _fetch_events(self) -> list[Event]:
         """Scarica eventi dal sito CSI"""
+        return list(self._iter_events())
+
+    def _iter_events(self) -> Iterator[Event]:
+        """Scarica eventi dal sito CSI, restituendoli man mano"""
+        if not self._owns_province_shard():
+            self.log.info("⏭️ %s runs in the shard of %s, skipped in shard %s",
+                          self.source_name, self.default_province.value, self.shard)
+            return
         try:
-            resp = requests.get(CSI_LIST, timeout=REQUEST_TIMEOUT)
+            resp = http.get(self.list_url, timeout=REQUEST_TIMEOUT)
             resp.raise_for_status()
         except Exception as e:
-            print(f"❌ Failed to fetch CSI list: {e}")
-            return []
+            self.log.error("❌ Failed to fetch CSI list: %s", e)
+            return
         
         soup = BeautifulSoup(resp.text, "html.parser")
         lista = soup.find("ul", class_="latestnews-items")
         
         if not lista:
-            print("⚠️ CSI list not found")
-            return []
-        
-        events = []
-        for li in lista.find_all("li", recursive=False):
+            self.log.warning("⚠️ CSI list not found")
+            return
+        
+        items = self._shard_rows(lista.find_all("li", recursive=False))
+        # I dettagli rimandati dall'esecuzione precedente vengono letti per primi,
+        # così gli ultimi eventi della lista non restano esclusi ad ogni esecuzione
+        resumed = self._resume_deferred(TaskKind.FETCH_DETAIL)
+        if resumed:
+            items = sorted(items, key=lambda li: self._detail_url(li) not in resumed)
+        for i, li in enumerate(items):
+            # Ogni evento richiede la pagina di dettaglio: a budget esaurito i restanti sono rimandati
+            if self.deadline.expired():
+                self._finish_deferred(resumed.values())
+                rest = [self._detail_url(li) for li in items[i:]]
+                self._defer_events(len(items) - i, [url for url in rest if url])
+                return
             event = self._parse_event_item(li)
             if event:
-                events.append(event)
-                time.sleep(REQUEST_DELAY)
-        
-        return events
+                yield event
+                # In replay non c'è un server da rispettare
+                if not http.is_replaying():
+                    time.sleep(REQUEST_DELAY)
+        self._finish_deferred(resumed.values())
+
+    def _owns_province_shard(self) -> bool:
+        """
+        In modalità PROVINCE la provincia di un evento CSI si conosce solo dalla pagina di
+        dettaglio: filtrare dopo averla scaricata moltiplicherebbe le richieste per il numero
+        di shard. La sorgente viene quindi eseguita per intero dallo shard della sua provincia
+        (default_province), dove finiscono comunque quasi tutti i suoi eventi.
+        """
+        if self.shard and self.shard.mode == ShardMode.PROVINCE:
+            return self.shard.owns(self.default_province.value)
+        return True
+
+    def _detail_url(self, li) -> Optional[str]:
+        """URL della pagina di dettaglio di una voce della lista."""
+        a = li.find("a", href=True)
+        return self.base_url + a["href"] if a else None
     
     def _parse_event_item(self, li) -> Event | None:
         """Parse singolo evento dalla lista"""
@@ -57,13 +109,13 @@ class CSIScraper(BaseScraper):
         if not a:
             return None
         
-        detail_url = BASE_CSI_BERGAMO + a["href"]
+        detail_url = self._detail_url(li)
         
         try:
-            r = requests.get(detail_url, timeout=REQUEST_TIMEOUT)
+            r = http.get(detail_url, timeout=REQUEST_TIMEOUT)
             r.raise_for_status()
         except Exception as e:
-            print(f"⚠️ Failed to fetch detail: {detail_url} — {e}")
+            self.log.warning("⚠️ Failed to fetch detail: %s — %s", detail_url, e)
             return None
         
         soup = BeautifulSoup(r.text, "html.parser")
@@ -71,7 +123,7 @@ class CSIScraper(BaseScraper):
         # Parse location
         title_tag = soup.find("h2", class_="contentheading")
         location_raw = title_tag.get_text(strip=True) if title_tag else a.get_text(strip=True)
-        location = parse_location(location_raw, default_province=Province.BG)
+        location = parse_location(location_raw, default_province=self.default_province)
         
         # Parse content and title
         content = soup.find("div", class_="jsn-article-content")
@@ -81,57 +133,69 @@ class CSIScraper(BaseScraper):
         # Parse date
         date = self._parse_date(soup)
         
-        # Parse poster: scarica tutte le immagini, crea PDF, carica su Storage
-        poster_url = self._extract_and_upload_poster(content, title, date)
+        # Parse poster: le immagini vengono unite in un PDF e caricate su Storage
+        # dopo il salvataggio dell'evento (vedi scraper.posters)
+        poster_job = self._poster_job(self._extract_poster_urls(content))
         
         try:
             return Event(
                 title=title,
                 date=date,
                 location=location,
-                poster=poster_url,
-                source="CSI",
-                distances=[]
+                source=self.source_id,
+                distances=[],
+                poster_job=poster_job
             )
         except Exception as e:
-            print(f"⚠️ Skipped invalid CSI event: {e}")
+            self.log.warning("⚠️ Skipped invalid CSI event: %s", e)
             return None
 
-    def _extract_and_upload_poster(self, content, title: str, date: str) -> Optional[str]:
-        """
-        Raccoglie tutte le immagini del poster, le unisce in un PDF
-        e lo carica su Supabase Storage. Ritorna l'URL pubblico.
-        """
+    def _extract_poster_urls(self, content) -> list[str]:
+        """URL assoluti di tutte le immagini del poster nel contenuto della pagina."""
         if not content:
-            return None
+            return []
+        urls = []
+        for img in content.find_all("img"):
+            src = img.get("src")
+            if src:
+                urls.append(f"{self.base_url}{src}" if src.startswith("/") else src)
+        return urls
 
-        # Raccogli tutti i src delle immagini nel contenuto
-        imgs = content.find_all("img")
-        if not imgs:
+    def _build_poster(self, event: Event) -> Optional[dict]:
+        """Poster CSI: PDF di tutte le immagini della pagina, senza link sorgente da confrontare."""
+        url = self._upload_poster_images(event.poster_job.urls, event.title, event.date)
+        if not url:
             return None
+        return {"poster": url, "poster_source": None, "poster_fingerprint": None}
 
+    def _upload_poster_images(self, urls: list[str], title: str, date: str) -> Optional[str]:
+        """
+        Scarica tutte le immagini del poster, le unisce in un PDF
+        e lo carica su Supabase Storage. Ritorna l'URL pubblico.
+        """
         image_bytes_list = []
-        for img in imgs:
-            src = img.get("src")
-            if not src:
-                continue
-            url = f"{BASE_CSI_BERGAMO}{src}" if src.startswith("/") else src
+        for url in urls:
             try:
-                resp = requests.get(url, timeout=REQUEST_TIMEOUT)
+                resp = http.get(url, timeout=REQUEST_TIMEOUT, skip_known_failures=True)
                 resp.raise_for_status()
                 image_bytes_list.append(resp.content)
             except Exception as e:
-                print(f"⚠️ Failed to download poster image {url}: {e}")
+                self.log.warning("⚠️ Failed to download poster image %s: %s", url, e)
 
         if not image_bytes_list:
             return None
 
         pdf_bytes = self._images_to_pdf(image_bytes_list)
+        # Immagini scaricate e PDF restano in memoria insieme fino all'upload
+        memory.record_poster(self.source_id, title, date, sum(map(len, image_bytes_list)) + len(pdf_bytes or b""))
         if not pdf_bytes:
             return None
 
         filename = self._make_poster_filename("csi", title, date)
-        return SupabaseManager.upload_poster(filename, pdf_bytes)
+        url = SupabaseManager.upload_poster(filename, pdf_bytes)
+        if url:
+            metrics.inc("posters_uploaded", source=self.source_id)
+        return url
 
     def _extract_poster(self, content) -> Optional[str]:
         """
@@ -147,7 +211,7 @@ class CSIScraper(BaseScraper):
         
         src = first_img["src"]
         if src.startswith("/"):
-            return f"{BASE_CSI_BERGAMO}{src}"
+            return f"{self.base_url}{src}"
         return src
 
     def _parse_date(self, soup: BeautifulSoup) -> str:
@@ -162,16 +226,15 @@ class CSIScraper(BaseScraper):
         if not day or not month:
             return ""
         
-        month_map = {
-            "Gennaio": "01", "Febbraio": "02", "Marzo": "03",
-            "Aprile": "04", "Maggio": "05", "Giugno": "06",
-            "Luglio": "07", "Agosto": "08", "Settembre": "09",
-            "Ottobre": "10", "Novembre": "11", "Dicembre": "12"
-        }
+        day_str = day.get_text(strip=True)
+        month_str = month.get_text(strip=True)
         
-        day_str = day.get_text(strip=True).zfill(2)
-        month_str = month_map.get(month.get_text(strip=True), "01")
-        year_str = str(datetime.datetime.now().year)
+        # La pagina mostra solo giorno e mese: l'anno è inferito rispetto a oggi (vedi scraper.dates.infer_year)
+        parsed = italian_date(day_str, month_str, self.today)
+        if parsed:
+            return parsed
         
-        return f"{day_str}/{month_str}/{year_str}"
+        if month_str.lower() not in ITALIAN_MONTHS:
+            self.log.warning("⚠️ Unknown month '%s' in CSI event page", month_str)
+        return f"{day_str.zfill(2)}/00/{(self.today or date.today()).year}"
 
@@ -2,14 +2,16 @@
 Scraper for FIASP events.
 """
 from __future__ import annotations
-import re
-import requests
-from typing import Optional
-from urllib.parse import urlparse, parse_qs
+import hashlib
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 from scraper.scrapers.base import BaseScraper
 from scraper.models.event import Event
-from scraper.utils.parsers import parse_location, parse_distances
+from scraper.dates import to_iso_or_none
+from scraper.utils import http, memory, metrics
+from scraper.utils.gdrive import GoogleDriveFetcher, extract_file_id
+from scraper.utils.parsers import parse_location, parse_distances, parse_distances_km
 from scraper.config import FIASP_URL, REQUEST_TIMEOUT
 from scraper.db.supabase_client import SupabaseManager
 
@@ -17,6 +19,19 @@ from scraper.db.supabase_client import SupabaseManager
 class FIASPScraper(BaseScraper):
     """Scraper for FIASP walking events."""
 
+    source_id = "FIASP"
+    hosts = (urlparse(FIASP_URL).netloc,)
+    max_concurrency = 1
+
+    def __init__(self):
+        super().__init__()
+        # Poster già su Storage: (titolo, data ISO) → riga events con poster_source/fingerprint
+        self._known_posters: Dict[Tuple[str, str], dict] = {}
+        # sha256 dei file scaricati in questa esecuzione, per link sorgente
+        self._poster_fingerprints: Dict[str, str] = {}
+        # I file Drive falliti passano dalla cache dei fallimenti condivisa (http.failures)
+        self._drive = GoogleDriveFetcher()
+
     @property
     def source_name(self) -> str:
         return "FIASP Italia"
@@ -27,31 +42,42 @@ class FIASPScraper(BaseScraper):
 
     def _fetch_events(self) -> list[Event]:
         """Scarica eventi dal sito FIASP"""
+        return list(self._iter_events())
+
+    def _iter_events(self) -> Iterator[Event]:
+        """Scarica eventi dal sito FIASP, restituendoli man mano"""
         try:
-            resp = requests.get(FIASP_URL, timeout=REQUEST_TIMEOUT)
+            resp = http.get(FIASP_URL, timeout=REQUEST_TIMEOUT)
             resp.raise_for_status()
         except Exception as e:
-            print(f"❌ Failed to fetch FIASP events: {e}")
-            return []
+            self.log.error("❌ Failed to fetch FIASP events: %s", e)
+            return
 
-        return self._parse_html(resp.text)
+        if not self.dry_run:
+            try:
+                self._known_posters = SupabaseManager.fetch_poster_index(self.organizer)
+            except Exception as e:
+                self.log.warning("⚠️ Failed to load existing posters, all posters will be downloaded: %s", e)
+
+        yield from self._iter_html(resp.text)
 
     def _parse_html(self, html: str) -> list[Event]:
         """Parse la tabella HTML di FIASP"""
+        return list(self._iter_html(html))
+
+    def _iter_html(self, html: str) -> Iterator[Event]:
+        """Parse la tabella HTML di FIASP, restituendo gli eventi nell'ordine delle righe"""
         soup = BeautifulSoup(html, "html.parser")
         table = soup.find("table")
 
         if not table:
-            print("⚠️ FIASP table not found")
-            return []
+            self.log.warning("⚠️ FIASP table not found")
+            return
 
-        events = []
-        for row in table.find_all("tr")[1:]:  # Skip header
-            event = self._parse_row(row)
-            if event:
-                events.append(event)
+        rows = self._shard_rows(table.find_all("tr")[1:])  # Skip header
 
-        return events
+        # Le righe non fanno richieste di rete: i poster sono scaricati in parallelo nel backfill
+        yield from (event for event in map(self._parse_row, rows) if event)
 
     def _parse_row(self, row) -> Event | None:
         """Parse singola riga della tabella"""
@@ -64,14 +90,24 @@ class FIASPScraper(BaseScraper):
         title = cols[1].get_text(strip=True)
         location_raw = cols[2].get_text(strip=True)
         location = parse_location(location_raw)
+        if not self._in_shard(location):
+            return None
 
-        # Parse poster link: scarica e carica su Supabase Storage
+        # Parse poster link: riusa il poster già caricato se il link non è cambiato,
+        # altrimenti viene scaricato e caricato su Storage dopo il salvataggio (vedi scraper.posters)
         raw_poster = self._extract_poster(cols)
-        poster = self._download_and_upload_poster(raw_poster, title, date) if raw_poster else None
+        poster, fingerprint, poster_job = None, None, None
+        if raw_poster and not self.dry_run:
+            known = self._known_poster(title, date)
+            if known and known.get("poster_source") == raw_poster:
+                poster, fingerprint = known["poster"], known.get("poster_fingerprint")
+            else:
+                poster_job = self._poster_job([raw_poster], poster_source=raw_poster)
 
         # Parse distances
         distances_raw = cols[3].get_text(strip=True) if len(cols) > 3 else ""
         distances = parse_distances(distances_raw)
+        distances_km = parse_distances_km(distances_raw)
 
         try:
             return Event(
@@ -79,12 +115,28 @@ class FIASPScraper(BaseScraper):
                 date=date,
                 location=location,
                 poster=poster,
-                source="FIASP",
-                distances=distances
+                poster_source=raw_poster if poster or self.dry_run else None,
+                poster_fingerprint=fingerprint if poster else None,
+                source=self.source_id,
+                distances=distances,
+                distances_km=distances_km,
+                poster_job=poster_job
             )
         except Exception as e:
-            print(f"⚠️ Skipped invalid FIASP event: {e}")
+            self.log.warning("⚠️ Skipped invalid FIASP event: %s", e)
+            return None
+
+    def _build_poster(self, event: Event) -> Optional[dict]:
+        """Poster FIASP: file del link originale, con lo sha256 per riconoscerlo se il link cambia."""
+        raw_url = event.poster_job.poster_source
+        poster = self._download_and_upload_poster(raw_url, event.title, event.date)
+        if not poster:
             return None
+        return {"poster": poster, "poster_source": raw_url, "poster_fingerprint": self._poster_fingerprints.get(raw_url)}
+
+    def _known_poster(self, title: str, date: str) -> Optional[dict]:
+        """Ritorna il poster già caricato per l'evento, se presente su Supabase."""
+        return self._known_posters.get((title, to_iso_or_none(date) or date))
 
     def _extract_poster(self, cols) -> str | None:
         """Estrae link grezzo al poster/flyer dalla colonna 7."""
@@ -98,50 +150,33 @@ class FIASPScraper(BaseScraper):
         return a_tag["href"].strip()
 
     def _extract_gdrive_file_id(self, url: str) -> Optional[str]:
-        """
-        Estrae il file ID da un URL Google Drive.
-
-        Supporta:
-          - https://drive.google.com/file/d/FILE_ID/view
-          - https://drive.google.com/open?id=FILE_ID
-          - https://drive.google.com/uc?id=FILE_ID
-        """
-        match = re.search(r'drive\.google\.com/file/d/([^/?&]+)', url)
-        if match:
-            return match.group(1)
-
-        parsed = urlparse(url)
-        if 'drive.google.com' in parsed.netloc:
-            params = parse_qs(parsed.query)
-            if 'id' in params:
-                return params['id'][0]
-
-        return None
+        """Estrae il file ID da un URL Google Drive (vedi gdrive.extract_file_id)."""
+        return extract_file_id(url)
 
     def _download_poster_bytes(self, url: str) -> Optional[tuple[bytes, str]]:
         """
-        Scarica il file da URL. Per Google Drive costruisce l'URL di download diretto.
+        Scarica il file da URL. I link Google Drive passano dal GoogleDriveFetcher,
+        che gestisce la pagina di conferma antivirus; entrambi usano la cache dei fallimenti.
         Ritorna (bytes, content_type) o None in caso di errore.
         """
         file_id = self._extract_gdrive_file_id(url)
         if file_id:
-            download_url = f"https://drive.usercontent.google.com/download?id={file_id}&export=download"
-        else:
-            download_url = url
+            return self._drive.fetch(file_id)
 
         try:
-            resp = requests.get(download_url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            resp = http.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=True, skip_known_failures=True)
             resp.raise_for_status()
 
             content_type = resp.headers.get('Content-Type', '')
 
             if 'text/html' in content_type:
-                print(f"⚠️ Got HTML response instead of file for poster: {url}")
+                self.log.warning("⚠️ Got HTML response instead of file for poster: %s", url)
+                http.record_failure(url, "HTMLResponse")
                 return None
 
             return resp.content, content_type
         except Exception as e:
-            print(f"⚠️ Failed to download poster {url}: {e}")
+            self.log.warning("⚠️ Failed to download poster %s: %s", url, e)
             return None
 
     def _download_and_upload_poster(self, raw_url: str, title: str, date: str) -> Optional[str]:
@@ -154,11 +189,26 @@ class FIASPScraper(BaseScraper):
             return None
 
         file_bytes, content_type = result
-
-        if 'image/' in content_type:
-            file_bytes = self._images_to_pdf([file_bytes])
-            if not file_bytes:
-                return None
-
-        filename = self._make_poster_filename("fiasp", title, date)
-        return SupabaseManager.upload_poster(filename, file_bytes)
+        # File scaricato più l'eventuale PDF convertito, tenuti in memoria insieme
+        held = len(file_bytes)
+        try:
+            # Stesso contenuto già caricato (es. link cambiato ma file identico): niente upload
+            fingerprint = hashlib.sha256(file_bytes).hexdigest()
+            self._poster_fingerprints[raw_url] = fingerprint
+            known = self._known_poster(title, date)
+            if known and known.get("poster_fingerprint") == fingerprint:
+                return known["poster"]
+
+            if 'image/' in content_type:
+                file_bytes = self._images_to_pdf([file_bytes])
+                if not file_bytes:
+                    return None
+                held += len(file_bytes)
+
+            filename = self._make_poster_filename("fiasp", title, date)
+            url = SupabaseManager.upload_poster(filename, file_bytes)
+            if url:
+                metrics.inc("posters_uploaded", source=self.source_id)
+            return url
+        finally:
+            memory.record_poster(self.source_id, title, date, held)
@@ -0,0 +1,87 @@
+"""
+Registry of scraper plugins.
+
+Scrapers are discovered from the SCRAPER_PLUGINS list in config, from the
+TAPASCIATE_SCRAPERS environment variable and from the entry point group
+SCRAPER_ENTRY_POINT_GROUP of installed packages.
+"""
+from __future__ import annotations
+import logging
+import os
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional, Type
+from scraper.config import SCRAPER_PLUGINS, SCRAPER_ENTRY_POINT_GROUP
+from scraper.scrapers.base import BaseScraper
+
+logger = logging.getLogger(__name__)
+
+_REGISTRY: Dict[str, Type[BaseScraper]] = {}
+
+
+def register_scraper(cls: Type[BaseScraper]) -> Type[BaseScraper]:
+    """
+    Registra una classe scraper con il suo source_id. Utilizzabile come decoratore.
+
+    Raises:
+        ValueError: se un'altra classe è già registrata con lo stesso source_id
+    """
+    existing = _REGISTRY.get(cls.source_id)
+    if existing is not None and existing is not cls:
+        raise ValueError(f"Duplicate scraper source_id '{cls.source_id}': {existing.__name__} and {cls.__name__}")
+    _REGISTRY[cls.source_id] = cls
+    return cls
+
+
+def _load_spec(spec: str) -> Type[BaseScraper]:
+    """Importa una classe scraper da una stringa "modulo:Classe"."""
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Invalid scraper plugin '{spec}', expected 'module:Class'")
+    return getattr(import_module(module_name.strip()), attr.strip())
+
+
+def discover_scrapers() -> Dict[str, Type[BaseScraper]]:
+    """
+    Carica tutti i plugin configurati e ritorna il registry.
+
+    Returns:
+        Dizionario source_id → classe scraper, nell'ordine di registrazione
+    """
+    specs = list(SCRAPER_PLUGINS)
+    extra = os.getenv("TAPASCIATE_SCRAPERS", "")
+    specs += [spec for spec in extra.split(",") if spec.strip()]
+
+    for spec in specs:
+        register_scraper(_load_spec(spec))
+
+    for ep in entry_points(group=SCRAPER_ENTRY_POINT_GROUP):
+        try:
+            register_scraper(ep.load())
+        except Exception as e:
+            logger.warning("⚠️ Failed to load scraper plugin '%s': %s", ep.name, e)
+
+    return dict(_REGISTRY)
+
+
+def load_scrapers(source_ids: Optional[List[str]] = None) -> List[BaseScraper]:
+    """
+    Istanzia gli scraper registrati.
+
+    Args:
+        source_ids: Sorgenti da abilitare; None per tutte
+
+    Returns:
+        Lista di istanze scraper
+
+    Raises:
+        ValueError: se una sorgente richiesta non è registrata
+    """
+    registry = discover_scrapers()
+    if source_ids is None:
+        return [cls() for cls in registry.values()]
+
+    unknown = [source_id for source_id in source_ids if source_id not in registry]
+    if unknown:
+        raise ValueError(f"Unknown scraper sources: {', '.join(unknown)}")
+    return [registry[source_id]() for source_id in source_ids]
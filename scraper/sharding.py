@@ -0,0 +1,127 @@
+"""
+Deterministic work sharding across runners, and merging of per-shard results.
+"""
+from __future__ import annotations
+import json
+import zlib
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, TypeVar
+from pydantic import BaseModel, ConfigDict
+from scraper.models.source_result import SourceResult
+
+T = TypeVar("T")
+
+
+class ShardMode(str, Enum):
+    """Criterio con cui il lavoro viene diviso tra gli shard."""
+    SOURCE = "source"      # ogni shard esegue un sottoinsieme delle sorgenti
+    ROW = "row"            # ogni shard elabora un intervallo contiguo delle righe di ogni sorgente
+    PROVINCE = "province"  # ogni shard elabora solo gli eventi di alcune province
+
+
+class Shard(BaseModel):
+    """Shard index/total, con index da 1 a total (come `--shard=1/3` di Playwright)."""
+    model_config = ConfigDict(frozen=True)
+
+    index: int
+    total: int
+    mode: ShardMode = ShardMode.SOURCE
+
+    @classmethod
+    def parse(cls, spec: str, mode: ShardMode = ShardMode.SOURCE) -> "Shard":
+        """
+        Crea uno Shard da una stringa "i/N".
+
+        Raises:
+            ValueError: se la stringa non è valida o i non è compreso tra 1 e N
+        """
+        index_str, sep, total_str = spec.partition("/")
+        if not sep or not index_str.strip().isdigit() or not total_str.strip().isdigit():
+            raise ValueError(f"Invalid shard '{spec}', expected 'i/N' with integers (e.g. 1/4)")
+        index, total = int(index_str), int(total_str)
+        if total < 1 or not 1 <= index <= total:
+            raise ValueError(f"Invalid shard '{spec}': index must be between 1 and {total}")
+        return cls(index=index, total=total, mode=mode)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.total}"
+
+    @property
+    def is_first(self) -> bool:
+        """Il primo shard esegue anche le operazioni globali (es. pulizia eventi passati)."""
+        return self.index == 1
+
+    def owns(self, key: str) -> bool:
+        """Assegna una chiave a uno shard in modo stabile tra esecuzioni e processi."""
+        return zlib.crc32(key.encode("utf-8")) % self.total == self.index - 1
+
+    def slice(self, items: Sequence[T]) -> Sequence[T]:
+        """Ritorna l'intervallo contiguo di items assegnato a questo shard."""
+        count = len(items)
+        start = count * (self.index - 1) // self.total
+        end = count * self.index // self.total
+        return items[start:end]
+
+
+class ShardReport(BaseModel):
+    """Risultati di un singolo shard, scritti su file per il merge finale."""
+    shard: str
+    mode: ShardMode
+    results: List[SourceResult]
+
+    def write(self, path: Path):
+        path.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+
+    @classmethod
+    def read(cls, path: Path) -> "ShardReport":
+        return cls.model_validate(json.loads(path.read_text(encoding="utf-8")))
+
+
+def merge_reports(reports: Iterable[ShardReport]) -> List[SourceResult]:
+    """
+    Somma i risultati di più shard per sorgente.
+
+    Returns:
+        Un SourceResult per sorgente, con gli errori dei vari shard concatenati
+    """
+    merged: Dict[str, SourceResult] = {}
+    for report in reports:
+        for result in report.results:
+            total = merged.setdefault(result.source, SourceResult(source=result.source))
+            total.parsed += result.parsed
+            total.inserted += result.inserted
+            total.updated += result.updated
+            total.duplicates += result.duplicates
+            total.posters += result.posters
+            total.deferred_events += result.deferred_events
+            total.deferred_posters += result.deferred_posters
+            # Gli shard girano su runner diversi: della memoria conta il massimo
+            for field in ("memory_peak", "peak_rss"):
+                values = [v for v in (getattr(total, field), getattr(result, field)) if v is not None]
+                if values:
+                    setattr(total, field, max(values))
+            if result.error:
+                error = f"[{report.shard}] {result.error}"
+                total.error = f"{total.error}; {error}" if total.error else error
+    return list(merged.values())
+
+
+def missing_shards(reports: Iterable[ShardReport]) -> List[str]:
+    """
+    Ritorna gli shard attesi ma assenti tra i report (es. un runner fallito).
+
+    Raises:
+        ValueError: se i report non vengono dalla stessa suddivisione (N o criterio diversi)
+    """
+    reports = list(reports)
+    if not reports:
+        return []
+    shards = [Shard.parse(report.shard, report.mode) for report in reports]
+    splits = {(shard.total, shard.mode) for shard in shards}
+    if len(splits) > 1:
+        found = ", ".join(f"{report.shard} by {report.mode.value}" for report in reports)
+        raise ValueError(f"Shard reports come from different splits: {found}")
+    total = shards[0].total
+    present = {shard.index for shard in shards}
+    return [f"{i}/{total}" for i in range(1, total + 1) if i not in present]
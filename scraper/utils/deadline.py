@@ -0,0 +1,55 @@
+"""
+Wall-clock budget for a scraper run.
+"""
+from __future__ import annotations
+import time
+from typing import Callable, Optional
+
+
+class Deadline:
+    """
+    Scadenza calcolata da un budget in secondi a partire dalla creazione.
+    Senza budget (None) non scade mai. Il tempo trascorso tra pause() e resume()
+    non consuma il budget.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            seconds: Budget in secondi; None per nessun limite
+            clock: Orologio monotono, iniettabile nei test
+        """
+        self.seconds = seconds
+        self._clock = clock
+        self._start = clock()
+        self._paused_at: Optional[float] = None
+
+    def elapsed(self) -> float:
+        now = self._paused_at if self._paused_at is not None else self._clock()
+        return now - self._start
+
+    def pause(self):
+        """Ferma il conteggio del tempo (es. mentre la sorgente attende le altre)."""
+        if self._paused_at is None:
+            self._paused_at = self._clock()
+
+    def resume(self):
+        """Riprende il conteggio da dove era stato fermato; senza pausa non fa nulla."""
+        if self._paused_at is not None:
+            self._start += self._clock() - self._paused_at
+            self._paused_at = None
+
+    def remaining(self) -> float:
+        """Secondi rimasti (infinito se senza budget, mai negativo)."""
+        if self.seconds is None:
+            return float("inf")
+        return max(0.0, self.seconds - self.elapsed())
+
+    def expired(self, share: float = 1.0) -> bool:
+        """
+        True se è trascorsa la frazione share del budget.
+
+        Es. expired(0.7) diventa vero dopo il 70% del tempo: usato per fermare
+        prima il lavoro a bassa priorità (poster) e lasciare il resto ai dati degli eventi.
+        """
+        return self.seconds is not None and self.elapsed() >= self.seconds * share
@@ -0,0 +1,147 @@
+"""
+Cross-source event deduplication.
+
+Events are blocked by (ISO date, province), so only events of the same day and
+province are ever compared, however each source formats the date: the cost stays linear in the number of events
+times the (small) block size instead of pairwise over the whole batch.
+Inside a block, titles are compared after normalization (accents, edition
+numbers and generic words such as "camminata" removed) with a trigram Dice
+coefficient plus a token overlap score relative to the longer title, so a
+short title contained in a longer one (e.g. "san giovanni" in "festa san
+giovanni bianco") does not match on containment alone.
+
+Deduplication only sees the events collected in the same run: with
+--shard-by source (or row) duplicates in different shards are not merged.
+"""
+from __future__ import annotations
+import re
+from typing import Dict, FrozenSet, List, Sequence, Set, Tuple
+from scraper.config import DEDUP_THRESHOLD
+from scraper.dates import to_iso_or_none
+from scraper.models.event import Event, canonical_title
+
+# Parole generiche che non distinguono una manifestazione dall'altra
+_STOPWORDS = frozenset("""
+    a al alla alle all ai agli con d da dal dall dalla de dei del dell della delle di e ed gli i il in
+    l la le lo nel nell nella per su sull tra un una uno
+    camminata camminate marcia marce passeggiata corsa podistica podistiche ludico motoria motorie
+    non competitiva competitive edizione trofeo memorial
+""".split())
+
+# Numero d'edizione in testa al titolo: "38", "38a", "38ma", "xxv"
+_EDITION = re.compile(r"^(\d+(a|ma|esima)?|[ivxlc]+)$")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizza un titolo per il confronto tra sorgenti.
+
+    Es. "38ª Camminata di Spinone al Lago" → "spinone lago"
+    """
+    tokens = canonical_title(title).split()
+    if tokens and _EDITION.match(tokens[0]):
+        tokens = tokens[1:]
+    return " ".join(token for token in tokens if token not in _STOPWORDS)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Signature:
+    """Titolo normalizzato con token e trigrammi precalcolati, per confronti ripetuti nel blocco."""
+
+    __slots__ = ("text", "tokens", "trigrams")
+
+    def __init__(self, title: str):
+        self.text = normalize_title(title)
+        self.tokens: FrozenSet[str] = frozenset(self.text.split())
+        self.trigrams = _trigrams(self.text) if self.text else set()
+
+
+def _similarity(a: _Signature, b: _Signature) -> float:
+    if not a.text or not b.text:
+        return 0.0
+    if a.text == b.text:
+        return 1.0
+    # Token in comune pesati sul titolo più lungo: un titolo breve contenuto in uno lungo
+    # (es. "san giovanni" in "festa san giovanni bianco") non basta per un match
+    overlap = len(a.tokens & b.tokens) / max(len(a.tokens), len(b.tokens))
+    dice = 2 * len(a.trigrams & b.trigrams) / (len(a.trigrams) + len(b.trigrams))
+    return max(overlap, dice)
+
+
+def title_similarity(a: str, b: str) -> float:
+    """Similarità tra 0 e 1 di due titoli dopo la normalizzazione."""
+    return _similarity(_Signature(a), _Signature(b))
+
+
+def merge_events(primary: Event, duplicate: Event) -> Event:
+    """
+    Fonde un duplicato nell'evento principale: il principale mantiene titolo e location,
+    il poster (o il poster in attesa) viene preso dal duplicato se mancante e le distanze
+    vengono unite.
+    """
+    update = {}
+    if primary.poster is None and primary.poster_job is None:
+        if duplicate.poster is not None:
+            update.update(
+                poster=duplicate.poster,
+                poster_source=duplicate.poster_source,
+                poster_fingerprint=duplicate.poster_fingerprint,
+            )
+        elif duplicate.poster_job is not None:
+            # Il poster del duplicato verrà scaricato dal suo scraper e attaccato al principale
+            update["poster_job"] = duplicate.poster_job
+    distances = primary.distances + [d for d in duplicate.distances if d not in primary.distances]
+    if distances != primary.distances:
+        update["distances"] = distances
+        update["distances_km"] = primary.distances_km + [
+            km for km in duplicate.distances_km if km not in primary.distances_km
+        ]
+    return primary.model_copy(update=update) if update else primary
+
+
+def deduplicate(batches: Sequence[List[Event]], threshold: float = DEDUP_THRESHOLD) -> Tuple[List[List[Event]], int]:
+    """
+    Rimuove gli eventi duplicati tra le sorgenti prima del salvataggio.
+
+    A parità di evento vince la sorgente che compare prima in batches; i duplicati
+    successivi vengono fusi in quello (vedi merge_events) e scartati.
+
+    Args:
+        batches: Eventi di ogni sorgente, in ordine di priorità
+        threshold: Similarità minima dei titoli per considerare due eventi lo stesso
+
+    Returns:
+        (eventi rimasti per ogni sorgente, nello stesso ordine; numero di duplicati rimossi)
+    """
+    result: List[List[Event]] = [[] for _ in batches]
+    # (data ISO, provincia) → [(indice sorgente, posizione in result, firma del titolo)]
+    blocks: Dict[Tuple[str, str], List[Tuple[int, int, _Signature]]] = {}
+    removed = 0
+
+    for source_index, events in enumerate(batches):
+        for event in events:
+            signature = _Signature(event.title)
+            # Data normalizzata: "1/5/2026" e "01/05/2026" finiscono nello stesso blocco
+            day = to_iso_or_none(event.date) or event.date
+            block = blocks.setdefault((day, event.location.province.value), [])
+
+            # Si confronta solo con le altre sorgenti: due eventi simili della stessa
+            # sorgente sono manifestazioni distinte (es. due percorsi elencati a parte)
+            match = next(
+                (entry for entry in block if entry[0] != source_index and _similarity(signature, entry[2]) >= threshold),
+                None,
+            )
+            if match is None:
+                block.append((source_index, len(result[source_index]), signature))
+                result[source_index].append(event)
+                continue
+
+            matched_source, position, _ = match
+            result[matched_source][position] = merge_events(result[matched_source][position], event)
+            removed += 1
+
+    return result, removed
@@ -0,0 +1,112 @@
+"""
+Persistent negative cache for URLs that keep failing.
+
+Permanent errors (404, HTML instead of a file) are retried on an exponential
+schedule; transient ones (timeouts, connection errors, 408/429/5xx) only after
+a short fixed interval, and they do not count towards the backoff.
+"""
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from scraper.config import FAILURE_BASE_INTERVAL, FAILURE_MAX_INTERVAL, FAILURE_TRANSIENT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Classi d'errore registrate da http.get per timeout e problemi di connessione
+_TRANSIENT_ERRORS = frozenset({
+    "Timeout", "ReadTimeout", "ConnectTimeout", "TimeoutError", "ConnectionError", "ChunkedEncodingError",
+})
+_TRANSIENT_STATUS = frozenset({"408", "429", "500", "502", "503", "504"})
+
+
+def is_transient(error: str) -> bool:
+    """True se la classe d'errore (es. "ReadTimeout", "HTTPError 503") indica un problema temporaneo."""
+    if error in _TRANSIENT_ERRORS:
+        return True
+    kind, _, status = error.partition(" ")
+    return kind == "HTTPError" and status in _TRANSIENT_STATUS
+
+
+class FailureCache:
+    """
+    Ricorda gli URL falliti (classe d'errore, primo/ultimo fallimento, numero di fallimenti)
+    e li salta fino al prossimo tentativo, con intervallo che raddoppia ad ogni fallimento.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path | str] = None,
+        base_interval: float = FAILURE_BASE_INTERVAL,
+        max_interval: float = FAILURE_MAX_INTERVAL,
+        transient_interval: float = FAILURE_TRANSIENT_INTERVAL,
+    ):
+        self.path = Path(path) if path else None
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.transient_interval = transient_interval
+        self.skipped = 0
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Ignoring unreadable failure cache %s: %s", self.path, e)
+
+    def save(self):
+        """Scrive la cache su disco."""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(data, encoding="utf-8")
+
+    def retry_at(self, url: str) -> Optional[float]:
+        """Timestamp dal quale l'URL può essere riprovato, o None se non è in cache."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        if is_transient(entry["error"]):
+            return entry["last_failed"] + self.transient_interval
+        interval = min(self.base_interval * 2 ** (max(entry["failures"], 1) - 1), self.max_interval)
+        return entry["last_failed"] + interval
+
+    def should_skip(self, url: str) -> bool:
+        """True se l'URL è fallito di recente e non è ancora il momento di riprovarlo."""
+        retry_at = self.retry_at(url)
+        if retry_at is None or time.time() >= retry_at:
+            return False
+        with self._lock:
+            self.skipped += 1
+        return True
+
+    def record_failure(self, url: str, error: str):
+        """
+        Registra un fallimento per l'URL. Solo gli errori permanenti allungano il backoff.
+
+        Args:
+            url: URL fallito
+            error: Classe dell'errore (es. "HTTPError 404", "ReadTimeout", "HTMLResponse")
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(url, {"first_failed": now, "failures": 0})
+            failures = entry["failures"] + (0 if is_transient(error) else 1)
+            entry.update(error=error, last_failed=now, failures=failures)
+
+    def record_success(self, url: str):
+        """Rimuove l'URL dalla cache dopo una risposta valida."""
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,126 @@
+"""
+Offline gazetteer of Italian municipalities (comune → provincia) with fuzzy matching.
+"""
+from __future__ import annotations
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GAZETTEER_PATH = Path(__file__).parent.parent / "data" / "comuni.tsv"
+
+# Soglia minima di similarità (coefficiente di Dice sui trigrammi) per accettare un match fuzzy
+FUZZY_THRESHOLD = 0.75
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizza un nome di comune per il confronto:
+    minuscolo, senza accenti, senza testo tra parentesi, punteggiatura → spazio.
+
+    Es. "VILLA D'ALMÈ [Oratorio]" → "villa d alme"
+    """
+    name = re.sub(r"\[[^\]]*\]|\([^)]*\)", " ", name)
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def _trigrams(name: str) -> List[str]:
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class Gazetteer:
+    """Indice dei comuni: lookup esatto per nome normalizzato e match fuzzy per trigrammi."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            entries: Coppie (nome comune, sigla provincia)
+        """
+        self._provinces: Dict[str, List[str]] = {}
+        for name, province in entries:
+            provinces = self._provinces.setdefault(normalize_name(name), [])
+            if province not in provinces:
+                provinces.append(province)
+
+        # Indice invertito trigramma → nomi che lo contengono
+        self._names = list(self._provinces)
+        self._trigram_counts = [len(_trigrams(name)) for name in self._names]
+        self._index: Dict[str, List[int]] = {}
+        for i, name in enumerate(self._names):
+            for trigram in set(_trigrams(name)):
+                self._index.setdefault(trigram, []).append(i)
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        """Carica il gazetteer da un file TSV con intestazione "comune\\tsigla"."""
+        with open(path, encoding="utf-8") as f:
+            next(f)
+            return cls(tuple(line.rstrip("\n").split("\t")[:2]) for line in f if line.strip())
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, city: str) -> List[str]:
+        """Sigle delle province che hanno un comune con esattamente questo nome."""
+        return self._provinces.get(normalize_name(city), [])
+
+    def fuzzy(self, city: str, threshold: float = FUZZY_THRESHOLD) -> Optional[Tuple[str, List[str], float]]:
+        """
+        Trova il comune più simile per trigrammi condivisi.
+
+        Returns:
+            (nome normalizzato, sigle province, punteggio), o None sotto la soglia
+        """
+        query = normalize_name(city)
+        if not query:
+            return None
+        trigrams = set(_trigrams(query))
+        shared = Counter(i for trigram in trigrams for i in self._index.get(trigram, ()))
+        best, best_score = None, 0.0
+        for i, count in shared.items():
+            score = 2 * count / (len(trigrams) + self._trigram_counts[i])
+            if score > best_score:
+                best, best_score = i, score
+        if best is None or best_score < threshold:
+            return None
+        name = self._names[best]
+        return name, self._provinces[name], best_score
+
+    def resolve(self, city: str, prefer: Optional[str] = None, fuzzy: bool = True) -> Optional[str]:
+        """
+        Risolve la sigla di provincia di un comune.
+
+        Args:
+            city: Nome del comune, anche con errori di battitura
+            prefer: Sigla da scegliere se il nome esiste in più province (es. la provincia di default dello scraper)
+            fuzzy: Se False usa solo il match esatto
+
+        Returns:
+            Sigla provincia, o None se il comune è sconosciuto o ambiguo
+        """
+        provinces = self.lookup(city)
+        if not provinces and fuzzy:
+            match = self.fuzzy(city)
+            provinces = match[1] if match else []
+        if len(provinces) == 1:
+            return provinces[0]
+        if prefer in provinces:
+            return prefer
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """Gazetteer dei comuni incluso nel pacchetto, caricato una sola volta."""
+    return Gazetteer.load()
+
+
+@lru_cache(maxsize=4096)
+def resolve_city_province(city: str, prefer: Optional[str] = None, fuzzy: bool = True) -> Optional[str]:
+    """Come Gazetteer.resolve sul gazetteer incluso, con cache per i nomi ripetuti."""
+    return get_gazetteer().resolve(city, prefer, fuzzy)
@@ -0,0 +1,129 @@
+"""
+Google Drive file fetcher with virus-scan interstitial handling.
+
+Large Drive files answer the direct download URL with an HTML confirm page
+instead of the file. The fetcher follows the confirm form (or the legacy
+confirm token) on every download: the confirm URL carries a one-time token,
+so it is never cached. Failing files go through the shared failure cache
+(scraper.utils.http.failures), keyed by the file's download URL, and are
+retried with the same backoff as any other poster URL.
+"""
+from __future__ import annotations
+import logging
+import re
+from typing import Optional, Tuple
+from urllib.parse import urlencode, urlparse, parse_qs
+from bs4 import BeautifulSoup
+import requests
+from scraper.config import GDRIVE_DOWNLOAD_URL, GDRIVE_MAX_CONCURRENCY, REQUEST_TIMEOUT
+from scraper.utils import http
+
+logger = logging.getLogger(__name__)
+
+_CONFIRM_TOKEN = re.compile(r"confirm=([0-9A-Za-z_-]+)")
+
+
+def extract_file_id(url: str) -> Optional[str]:
+    """
+    Estrae il file ID da un URL Google Drive.
+
+    Supporta:
+      - https://drive.google.com/file/d/FILE_ID/view
+      - https://drive.google.com/open?id=FILE_ID
+      - https://drive.google.com/uc?id=FILE_ID
+    """
+    match = re.search(r'drive\.google\.com/file/d/([^/?&]+)', url)
+    if match:
+        return match.group(1)
+
+    parsed = urlparse(url)
+    if 'drive.google.com' in parsed.netloc:
+        params = parse_qs(parsed.query)
+        if 'id' in params:
+            return params['id'][0]
+
+    return None
+
+
+def download_url(file_id: str) -> str:
+    """URL di download diretto di un file Drive, usato anche come chiave nella cache dei fallimenti."""
+    return f"{GDRIVE_DOWNLOAD_URL}?{urlencode({'id': file_id, 'export': 'download'})}"
+
+
+def _confirm_url(html: str, file_id: str) -> Optional[str]:
+    """
+    Ricava l'URL di conferma dalla pagina "impossibile analizzare il file per virus".
+
+    Gestisce sia il form `download-form` di drive.usercontent.google.com
+    sia il vecchio link con parametro `confirm=TOKEN`.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    form = soup.find("form", id="download-form")
+    if form and form.get("action"):
+        params = {
+            field["name"]: field.get("value", "")
+            for field in form.find_all("input", attrs={"name": True})
+        }
+        return f"{form['action']}?{urlencode(params)}"
+
+    match = _CONFIRM_TOKEN.search(html)
+    if match:
+        return f"{GDRIVE_DOWNLOAD_URL}?{urlencode({'id': file_id, 'export': 'download', 'confirm': match.group(1)})}"
+
+    return None
+
+
+class GoogleDriveFetcher:
+    """Scarica file pubblici da Google Drive, saltando quelli nella cache dei fallimenti condivisa."""
+
+    def __init__(self):
+        http.limiter.configure(urlparse(GDRIVE_DOWNLOAD_URL).netloc, GDRIVE_MAX_CONCURRENCY)
+
+    def _download(self, file_id: str, url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Scarica da url seguendo al massimo una pagina di conferma antivirus.
+
+        Returns:
+            (bytes, content_type), o None se la risposta resta HTML
+        """
+        for _ in range(2):
+            resp = http.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            resp.raise_for_status()
+            content_type = resp.headers.get('Content-Type', '')
+
+            if 'text/html' not in content_type:
+                return resp.content, content_type
+
+            confirm_url = _confirm_url(resp.content.decode("utf-8", "replace"), file_id)
+            if not confirm_url or confirm_url == url:
+                return None
+            url = confirm_url
+        return None
+
+    def fetch(self, file_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Scarica un file Drive dato il suo ID, risolvendo ogni volta la pagina di conferma.
+
+        Returns:
+            (bytes, content_type), o None se il file non è scaricabile o è nella cache dei fallimenti
+        """
+        url = download_url(file_id)
+        cache = http.failures
+        if cache is not None and cache.should_skip(url):
+            return None
+
+        try:
+            result = self._download(file_id, url)
+        except Exception as e:
+            logger.warning("⚠️ Failed to download Google Drive file %s: %s", file_id, e)
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            http.record_failure(url, f"HTTPError {status}" if isinstance(e, requests.HTTPError) and status else type(e).__name__)
+            return None
+
+        if result is None:
+            logger.warning("⚠️ Got HTML response instead of file for Google Drive file %s", file_id)
+            http.record_failure(url, "HTMLResponse")
+            return None
+        if cache is not None:
+            cache.record_success(url)
+        return result
@@ -0,0 +1,118 @@
+"""
+Offline geocoding of event locations from the bundled comuni coordinate table.
+"""
+from __future__ import annotations
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from scraper.models.event import Event, Location
+from scraper.utils.gazetteer import normalize_name
+
+logger = logging.getLogger(__name__)
+
+COORDINATES_PATH = Path(__file__).parent.parent / "data" / "coordinate.tsv"
+
+# Sigle non standard usate dalle sorgenti → sigla ufficiale
+_PROVINCE_ALIASES = {"GOR": "GO"}
+
+
+class Coordinates(NamedTuple):
+    lat: float
+    lon: float
+    exact: bool  # False se approssimate al capoluogo di provincia
+
+
+class Geocoder:
+    """Coordinate dei comuni per (nome normalizzato, sigla), con fallback sul capoluogo di provincia."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, float, float, bool]]):
+        """
+        Args:
+            entries: Tuple (nome comune, sigla provincia, lat, lon, è capoluogo)
+        """
+        self._points: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._capitals: Dict[str, Tuple[float, float]] = {}
+        for name, province, lat, lon, capital in entries:
+            self._points[(normalize_name(name), province)] = (lat, lon)
+            if capital:
+                self._capitals[province] = (lat, lon)
+
+    @classmethod
+    def load(cls, path: Path = COORDINATES_PATH) -> "Geocoder":
+        """Carica le coordinate da un file TSV con intestazione "comune\\tsigla\\tlat\\tlon\\tcapoluogo"."""
+        with open(path, encoding="utf-8") as f:
+            next(f)
+            rows = (line.rstrip("\n").split("\t") for line in f if line.strip())
+            return cls((name, sigla, float(lat), float(lon), capital == "1") for name, sigla, lat, lon, capital in rows)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def locate(self, city: str, province: str) -> Optional[Coordinates]:
+        """
+        Coordinate di un comune.
+
+        Args:
+            city: Nome del comune
+            province: Sigla della provincia
+
+        Returns:
+            Coordinate del comune se presente nella tabella, altrimenti quelle
+            del capoluogo (exact=False), o None se la provincia è sconosciuta
+        """
+        province = _PROVINCE_ALIASES.get(province, province)
+        point = self._points.get((normalize_name(city), province))
+        if point:
+            return Coordinates(*point, exact=True)
+        capital = self._capitals.get(province)
+        if capital:
+            return Coordinates(*capital, exact=False)
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_geocoder() -> Geocoder:
+    """Tabella delle coordinate inclusa nel pacchetto, caricata una sola volta."""
+    return Geocoder.load()
+
+
+@lru_cache(maxsize=4096)
+def geocode(city: str, province: str) -> Optional[Coordinates]:
+    """Come Geocoder.locate sulla tabella inclusa, con cache per (città, provincia)."""
+    return get_geocoder().locate(city, province)
+
+
+def geocode_location(location: Location) -> Location:
+    """
+    Ritorna una copia della location con lat/lon valorizzati (invariata se non geocodificabile).
+    Le coordinate del capoluogo sono marcate con approximate=True.
+    """
+    coordinates = geocode(location.city, location.province.value)
+    if coordinates is None:
+        return location
+    return location.model_copy(update={"lat": coordinates.lat, "lon": coordinates.lon, "approximate": not coordinates.exact})
+
+
+def geocode_event(event: Event) -> Event:
+    """Ritorna una copia dell'evento con la location geocodificata."""
+    location = geocode_location(event.location)
+    return event if location is event.location else event.model_copy(update={"location": location})
+
+
+def enrich_events(events: List[Event]) -> List[Event]:
+    """
+    Stadio di arricchimento: aggiunge le coordinate alla location di ogni evento.
+
+    Returns:
+        Nuova lista di eventi con le location geocodificate
+    """
+    enriched = []
+    approximate = 0
+    for event in events:
+        event = geocode_event(event)
+        approximate += event.location.approximate
+        enriched.append(event)
+    if approximate:
+        logger.info("📍 %d/%d locations geocoded to their province capital", approximate, len(events))
+    return enriched
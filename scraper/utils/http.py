@@ -0,0 +1,167 @@
+"""
+Shared HTTP layer for all scrapers, with global and per-host concurrency limits,
+an optional negative cache for URLs that keep failing and an optional
+record/replay archive of the traffic (see http_archive).
+"""
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+import requests
+from scraper.config import REQUEST_TIMEOUT, MAX_CONCURRENT_REQUESTS, DEFAULT_HOST_CONCURRENCY
+from scraper.utils.failure_cache import FailureCache
+from scraper.utils.http_archive import ArchiveMode, HttpArchive
+from scraper.utils import metrics
+
+
+class SkippedURLError(requests.RequestException):
+    """URL non richiesto perché fallito di recente (vedi FailureCache)."""
+
+
+class HostLimiter:
+    """Limita le richieste simultanee in totale e per singolo host."""
+
+    def __init__(self, global_limit: int, default_per_host: int):
+        self._global = threading.BoundedSemaphore(global_limit)
+        self._default_per_host = default_per_host
+        self._limits: Dict[str, int] = {}
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, limit: int):
+        """
+        Imposta il limite di concorrenza per un host.
+        Se più scraper dichiarano lo stesso host vince il limite più basso.
+        """
+        host = host.lower()
+        with self._lock:
+            current = self._limits.get(host)
+            if current is not None and current <= limit:
+                return
+            self._limits[host] = limit
+            self._hosts[host] = threading.BoundedSemaphore(limit)
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._limits.get(host, self._default_per_host))
+                self._hosts[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Occupa uno slot globale e uno dell'host di url per la durata del blocco."""
+        host_semaphore = self._host_semaphore(urlparse(url).netloc.lower())
+        with self._global, host_semaphore:
+            yield
+
+
+limiter = HostLimiter(MAX_CONCURRENT_REQUESTS, DEFAULT_HOST_CONCURRENCY)
+
+# Cache dei fallimenti, attiva solo se abilitata da enable_failure_cache (es. da main)
+failures: Optional[FailureCache] = None
+
+
+def enable_failure_cache(path: Optional[Path | str] = None) -> FailureCache:
+    """Attiva la cache dei fallimenti, persistita in path se indicato."""
+    global failures
+    failures = FailureCache(path)
+    return failures
+
+
+# Archivio delle richieste, attivo solo se abilitato da enable_archive (es. da main)
+archive: Optional[HttpArchive] = None
+
+
+def enable_archive(path: Path | str, mode: ArchiveMode) -> HttpArchive:
+    """Registra tutte le richieste in path (RECORD) o le serve da path senza rete (REPLAY)."""
+    global archive
+    archive = HttpArchive(path, mode)
+    return archive
+
+
+def close_archive():
+    """Chiude e disattiva l'archivio delle richieste, se attivo."""
+    global archive
+    if archive is not None:
+        archive.close()
+        archive = None
+
+
+def is_replaying() -> bool:
+    """True se le risposte arrivano dall'archivio invece che dalla rete."""
+    return archive is not None and archive.replaying
+
+
+def _send(url: str, **kwargs) -> requests.Response:
+    """Esegue la richiesta (o la legge dall'archivio in replay), registrandola se richiesto."""
+    if archive is None:
+        with limiter.slot(url):
+            return requests.get(url, **kwargs)
+
+    key = HttpArchive.key(url, kwargs.get("params"))
+    if archive.replaying:
+        return archive.replay(key)
+
+    with limiter.slot(url):
+        try:
+            resp = requests.get(url, **kwargs)
+        except Exception as e:
+            archive.record_error(key, e)
+            raise
+    archive.record(key, resp)
+    return resp
+
+
+def record_failure(url: str, error: str):
+    """Registra un fallimento rilevato dal chiamante (es. HTML al posto di un'immagine)."""
+    if failures is not None:
+        failures.record_failure(url, error)
+
+
+def get(url: str, skip_known_failures: bool = False, **kwargs) -> requests.Response:
+    """
+    Esegue una GET rispettando i limiti di concorrenza configurati.
+
+    Args:
+        url: URL da scaricare
+        skip_known_failures: Se True e la cache dei fallimenti è attiva, salta gli URL
+            falliti di recente e registra l'esito della richiesta. Da usare per risorse
+            accessorie (immagini, poster), non per le pagine elenco.
+        **kwargs: argomenti passati a requests.get (timeout di default REQUEST_TIMEOUT)
+
+    Returns:
+        La risposta di requests
+
+    Raises:
+        SkippedURLError: se l'URL è nella cache dei fallimenti
+    """
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    cache = failures if skip_known_failures else None
+
+    if cache is not None and cache.should_skip(url):
+        raise SkippedURLError(f"Skipped recently failing URL {url}")
+
+    host = urlparse(url).netloc.lower()
+    start = time.perf_counter()
+    try:
+        resp = _send(url, **kwargs)
+    except Exception as e:
+        metrics.inc("http_requests", host=host, status="error")
+        if cache is not None:
+            cache.record_failure(url, type(e).__name__)
+        raise
+    metrics.observe("http_request_duration_seconds", time.perf_counter() - start, host=host)
+    metrics.inc("http_requests", host=host, status=resp.status_code)
+    metrics.inc("http_bytes", len(resp.content), host=host)
+
+    if cache is not None:
+        if resp.status_code >= 400:
+            cache.record_failure(url, f"HTTPError {resp.status_code}")
+        else:
+            cache.record_success(url)
+    return resp
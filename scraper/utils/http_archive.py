@@ -0,0 +1,151 @@
+"""
+Record/replay archive of HTTP traffic for offline, deterministic runs.
+
+In record mode every GET made through scraper.utils.http (list pages, detail
+pages, images, posters) is stored in a zip archive: response bodies are
+deflate-compressed and stored once per distinct content under
+"bodies/<sha256>", while "index.json" maps each URL to the sequence of
+responses (or network errors) it produced. In replay mode the same responses
+are served from the archive without touching the network, so a full run can
+be repeated offline with the same workload every time.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import zipfile
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+
+INDEX_NAME = "index.json"
+ARCHIVE_VERSION = 1
+
+
+class ArchiveMode(str, Enum):
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class ArchiveMissError(requests.ConnectionError):
+    """URL richiesto in replay ma assente dall'archivio."""
+
+
+class HttpArchive:
+    """
+    Archivio zip delle risposte HTTP, in scrittura (RECORD) o in lettura (REPLAY).
+
+    Se un URL è stato richiesto più volte le risposte vengono restituite nello
+    stesso ordine della registrazione; esaurite, si ripete l'ultima.
+    """
+
+    def __init__(self, path: Path | str, mode: ArchiveMode):
+        """
+        Args:
+            path: File zip dell'archivio
+            mode: RECORD per creare (o sovrascrivere) l'archivio, REPLAY per leggerlo
+        """
+        self.path = Path(path)
+        self.mode = ArchiveMode(mode)
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[dict]] = {}
+        self._bodies = set()
+        self._served: Dict[str, int] = {}
+
+        if self.mode == ArchiveMode.RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+        else:
+            self._zip = zipfile.ZipFile(self.path, "r")
+            index = json.loads(self._zip.read(INDEX_NAME))
+            self._index = index["requests"]
+
+    def __enter__(self) -> "HttpArchive":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        """Numero di risposte (o errori) presenti nell'archivio."""
+        return sum(len(entries) for entries in self._index.values())
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == ArchiveMode.REPLAY
+
+    @staticmethod
+    def key(url: str, params: Optional[dict] = None) -> str:
+        """Chiave di una richiesta: l'URL completo, query string compresa."""
+        if not params:
+            return url
+        return requests.Request("GET", url, params=params).prepare().url
+
+    def _append(self, key: str, entry: dict):
+        with self._lock:
+            self._index.setdefault(key, []).append(entry)
+
+    def record(self, key: str, resp: requests.Response):
+        """Registra una risposta, salvandone il corpo una sola volta per contenuto."""
+        content = resp.content
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            if digest not in self._bodies:
+                self._zip.writestr(f"bodies/{digest}", content)
+                self._bodies.add(digest)
+        self._append(key, {
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "url": resp.url or key,
+            "headers": dict(resp.headers),
+            "encoding": resp.encoding,
+            "body": digest,
+        })
+
+    def record_error(self, key: str, error: Exception):
+        """Registra un errore di rete, che in replay viene risollevato come ConnectionError."""
+        self._append(key, {"error": type(error).__name__, "message": str(error)})
+
+    def replay(self, key: str) -> requests.Response:
+        """
+        Risposta registrata per key.
+
+        Raises:
+            ArchiveMissError: se la richiesta non è nell'archivio
+            requests.ConnectionError: se durante la registrazione la richiesta era fallita
+        """
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                self.misses += 1
+                raise ArchiveMissError(f"{key} not found in HTTP archive {self.path}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            entry = entries[min(served, len(entries) - 1)]
+            content = self._zip.read(f"bodies/{entry['body']}") if "body" in entry else None
+
+        if "error" in entry:
+            raise requests.ConnectionError(f"{entry['error']}: {entry['message']}")
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.reason = entry["reason"]
+        resp.url = entry["url"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp.encoding = entry["encoding"]
+        resp._content = content
+        resp._content_consumed = True
+        return resp
+
+    def close(self):
+        """Chiude l'archivio; in RECORD scrive l'indice, necessario per il replay."""
+        if self._zip is None:
+            return
+        if self.mode == ArchiveMode.RECORD:
+            index = {"version": ARCHIVE_VERSION, "requests": self._index}
+            self._zip.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False, sort_keys=True))
+        self._zip.close()
+        self._zip = None
@@ -0,0 +1,50 @@
+"""
+Thread-safe newline-delimited JSON writer for streaming events.
+"""
+from __future__ import annotations
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import IO, Optional
+from scraper.models.event import Event
+
+
+class JsonlWriter:
+    """
+    Scrive un evento per riga in un file o su stdout, con flush immediato
+    così l'output è leggibile mentre lo scraping è in corso.
+    """
+
+    def __init__(self, path: Optional[Path | str] = None, stream: Optional[IO[str]] = None):
+        """
+        Args:
+            path: File di output; None o "-" per scrivere su stream
+            stream: Stream da usare al posto di un file (default sys.stdout)
+        """
+        self.path = Path(path) if path and str(path) != "-" else None
+        self._stream = stream
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self) -> "JsonlWriter":
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+        else:
+            self._file = self._stream or sys.stdout
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.path and self._file:
+            self._file.close()
+        self._file = None
+
+    def write(self, event: Event):
+        """Scrive un evento come riga JSON."""
+        line = json.dumps(event.model_dump(mode="json"), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
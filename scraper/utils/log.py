@@ -0,0 +1,203 @@
+"""
+Logging setup for scraper runs.
+
+Modules log through the standard library (logging.getLogger(__name__)) and
+scrapers tag their records with extra={"source": source_id}; setup_logging
+configures the "scraper" logger once per process:
+
+- records are put on a queue by a QueueHandler and written by a QueueListener
+  thread, so scraper threads never block on synchronous terminal writes;
+- output is the bare message (as the old prints) or one JSON object per line;
+- records are counted per source and level for the run summary;
+- repeated warnings (same template, same source, e.g. unknown province) are
+  sampled: the first few are written, then one every N with the number of
+  repeats suppressed in between. Errors are never sampled, and neither are
+  informational summaries.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Dict, Optional, Tuple
+from scraper.config import LOG_LEVEL, LOG_SAMPLE_FIRST, LOG_SAMPLE_EVERY
+
+ROOT_LOGGER = "scraper"
+
+logger = logging.getLogger(__name__)
+
+
+class JsonFormatter(logging.Formatter):
+    """Un oggetto JSON per riga: timestamp, livello, logger, sorgente e messaggio."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        source = getattr(record, "source", None)
+        if source:
+            data["source"] = source
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            data["suppressed"] = suppressed
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class PlainFormatter(logging.Formatter):
+    """Solo il messaggio, con il numero di ripetizioni soppresse se il record è campionato."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{message} (+{suppressed} similar suppressed)" if suppressed else message
+
+
+class SourceCounter(logging.Filter):
+    """Conta i record per (sorgente, livello); non scarta nulla."""
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        with self._lock:
+            self.counts[(getattr(record, "source", None) or "-", record.levelname)] += 1
+        return True
+
+    def by_source(self) -> Dict[str, Dict[str, int]]:
+        """{sorgente: {livello: numero di record}}"""
+        result: Dict[str, Dict[str, int]] = {}
+        for (source, level), n in sorted(self.counts.items()):
+            result.setdefault(source, {})[level] = n
+        return result
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Campiona i messaggi ripetuti di livello WARNING: per ogni (logger, template, sorgente)
+    lascia passare i primi `first`, poi uno ogni `every`, annotando in record.suppressed
+    quanti ne sono stati scartati dall'ultimo scritto.
+    """
+
+    def __init__(self, first: int = LOG_SAMPLE_FIRST, every: int = LOG_SAMPLE_EVERY, level: int = logging.WARNING):
+        super().__init__()
+        self.first = first
+        self.every = every
+        self.level = level
+        self.seen: Counter = Counter()
+        self.suppressed: Counter = Counter()
+        self._pending: Dict[Tuple[str, str, Optional[str]], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != self.level:
+            return True
+        key = (record.name, str(record.msg), getattr(record, "source", None))
+        with self._lock:
+            self.seen[key] += 1
+            n = self.seen[key]
+            if n <= self.first or (self.every and (n - self.first) % self.every == 0):
+                record.suppressed = self._pending.pop(key, 0)
+                return True
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self.suppressed[key] += 1
+            return False
+
+
+class LogSession:
+    """Configurazione di logging attiva: coda, listener, contatori e campionamento."""
+
+    def __init__(self, handler: QueueHandler, listener: QueueListener, counter: SourceCounter, sampler: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.counter = counter
+        self.sampler = sampler
+
+    def summary(self):
+        """Registra warning ed errori per sorgente e i messaggi soppressi dal campionamento."""
+        for source, levels in self.counter.by_source().items():
+            warnings, errors = levels.get("WARNING", 0), levels.get("ERROR", 0) + levels.get("CRITICAL", 0)
+            if warnings or errors:
+                logger.info("📋 %s: %d warnings, %d errors", source, warnings, errors)
+        total = sum(self.sampler.suppressed.values())
+        if total:
+            logger.info("🔇 %d repeated log messages suppressed:", total)
+            for (_, template, source), n in self.sampler.suppressed.most_common(5):
+                logger.info("  %d× %s%s", n, f"[{source}] " if source else "", template)
+
+    def close(self):
+        """Svuota la coda e rimuove l'handler dal logger "scraper"."""
+        self.listener.stop()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.removeHandler(self.handler)
+        root.propagate = True
+
+
+# Sessione attiva, solo se configurata da setup_logging (es. da main)
+_session: Optional[LogSession] = None
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    json_format: bool = False,
+    stream: Optional[IO[str]] = None,
+    sample_first: int = LOG_SAMPLE_FIRST,
+    sample_every: int = LOG_SAMPLE_EVERY,
+) -> LogSession:
+    """
+    Configura il logger "scraper" con scrittura asincrona da coda.
+
+    Args:
+        level: Livello minimo (DEBUG mostra anche un messaggio per ogni evento salvato)
+        json_format: Se True scrive un oggetto JSON per riga invece del solo messaggio
+        stream: Destinazione (default sys.stderr)
+        sample_first: Ripetizioni di uno stesso warning scritte sempre
+        sample_every: Oltre sample_first, scrive un warning ogni sample_every (0 = nessuno)
+
+    Returns:
+        La sessione, da chiudere con shutdown_logging per svuotare la coda
+    """
+    global _session
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else PlainFormatter())
+
+    counter = SourceCounter()
+    sampler = SamplingFilter(sample_first, sample_every)
+    handler = QueueHandler(queue.SimpleQueue())
+    # I contatori vedono tutti i record, il campionamento scarta solo in scrittura
+    handler.addFilter(counter)
+    handler.addFilter(sampler)
+    listener = QueueListener(handler.queue, output)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level.upper())
+    root.addHandler(handler)
+    root.propagate = False
+    listener.start()
+
+    _session = LogSession(handler, listener, counter, sampler)
+    return _session
+
+
+def shutdown_logging():
+    """Chiude la sessione attiva, scrivendo i record ancora in coda."""
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,160 @@
+"""
+Opt-in memory instrumentation for scraper runs.
+
+When enabled (e.g. by main --profile-memory), each scraper stage (collect,
+save, stream) is wrapped in tracemalloc snapshots: the stage records its
+traced peak, the memory it left allocated, the top allocation sites and the
+process peak RSS reached so far. The RSS figure is cumulative: ru_maxrss is the
+high-water mark of the whole process and never decreases, so a source that
+runs after a heavier one reports that one's peak. Posters are tracked separately: every poster
+pipeline reports the bytes it held (downloaded images, converted PDF, upload
+payload) and events above a threshold are flagged.
+
+tracemalloc traces the whole process, so stage figures are attributable to a
+source only when sources run one at a time; main does that while profiling.
+Poster threads inside a source run concurrently, which is why posters are
+measured by byte accounting rather than by tracemalloc.
+"""
+from __future__ import annotations
+import logging
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from scraper.config import MEMORY_POSTER_THRESHOLD_MB, MEMORY_TOP_ALLOCATIONS, MEMORY_TRACEBACK_FRAMES
+
+MB = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss() -> Optional[int]:
+    """Picco di memoria residente del processo dall'avvio in byte, o None se non disponibile (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux riporta KB, macOS byte
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageMemory(NamedTuple):
+    source: str
+    stage: str
+    peak: int  # picco tracciato durante lo stadio, oltre la memoria già allocata all'inizio
+    retained: int  # memoria ancora allocata a fine stadio rispetto all'inizio
+    rss: Optional[int]  # picco RSS del processo dall'avvio, letto a fine stadio (cumulativo, non per sorgente)
+    top: List[str]  # principali punti di allocazione (file:riga, dimensione)
+
+
+class PosterMemory(NamedTuple):
+    source: str
+    title: str
+    date: str
+    bytes: int
+
+
+class MemoryProfiler:
+    """Raccoglie le misure di memoria per stadio e i poster sopra soglia."""
+
+    def __init__(self, poster_threshold: int = MEMORY_POSTER_THRESHOLD_MB * MB, top: int = MEMORY_TOP_ALLOCATIONS):
+        """
+        Args:
+            poster_threshold: Byte oltre i quali la pipeline di un poster viene segnalata
+            top: Numero di punti di allocazione da riportare per stadio (0 = nessuno snapshot)
+        """
+        self.poster_threshold = poster_threshold
+        self.top = top
+        self.stages: List[StageMemory] = []
+        self.posters: List[PosterMemory] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_TRACEBACK_FRAMES)
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, source: str, stage: str) -> Iterator[None]:
+        """Misura la memoria allocata durante il blocco."""
+        before = tracemalloc.take_snapshot() if self.top else None
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            top = []
+            if before is not None:
+                after = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+                for diff in after.compare_to(before, "lineno")[:self.top]:
+                    if diff.size_diff > 0:
+                        frame = diff.traceback[0]
+                        top.append(f"{frame.filename}:{frame.lineno} +{diff.size_diff / 1024:.0f} KB")
+            with self._lock:
+                self.stages.append(StageMemory(source, stage, max(0, peak - start), current - start, peak_rss(), top))
+
+    def poster(self, source: str, title: str, date: str, nbytes: int):
+        """Registra i byte gestiti dalla pipeline di un poster, segnalandola se oltre soglia."""
+        if nbytes <= self.poster_threshold:
+            return
+        with self._lock:
+            self.posters.append(PosterMemory(source, title, date, nbytes))
+        logger.warning("🐘 %s poster for '%s' (%s) held %.1f MB", source, title, date, nbytes / MB, extra={"source": source})
+
+    def source_peaks(self) -> Dict[str, Tuple[int, Optional[int]]]:
+        """Per sorgente: (picco tracciato massimo tra gli stadi, picco RSS del processo a fine ultimo stadio)."""
+        peaks: Dict[str, Tuple[int, Optional[int]]] = {}
+        for stage in self.stages:
+            traced, _ = peaks.get(stage.source, (0, None))
+            peaks[stage.source] = (max(traced, stage.peak), stage.rss)
+        return peaks
+
+    def report(self):
+        """Stampa il riepilogo per stadio e i poster sopra soglia."""
+        logger.info("🧠 Memory by stage:")
+        for stage in self.stages:
+            rss = f", process peak RSS so far {stage.rss / MB:.1f} MB" if stage.rss is not None else ""
+            logger.info("  %s %s: peak %.1f MB, retained %.1f MB%s", stage.source, stage.stage, stage.peak / MB, stage.retained / MB, rss)
+            for line in stage.top:
+                logger.info("      %s", line)
+        if self.posters:
+            logger.info("🐘 %d posters above %.0f MB:", len(self.posters), self.poster_threshold / MB)
+            for poster in sorted(self.posters, key=lambda p: -p.bytes):
+                logger.info("  %s '%s' (%s): %.1f MB", poster.source, poster.title, poster.date, poster.bytes / MB)
+
+
+# Profiler attivo, solo se abilitato da enable_profiling (es. da main)
+profiler: Optional[MemoryProfiler] = None
+
+
+def enable_profiling(poster_threshold_mb: float = MEMORY_POSTER_THRESHOLD_MB) -> MemoryProfiler:
+    """Attiva tracemalloc e la raccolta delle misure per stadio e per poster."""
+    global profiler
+    profiler = MemoryProfiler(poster_threshold=int(poster_threshold_mb * MB))
+    profiler.start()
+    return profiler
+
+
+def disable_profiling():
+    """Ferma tracemalloc e disattiva il profiler, se attivo."""
+    global profiler
+    if profiler is not None:
+        profiler.stop()
+        profiler = None
+
+
+def stage(source: str, name: str):
+    """Context manager che misura uno stadio se il profiler è attivo, altrimenti non fa nulla."""
+    return profiler.stage(source, name) if profiler is not None else nullcontext()
+
+
+def record_poster(source: str, title: str, date: str, nbytes: int):
+    """Registra i byte della pipeline di un poster se il profiler è attivo."""
+    if profiler is not None:
+        profiler.poster(source, title, date, nbytes)
@@ -0,0 +1,226 @@
+"""
+Run metrics in Prometheus/OpenMetrics text format.
+
+Counters, gauges and histograms are collected in memory during the run
+(events per source, posters uploaded, HTTP bytes and latency per host, stage
+durations) and exported at the end either as an OpenMetrics text file, for
+node_exporter's textfile collector, or pushed to a Prometheus pushgateway.
+No client library is needed: the exposition format is written directly.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from scraper.config import METRICS_PREFIX, METRICS_JOB, METRICS_STAGE_BUCKETS, METRICS_HTTP_BUCKETS, REQUEST_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric(NamedTuple):
+    kind: str  # counter, gauge o histogram
+    help: str
+    buckets: Sequence[float] = ()
+
+
+# Metriche esportate (senza prefisso né suffisso _total)
+METRICS: Dict[str, Metric] = {
+    "events_scraped": Metric("counter", "Events parsed from the source, before deduplication"),
+    "events_inserted": Metric("counter", "Events inserted into the database"),
+    "events_updated": Metric("counter", "Existing events updated in the database"),
+    "events_failed": Metric("counter", "Events that failed to save"),
+    "events_duplicates": Metric("counter", "Events dropped as duplicates of another source"),
+    "deferred": Metric("counter", "Events or posters deferred to the next run by the time budget"),
+    "posters_uploaded": Metric("counter", "Posters uploaded to Storage"),
+    "storage_uploads": Metric("counter", "Files uploaded to Storage by bucket and method (standard or tus)"),
+    "storage_bytes": Metric("counter", "Bytes uploaded to Storage"),
+    "storage_retries": Metric("counter", "Storage upload attempts retried after a transient failure"),
+    "storage_gc_deleted": Metric("counter", "Orphaned posters deleted from Storage"),
+    "storage_gc_reclaimed_bytes": Metric("counter", "Bytes reclaimed by deleting orphaned posters"),
+    "http_requests": Metric("counter", "HTTP requests by host and status"),
+    "http_bytes": Metric("counter", "HTTP response body bytes received"),
+    "http_request_duration_seconds": Metric("histogram", "HTTP request latency", METRICS_HTTP_BUCKETS),
+    "stage_duration_seconds": Metric("histogram", "Duration of a run stage", METRICS_STAGE_BUCKETS),
+    "source_up": Metric("gauge", "1 if the source completed without errors"),
+    "run_duration_seconds": Metric("gauge", "Duration of the whole run"),
+    "last_run_timestamp_seconds": Metric("gauge", "Unix time at the end of the run"),
+}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # l'ultimo è +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Valori delle metriche dichiarate in METRICS, per combinazione di label. Thread-safe."""
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Incrementa un counter."""
+        assert METRICS[name].kind == "counter", name
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Imposta un gauge."""
+        assert METRICS[name].kind == "gauge", name
+        with self._lock:
+            self._values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Aggiunge un'osservazione a un istogramma."""
+        metric = METRICS[name]
+        assert metric.kind == "histogram", name
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(metric.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Osserva nell'istogramma name la durata del blocco, in secondi."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def value(self, name: str, **labels) -> float:
+        """Valore corrente di un counter o gauge (0 se mai registrato)."""
+        return self._values.get(name, {}).get(_labels(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Esposizione testuale di tutte le metriche registrate.
+
+        Args:
+            openmetrics: True per OpenMetrics 1.0 (textfile), False per il formato
+                Prometheus 0.0.4 accettato dal pushgateway
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, metric in METRICS.items():
+                family = f"{self.prefix}_{name}"
+                if metric.kind == "histogram":
+                    series = self._histograms.get(name)
+                    if not series:
+                        continue
+                    lines += [f"# TYPE {family} histogram", f"# HELP {family} {metric.help}"]
+                    for labels, histogram in sorted(series.items()):
+                        cumulative = 0
+                        for bound, count in zip(list(histogram.buckets) + [float("inf")], histogram.counts):
+                            cumulative += count
+                            lines.append(f"{family}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                        lines.append(f"{family}_count{_format_labels(labels)} {histogram.count}")
+                        lines.append(f"{family}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    continue
+
+                series = self._values.get(name)
+                if not series:
+                    continue
+                sample = f"{family}_total" if metric.kind == "counter" else family
+                # In OpenMetrics la famiglia di un counter è senza _total, in 0.0.4 coincide col campione
+                typed = family if openmetrics else sample
+                lines += [f"# TYPE {typed} {metric.kind}", f"# HELP {typed} {metric.help}"]
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path | str):
+        """
+        Scrive le metriche in formato OpenMetrics. La scrittura passa da un file
+        temporaneo rinominato, così il textfile collector non legge mai un file a metà.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.render(openmetrics=True), encoding="utf-8")
+        tmp.replace(path)
+
+    def push(self, gateway: str, job: str = METRICS_JOB, grouping: Optional[Dict[str, str]] = None):
+        """
+        Invia le metriche a un pushgateway (PUT: sostituisce il gruppo job/grouping).
+
+        Args:
+            gateway: URL base del pushgateway (es. http://localhost:9091)
+            job: Nome del job
+            grouping: Label di raggruppamento aggiuntive (es. {"shard": "1-4"})
+
+        Raises:
+            requests.RequestException: se il pushgateway non risponde o rifiuta le metriche
+        """
+        import requests
+
+        path = f"/metrics/job/{job}" + "".join(f"/{key}/{value}" for key, value in (grouping or {}).items())
+        resp = requests.put(
+            gateway.rstrip("/") + path,
+            data=self.render(openmetrics=False).encode("utf-8"),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+            timeout=REQUEST_TIMEOUT,
+        )
+        resp.raise_for_status()
+
+
+# Registro del processo: le metriche sono sempre raccolte, l'esportazione è a cura di main
+registry = MetricsRegistry()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
@@ -2,11 +2,16 @@
 Parsing utilities for event data.
 """
 from __future__ import annotations
+import logging
 import re
-from typing import List
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
 from scraper.models.event import Location
 from scraper.models.provinces import Province
-from scraper.utils.region_mapper import get_name_from_province, get_region_from_province
+from scraper.utils.region_mapper import PROVINCE_LOOKUP
+from scraper.utils.gazetteer import resolve_city_province
+
+logger = logging.getLogger(__name__)
 
 
 def extract_province_str(text: str) -> tuple[str, str | None]:
@@ -42,9 +47,13 @@ def parse_location(location_raw: str, default_province: Province = Province.BG)
     """
     Parse a location string into a Location object.
 
+    If the province code is missing or invalid, the province is resolved from
+    the city name through the bundled gazetteer (with fuzzy matching for typos);
+    default_province is used only when the city is unknown.
+
     Args:
         location_raw: Raw location string, e.g. "Spinone al Lago (BG)"
-        default_province: Default province if not found in string
+        default_province: Default province if not found in string or gazetteer
 
     Returns:
         Location object with city, province and region
@@ -53,22 +62,86 @@ def parse_location(location_raw: str, default_province: Province = Province.BG)
     city, province_str = extract_province_str(raw)
 
     if province_str:
-        try:
-            province = Province(province_str)
-            region = get_region_from_province(province)
-            province_name = get_name_from_province(province)
-            return Location(city=city, province=province, province_name=province_name, region=region)
-        except ValueError:
-            print(f"⚠️ Unknown province '{province_str}', defaulting to {default_province.value}")
+        info = PROVINCE_LOOKUP.get(province_str)
+        if info:
+            return Location(city=city, province=info.province, province_name=info.name, region=info.region)
+
+    # Sigla assente o non valida: risolvi dal nome del comune. Il nome senza l'ultimo token
+    # vale solo se quel token aveva la forma di una sigla (tra parentesi o di 2-3 lettere) e
+    # il nome è un comune noto: "San Giovanni Lupatoto" non è "San Giovanni" senza sigla
+    explicit = province_str is not None and raw.endswith(")")
+    code_shaped = province_str is not None and (explicit or len(province_str) <= 3)
+    name = city if explicit else raw
+    candidates = [name, city] if code_shaped and not explicit else [name]
+    for candidate in candidates:
+        code = resolve_city_province(candidate, prefer=default_province.value, fuzzy=False)
+        info = PROVINCE_LOOKUP.get(code) if code else None
+        if info:
+            return Location(city=candidate, province=info.province, province_name=info.name, region=info.region)
+
+    # Match fuzzy (refusi) solo sul nome completo, mai su quello troncato
+    code = resolve_city_province(name, prefer=default_province.value, fuzzy=True)
+    info = PROVINCE_LOOKUP.get(code) if code else None
+    if info:
+        return Location(city=name, province=info.province, province_name=info.name, region=info.region)
+
+    if code_shaped:
+        # Ripetuto per ogni riga con la stessa sigla: il template fisso permette il campionamento
+        logger.warning("⚠️ Unknown province '%s', defaulting to %s", province_str, default_province.value)
+
+    info = PROVINCE_LOOKUP[default_province.value]
+    return Location(city=raw, province=info.province, province_name=info.name, region=info.region)
+
+
+class Distance(NamedTuple):
+    """Una distanza di un evento: etichetta originale e valore numerico in km (None se assente)."""
+    label: str
+    km: Optional[float]
+
+
+_DISTANCE_AND = re.compile(r"\s+e\s+", re.IGNORECASE)
+_DISTANCE_SPLIT = re.compile(r"\s*[-–]\s*|\s{2,}")
+_DISTANCE_NUMBER = re.compile(r"(\d[\d.]*)\s*([a-zA-Z]*\.?)")
+_METER_UNITS = {"m", "mt", "mt.", "metri"}
+
+
+def _distance_km(label: str) -> Optional[float]:
+    """Primo numero dell'etichetta in km (es. "5.5 km" → 5.5, "800 m" → 0.8)."""
+    match = _DISTANCE_NUMBER.search(label)
+    if not match:
+        return None
+    try:
+        value = float(match.group(1).rstrip("."))
+    except ValueError:
+        return None
+    if match.group(2).lower() in _METER_UNITS:
+        value /= 1000
+    return value
+
+
+@lru_cache(maxsize=1024)
+def tokenize_distances(raw: str) -> Tuple[Distance, ...]:
+    """
+    Divide una stringa di distanze FIASP in etichette con il relativo valore in km.
 
-    region = get_region_from_province(default_province)
-    province_name = get_name_from_province(default_province)
-    return Location(city=raw, province=default_province, province_name=province_name, region=region)
+    Separatori: trattino o trattino lungo, " e " e due o più spazi consecutivi.
+    La virgola decimale diventa un punto. Il risultato è in cache perché
+    FIASP ripete continuamente le stesse stringhe.
+
+    Args:
+        raw: Stringa grezza, es. "5 - 10,5 e 15 km"
+
+    Returns:
+        Tuple di Distance, es. (("5", 5.0), ("10.5", 10.5), ("15 km", 15.0))
+    """
+    raw = _DISTANCE_AND.sub("-", raw.replace(",", ".").strip())
+    labels = [part.strip() for part in _DISTANCE_SPLIT.split(raw)]
+    return tuple(Distance(label, _distance_km(label)) for label in labels if label)
 
 
 def parse_distances(raw: str) -> List[str]:
     """
-    Parse a distance string from FIASP into a list of distances.
+    Parse a distance string from FIASP into a list of distance labels.
     
     Args:
         raw: Raw distance string, e.g. "5 - 10 km" or "5 e 10 km"
@@ -78,16 +151,19 @@ def parse_distances(raw: str) -> List[str]:
     """
     if not raw:
         return []
-    
-    raw = raw.replace(",", ".").strip()
-    raw = re.sub(r"\s+e\s+", "-", raw, flags=re.IGNORECASE)
-    parts = re.split(r"\s*[-–]\s*|\s{2,}", raw)
-    
-    results = []
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        results.append(part)
-    
-    return results
\ No newline at end of file
+    return [distance.label for distance in tokenize_distances(raw)]
+
+
+def parse_distances_km(raw: str) -> List[float]:
+    """
+    Parse a distance string from FIASP into numeric distances in km.
+
+    Args:
+        raw: Raw distance string, e.g. "5 - 10,5 km"
+
+    Returns:
+        Distances in km, skipping labels without a number, e.g. [5.0, 10.5]
+    """
+    if not raw:
+        return []
+    return [distance.km for distance in tokenize_distances(raw) if distance.km is not None]
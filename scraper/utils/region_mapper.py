@@ -1,6 +1,8 @@
 """
 Mappa province italiane → regioni.
 """
+import sys
+from typing import Dict, NamedTuple, Optional
 from scraper.models.provinces import Province
 
 PROVINCE_TO_REGION = {
@@ -287,4 +289,36 @@ def get_name_from_province(province: Province) -> str:
     Returns:
         Nome esteso (es. "Bergamo"), o la sigla stessa se non mappata
     """
-    return PROVINCE_TO_NAME.get(province, province.value)
\ No newline at end of file
+    return PROVINCE_TO_NAME.get(province, province.value)
+
+
+class ProvinceInfo(NamedTuple):
+    """Provincia con nome esteso e regione, risolti una volta sola."""
+    province: Province
+    name: str
+    region: str
+
+
+# Tabella piatta sigla grezza (uppercase) → ProvinceInfo, un record condiviso per provincia.
+# Sostituisce Province(sigla) + due lookup separati nel percorso caldo di parse_location.
+PROVINCE_LOOKUP: Dict[str, ProvinceInfo] = {
+    sys.intern(province.value): ProvinceInfo(
+        province,
+        sys.intern(get_name_from_province(province)),
+        sys.intern(get_region_from_province(province)),
+    )
+    for province in Province
+}
+
+
+def lookup_province(code: str) -> Optional[ProvinceInfo]:
+    """
+    Ritorna provincia, nome e regione a partire dalla sigla grezza.
+
+    Args:
+        code: Sigla in uppercase (es. "BG", "GOR")
+
+    Returns:
+        ProvinceInfo, o None se la sigla non è una provincia valida
+    """
+    return PROVINCE_LOOKUP.get(code)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the parsing hot paths.
+Usage: python tests/bench_parsers.py
+"""
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import re
+from scraper.dates import to_iso, to_iso_many
+from scraper.utils.parsers import parse_distances, tokenize_distances
+from scraper.models.provinces import Province
+from scraper.utils.region_mapper import get_name_from_province, get_region_from_province, lookup_province
+
+# Mix realistico: sigle valide, il codice non standard GOR e sigle non valide
+PROVINCE_CODES = ["BG", "MI", "BS", "GOR", "RM", "XX", "TO", "VA", "ZZ", "LC"] * 100
+
+
+# 10k date sintetiche su un anno di eventi (molte ripetute, come in una stagione reale)
+_rng = random.Random(42)
+DATES = [(date(2026, 1, 1) + timedelta(days=_rng.randrange(365))).strftime("%d/%m/%Y") for _ in range(10_000)]
+
+
+# Stringhe di distanza come nella tabella FIASP: poche varianti ripetute su migliaia di righe
+DISTANCES = ["6 - 12 - 18 km", "5 e 10 km", "6,5 - 13 km", "7 km", "4 - 8 - 14 - 21"] * 200
+
+
+def regex_distances(raw):
+    """Percorso precedente di parse_distances: replace + re.sub + re.split."""
+    raw = raw.replace(",", ".").strip()
+    raw = re.sub(r"\s+e\s+", "-", raw, flags=re.IGNORECASE)
+    return [part.strip() for part in re.split(r"\s*[-–]\s*|\s{2,}", raw) if part.strip()]
+
+
+def strptime_date(value):
+    """Percorso precedente di SupabaseManager._parse_date."""
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return value
+
+
+def enum_lookup(code):
+    """Percorso precedente di parse_location: Province(...) con eccezione + due dict lookup."""
+    try:
+        province = Province(code)
+    except ValueError:
+        return None
+    return province, get_name_from_province(province), get_region_from_province(province)
+
+
+def bench(label, func, inputs, number=200):
+    seconds = timeit.timeit(lambda: [func(x) for x in inputs], number=number)
+    per_call_ns = seconds / (number * len(inputs)) * 1e9
+    print(f"  {label:<32} {per_call_ns:8.1f} ns/call")
+    return per_call_ns
+
+
+def bench_province_lookup():
+    print("📊 Province lookup")
+    before = bench("Province(code) + 2 lookups", enum_lookup, PROVINCE_CODES)
+    after = bench("lookup_province(code)", lookup_province, PROVINCE_CODES)
+    print(f"  ⚡ {before / after:.1f}x faster")
+
+
+def bench_dates():
+    print("📊 Date parsing (10k synthetic dates)")
+    before = bench("strptime + strftime", strptime_date, DATES, number=5)
+    bench("to_iso fast path, no cache", to_iso.__wrapped__, DATES, number=5)
+    after = bench("to_iso (cached)", to_iso, DATES, number=5)
+    seconds = timeit.timeit(lambda: to_iso_many(DATES), number=5)
+    batch = seconds / (5 * len(DATES)) * 1e9
+    print(f"  {'to_iso_many (whole table)':<32} {batch:8.1f} ns/call")
+    print(f"  ⚡ {before / after:.1f}x faster (cached), {before / batch:.1f}x (batch)")
+
+
+def bench_distances():
+    print("📊 Distance parsing")
+    before = bench("replace + re.sub + re.split", regex_distances, DISTANCES)
+    bench("tokenize_distances, no cache", tokenize_distances.__wrapped__, DISTANCES)
+    after = bench("parse_distances (cached)", parse_distances, DISTANCES)
+    print(f"  ⚡ {before / after:.1f}x faster")
+
+
+if __name__ == "__main__":
+    bench_province_lookup()
+    bench_dates()
+    bench_distances()
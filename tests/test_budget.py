@@ -0,0 +1,274 @@
+"""
+Tests for the per-source time budget.
+No HTTP requests or database operations.
+"""
+from unittest.mock import MagicMock, patch
+import pytest
+from bs4 import BeautifulSoup
+from scraper.db import task_queue
+from scraper.db.supabase_client import SupabaseManager
+from scraper.models.event import PosterJob
+from scraper.models.operation import Operation
+from scraper.posters import backfill_posters
+from scraper.scheduler import run_scrapers
+from scraper.scrapers.csi_scraper import CSIScraper
+from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.utils.deadline import Deadline
+from tests.test_dry_run import POSTER_HTML
+from tests.test_registry import FakeScraper, make_event
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline:
+    """Tests for Deadline."""
+
+    def test_no_budget_never_expires(self):
+        deadline = Deadline(None)
+        assert not deadline.expired()
+        assert deadline.remaining() == float("inf")
+
+    def test_share_expires_before_full_budget(self):
+        clock = FakeClock()
+        deadline = Deadline(100, clock=clock)
+        clock.now = 70
+        assert deadline.expired(0.7)
+        assert not deadline.expired()
+        assert deadline.remaining() == 30
+        clock.now = 150
+        assert deadline.expired()
+        assert deadline.remaining() == 0
+
+    def test_paused_time_not_counted(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now = 4
+        deadline.pause()
+        clock.now = 100
+        assert deadline.elapsed() == 4
+        deadline.resume()
+        clock.now = 105
+        assert deadline.elapsed() == 9
+        assert not deadline.expired()
+
+
+class TestCSIBudget:
+    """Tests for CSI events deferred when the budget runs out."""
+
+    def test_remaining_items_deferred(self):
+        clock = FakeClock()
+        scraper = CSIScraper()
+        scraper._start_budget()
+        scraper.deadline = Deadline(10, clock=clock)
+
+        html = "<ul class='latestnews-items'>" + "<li><a href='/e'>E</a></li>" * 5 + "</ul>"
+
+        def parse_item(li):
+            clock.now += 4  # ogni pagina di dettaglio "costa" 4 secondi
+            return make_event("Camminata")
+
+        with patch("scraper.scrapers.csi_scraper.http.get", return_value=MagicMock(text=html)), \
+                patch.object(scraper, "_parse_event_item", side_effect=parse_item), \
+                patch("scraper.scrapers.csi_scraper.time.sleep"):
+            events = list(scraper._iter_events())
+
+        assert len(events) == 3
+        assert scraper.deferred_events == 2
+
+    def test_deferred_items_resumed_first(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(task_queue, "queue", task_queue.TaskQueue(tmp_path / "tasks.sqlite3"))
+        html = "<ul class='latestnews-items'>" + "".join(f"<li><a href='/{n}'>{n}</a></li>" for n in "abcde") + "</ul>"
+
+        def run(budget):
+            clock = FakeClock()
+            scraper = CSIScraper()
+            scraper._start_budget()
+            scraper.deadline = Deadline(budget, clock=clock)
+            seen = []
+
+            def parse_item(li):
+                clock.now += 4
+                seen.append(li.a["href"])
+                return make_event("Camminata")
+
+            with patch("scraper.scrapers.csi_scraper.http.get", return_value=MagicMock(text=html)), \
+                    patch.object(scraper, "_parse_event_item", side_effect=parse_item), \
+                    patch("scraper.scrapers.csi_scraper.time.sleep"):
+                list(scraper._iter_events())
+            return seen
+
+        assert run(10) == ["/a", "/b", "/c"]
+        assert run(6) == ["/d", "/e"]
+        assert run(None) == ["/a", "/b", "/c", "/d", "/e"]
+        assert task_queue.queue.stats() == {"fetch_detail": {"done": 5}}
+        task_queue.queue.close()
+
+    def test_poster_deferred_after_poster_share(self):
+        clock = FakeClock()
+        scraper = CSIScraper()
+        scraper._start_budget()
+        scraper.deadline = Deadline(10, clock=clock)
+        clock.now = 8
+        content = BeautifulSoup("<div><img src='/images/a.jpg'></div>", "html.parser")
+        event = make_event("Camminata").model_copy(update={"poster_job": scraper._poster_job(scraper._extract_poster_urls(content))})
+
+        with patch("scraper.scrapers.csi_scraper.http.get") as mock_get:
+            assert scraper.build_poster(event) is None
+        mock_get.assert_not_called()
+        assert scraper.deferred_posters == 1
+
+    def test_deferred_posters_built_first(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(task_queue, "queue", task_queue.TaskQueue(tmp_path / "tasks.sqlite3"))
+        monkeypatch.setattr(SupabaseManager, "patch_posters", classmethod(lambda cls, rows: len(rows)))
+        events = [make_event(title).model_copy(update={"poster_job": PosterJob(source="CSI", urls=["https://x/a.jpg"])})
+                  for title in "ABC"]
+
+        def run(budget_after):
+            scraper = CSIScraper()
+            built = []
+
+            def build(event):
+                built.append(event.title)
+                return {"poster": f"https://x/{event.title}.pdf", "poster_source": None, "poster_fingerprint": None}
+
+            # Il budget dei poster si esaurisce dopo budget_after poster
+            monkeypatch.setattr(scraper, "_poster_allowed", lambda: len(built) < budget_after)
+            monkeypatch.setattr(scraper, "_build_poster", build)
+            backfill_posters([scraper], events, workers=1)
+            return built
+
+        assert run(1) == ["A"]
+        assert run(3) == ["B", "C", "A"]
+        assert task_queue.queue.stats() == {"download_poster": {"done": 2}}
+        task_queue.queue.close()
+
+
+class TestScraperState:
+    """Tests for the budget state kept per scraper instance."""
+
+    def test_deferred_keys_not_shared_between_instances(self):
+        clock = FakeClock()
+        scraper = CSIScraper()
+        scraper.deadline = Deadline(10, clock=clock)
+        clock.now = 8
+        event = make_event("Camminata").model_copy(update={"poster_job": PosterJob(source="CSI", urls=["https://x/a.jpg"])})
+
+        assert scraper.build_poster(event) is None
+
+        assert scraper._deferred_poster_keys == [event.event_key]
+        assert CSIScraper()._deferred_poster_keys == []
+        assert FIASPScraper()._deferred_poster_keys == []
+
+
+class TestFIASPBudget:
+    """Tests for FIASP posters deferred when the budget runs out."""
+
+    @patch.object(FIASPScraper, "_download_and_upload_poster")
+    def test_event_kept_poster_deferred(self, mock_upload):
+        clock = FakeClock()
+        scraper = FIASPScraper()
+        scraper._start_budget()
+        scraper.deadline = Deadline(10, clock=clock)
+        clock.now = 9
+
+        events = scraper._parse_html(POSTER_HTML)
+
+        assert len(events) == 1
+        assert events[0].poster is None and events[0].poster_source is None
+        assert scraper.build_poster(events[0]) is None
+        assert scraper.deferred_posters == 1
+        mock_upload.assert_not_called()
+
+
+class TestSchedulerReport:
+    """Tests for deferred counts in the run results."""
+
+    def test_deferred_counts_reported(self):
+        class SlowScraper(FakeScraper):
+            def _fetch_events(self):
+                self._defer_events(3)
+                return self._events
+
+        results = run_scrapers([SlowScraper(events=[make_event("A")])])
+        assert results[0].deferred_events == 3
+
+
+class TestPosterBudgetAcrossSources:
+    """Tests for the poster budget of a source while slower sources are still collecting."""
+
+    def test_slow_source_does_not_consume_other_budgets(self, monkeypatch):
+        monkeypatch.setattr(SupabaseManager, "patch_posters", classmethod(lambda cls, rows: len(rows)))
+
+        class PosterScraper(FakeScraper):
+            def _build_poster(self, event):
+                return {"poster": event.poster_job.urls[0], "poster_source": None, "poster_fingerprint": None}
+
+        class SlowScraper(PosterScraper):
+            source_id = "SLOW"
+
+        class FastScraper(PosterScraper):
+            source_id = "FAST"
+
+        def pending(title, source):
+            return make_event(title).model_copy(update={"poster_job": PosterJob(source=source, urls=[f"https://x/{title}.pdf"])})
+
+        slow = SlowScraper(delay=1.0, events=[pending("Lenta", "SLOW")])
+        fast = FastScraper(events=[pending("Veloce", "FAST")])
+        fast.time_budget = 1.0
+
+        results = {result.source: result for result in run_scrapers([slow, fast])}
+
+        assert results["FAST"].posters == 1
+        assert results["FAST"].deferred_posters == 0
+
+
+class TestPosterPreservedOnUpdate:
+    """Tests for upsert_event keeping the stored poster only while a new one is pending."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        return client
+
+    def test_pending_poster_keeps_columns(self, client):
+        operation = SupabaseManager.upsert_event(
+            name="Camminata", date="01/05/2026", location_id=1, organizer="CSI", keep_poster=True,
+            event_key="camminata|2026-05-01|BG", event_ids={"camminata|2026-05-01|BG": 7},
+        )
+        data = client.table.return_value.update.call_args.args[0]
+        assert operation == Operation.UPDATED
+        assert "poster" not in data and "poster_source" not in data and "poster_fingerprint" not in data
+
+    def test_removed_poster_cleared(self, client):
+        SupabaseManager.upsert_event(
+            name="Camminata", date="01/05/2026", location_id=1, organizer="CSI",
+            event_key="camminata|2026-05-01|BG", event_ids={"camminata|2026-05-01|BG": 7},
+        )
+        data = client.table.return_value.update.call_args.args[0]
+        assert data["poster"] is None and data["poster_source"] is None and data["poster_fingerprint"] is None
+
+    def test_save_keeps_poster_only_when_pending(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(SupabaseManager, "upsert_location", classmethod(lambda cls, **kwargs: 1))
+        monkeypatch.setattr(SupabaseManager, "upsert_event", classmethod(lambda cls, **kwargs: calls.append(kwargs)))
+        scraper = CSIScraper()
+        job = scraper._poster_job(["https://x/a.jpg"])
+
+        scraper._save_event(make_event("A").model_copy(update={"poster_job": job}), {})
+        scraper._save_event(make_event("B"), {})
+
+        assert [call["keep_poster"] for call in calls] == [True, False]
+
+    def test_update_with_poster_overwrites(self, client):
+        SupabaseManager.upsert_event(
+            name="Camminata", date="01/05/2026", location_id=1, organizer="CSI", poster="https://x/p.pdf",
+            event_key="camminata|2026-05-01|BG", event_ids={"camminata|2026-05-01|BG": 7},
+        )
+        assert client.table.return_value.update.call_args.args[0]["poster"] == "https://x/p.pdf"
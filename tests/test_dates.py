@@ -0,0 +1,62 @@
+"""
+Tests for date normalization and year inference.
+"""
+from datetime import date
+import pytest
+from scraper.dates import DateFormatError, infer_year, italian_date, to_iso, to_iso_many
+from scraper.db.supabase_client import SupabaseManager
+
+
+class TestToIso:
+    """Tests for to_iso and to_iso_many."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("15/03/2026", "2026-03-15"),
+        ("5/3/2026", "2026-03-05"),
+        ("15-03-2026", "2026-03-15"),
+        ("15.03.2026", "2026-03-15"),
+        (" 15/03/2026 ", "2026-03-15"),
+        ("2026-03-15", "2026-03-15"),
+    ])
+    def test_supported_formats(self, raw, expected):
+        assert to_iso(raw) == expected
+
+    @pytest.mark.parametrize("raw", ["", "15/03", "marzo 2026", "31/02/2026", "15/00/2026", "2026/03/15"])
+    def test_invalid_dates_raise(self, raw):
+        with pytest.raises(DateFormatError):
+            to_iso(raw)
+
+    def test_supabase_parse_date_raises_on_unknown_format(self):
+        assert SupabaseManager._parse_date("15/03/2026") == "2026-03-15"
+        with pytest.raises(ValueError):
+            SupabaseManager._parse_date("15 marzo")
+
+    def test_batch_conversion(self):
+        assert to_iso_many(["01/05/2026", "bad", "01/05/2026", "2026-06-02"]) == [
+            "2026-05-01", None, "2026-05-01", "2026-06-02",
+        ]
+
+
+class TestInferYear:
+    """Tests for year inference across the December/January rollover."""
+
+    def test_same_year(self):
+        assert infer_year(5, 10, today=date(2026, 3, 1)) == 2026
+
+    def test_january_event_seen_in_december(self):
+        assert infer_year(1, 10, today=date(2025, 12, 20)) == 2026
+
+    def test_recent_december_event_seen_in_january(self):
+        assert infer_year(12, 20, today=date(2026, 1, 5)) == 2025
+
+    def test_old_date_rolls_forward(self):
+        assert infer_year(3, 1, today=date(2026, 10, 19)) == 2027
+
+    def test_leap_day(self):
+        assert infer_year(2, 29, today=date(2025, 6, 1)) == 2028
+
+    def test_italian_date(self):
+        assert italian_date("5", "Gennaio", today=date(2025, 12, 1)) == "05/01/2026"
+        assert italian_date("5", "gennaio", today=date(2025, 12, 1)) == "05/01/2026"
+        assert italian_date("5", "Brumaio", today=date(2025, 12, 1)) is None
+        assert italian_date("31", "Aprile", today=date(2025, 12, 1)) is None
@@ -0,0 +1,113 @@
+"""
+Tests for cross-source event deduplication.
+"""
+import hashlib
+import time
+import pytest
+from scraper.models.event import Event
+from scraper.config import DEDUP_THRESHOLD
+from scraper.utils.dedup import deduplicate, merge_events, normalize_title, title_similarity
+from scraper.utils.parsers import parse_location
+
+
+def make_event(title, date="01/05/2026", location="Bergamo (BG)", source="CSI", poster=None, distances=None):
+    return Event(
+        title=title,
+        date=date,
+        location=parse_location(location),
+        poster=poster,
+        poster_source=poster,
+        source=source,
+        distances=distances or [],
+    )
+
+
+class TestTitleSimilarity:
+    """Tests for title normalization and similarity."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("38ª Camminata di Spinone al Lago", "spinone lago"),
+        ("XXV MARCIA NON COMPETITIVA dei Colli", "colli"),
+        ("Sentiero dell'Amicizia", "sentiero amicizia"),
+        ("Corsa dei 100 anni", "100 anni"),
+    ])
+    def test_normalize_title(self, raw, expected):
+        assert normalize_title(raw) == expected
+
+    def test_contained_title_matches(self):
+        assert title_similarity("Camminata di Spinone", "38ª Camminata di Spinone al Lago") >= DEDUP_THRESHOLD
+
+    def test_short_title_inside_longer_one_does_not_match(self):
+        assert title_similarity("San Giovanni", "Festa di San Giovanni Bianco") < DEDUP_THRESHOLD
+
+    def test_word_order_matches(self):
+        assert title_similarity("Colli e Lago", "Lago dei Colli") == 1.0
+
+    def test_typo_is_similar(self):
+        assert title_similarity("Sentiero dei fiori", "Sentiero del fiore") >= DEDUP_THRESHOLD
+
+    def test_different_titles(self):
+        assert title_similarity("Festa di primavera", "Notturna delle lanterne") < DEDUP_THRESHOLD
+
+    def test_generic_title_never_matches(self):
+        assert title_similarity("Camminata", "Camminata") == 0.0
+
+
+class TestDeduplicate:
+    """Tests for deduplicate and merge_events."""
+
+    def test_cross_source_duplicate_merged_into_first(self):
+        csi = [make_event("Camminata di Spinone", distances=["6 km"])]
+        fiasp = [make_event("38ª Camminata Spinone", source="FIASP", poster="https://example.com/p.pdf",
+                            distances=["6 km", "12 km"])]
+
+        (kept_csi, kept_fiasp), removed = deduplicate([csi, fiasp])
+
+        assert removed == 1
+        assert kept_fiasp == []
+        assert kept_csi[0].title == "Camminata di Spinone"
+        assert kept_csi[0].distances == ["6 km", "12 km"]
+        assert kept_csi[0].poster_source == "https://example.com/p.pdf"
+
+    def test_different_date_or_province_not_merged(self):
+        csi = [make_event("Camminata di Spinone")]
+        fiasp = [
+            make_event("Camminata di Spinone", date="02/05/2026", source="FIASP"),
+            make_event("Camminata di Spinone", location="Como (CO)", source="FIASP"),
+        ]
+        (_, kept_fiasp), removed = deduplicate([csi, fiasp])
+        assert removed == 0
+        assert len(kept_fiasp) == 2
+
+    @pytest.mark.parametrize("date", ["1/5/2026", "2026-05-01", "01.05.2026"])
+    def test_same_day_in_another_format_merged(self, date):
+        csi = [make_event("Camminata di Spinone")]
+        fiasp = [make_event("Camminata di Spinone", date=date, source="FIASP")]
+        (_, kept_fiasp), removed = deduplicate([csi, fiasp])
+        assert removed == 1
+        assert kept_fiasp == []
+
+    def test_same_source_not_merged(self):
+        events = [make_event("Camminata dei Colli"), make_event("Camminata dei Colli notturna")]
+        (kept,), removed = deduplicate([events])
+        assert removed == 0
+        assert len(kept) == 2
+
+    def test_merge_keeps_primary_poster(self):
+        primary = make_event("A", poster="https://example.com/a.pdf")
+        duplicate = make_event("A", poster="https://example.com/b.pdf")
+        assert merge_events(primary, duplicate) is primary
+
+    def test_large_batch_scales_linearly(self):
+        dates = [f"{day:02d}/05/2026" for day in range(1, 29)]
+        titles = [f"Camminata {hashlib.sha1(str(i).encode()).hexdigest()[:10]}" for i in range(2000)]
+        csi = [make_event(title, date=dates[i % 28]) for i, title in enumerate(titles)]
+        fiasp = [make_event(title.upper(), date=dates[i % 28], source="FIASP") for i, title in enumerate(titles)]
+
+        start = time.perf_counter()
+        (kept_csi, kept_fiasp), removed = deduplicate([csi, fiasp])
+
+        assert removed == 2000
+        assert kept_fiasp == []
+        assert [e.title for e in kept_csi] == titles
+        assert time.perf_counter() - start < 5
@@ -0,0 +1,93 @@
+"""
+Tests for the dry-run mode: JSONL streaming of parsed events.
+No HTTP requests or database operations.
+"""
+import io
+import json
+from unittest.mock import patch
+from scraper.scheduler import stream_scrapers
+from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.utils.jsonl import JsonlWriter
+from tests.test_registry import FakeScraper, make_event
+
+POSTER_HTML = """
+<html><body>
+    <table>
+        <tr><th>Data</th><th>Titolo</th><th>Località</th><th>D1</th><th>D2</th><th>D3</th><th>Volantino</th></tr>
+        <tr>
+            <td>01/03/2026</td><td>Test Event</td><td>Bergamo (BG)</td><td>6 km</td><td></td><td></td>
+            <td><a href="https://drive.google.com/file/d/1abc123/view">PDF</a></td>
+        </tr>
+    </table>
+</body></html>
+"""
+
+
+class TestJsonlWriter:
+    """Tests for the JSONL writer."""
+
+    def test_writes_one_event_per_line_to_stream(self):
+        stream = io.StringIO()
+        with JsonlWriter(stream=stream) as writer:
+            writer.write(make_event("Camminata di primavera"))
+            writer.write(make_event("Marcia d'autunno"))
+
+        lines = stream.getvalue().splitlines()
+        assert writer.count == 2
+        assert [json.loads(line)["title"] for line in lines] == ["Camminata di primavera", "Marcia d'autunno"]
+        assert json.loads(lines[0])["location"]["province"] == "BG"
+
+    def test_writes_to_file(self, tmp_path):
+        path = tmp_path / "out" / "events.jsonl"
+        with JsonlWriter(path) as writer:
+            writer.write(make_event("Camminata"))
+
+        assert json.loads(path.read_text(encoding="utf-8"))["title"] == "Camminata"
+
+    def test_dash_means_stream(self):
+        stream = io.StringIO()
+        with JsonlWriter("-", stream=stream) as writer:
+            writer.write(make_event("Camminata"))
+        assert writer.path is None
+        assert stream.getvalue().count("\n") == 1
+
+
+class TestStreamScrapers:
+    """Tests for the streaming scheduler."""
+
+    def test_streams_events_without_saving(self):
+        scrapers = [FakeScraper(events=[make_event("A"), make_event("B")]), FakeScraper(events=[make_event("C")])]
+        stream = io.StringIO()
+        with JsonlWriter(stream=stream) as writer:
+            results = stream_scrapers(scrapers, writer.write)
+
+        assert [result.parsed for result in results] == [2, 1]
+        assert writer.count == 3
+        assert all(scraper.saved is None for scraper in scrapers)
+        # Le coordinate vengono aggiunte anche in dry run
+        assert json.loads(stream.getvalue().splitlines()[0])["location"]["lat"] is not None
+
+    def test_failing_source_is_isolated(self):
+        scrapers = [FakeScraper(error=RuntimeError("boom")), FakeScraper(events=[make_event("A")])]
+        with JsonlWriter(stream=io.StringIO()) as writer:
+            results = stream_scrapers(scrapers, writer.write)
+
+        assert results[0].error == "boom"
+        assert results[1].parsed == 1
+        assert writer.count == 1
+
+
+class TestFIASPDryRun:
+    """Tests for FIASP parsing in dry-run mode."""
+
+    @patch.object(FIASPScraper, "_download_and_upload_poster")
+    def test_does_not_download_posters(self, mock_upload):
+        scraper = FIASPScraper()
+        scraper.dry_run = True
+        events = scraper._parse_html(POSTER_HTML)
+
+        assert len(events) == 1
+        assert events[0].poster is None
+        assert events[0].poster_source == "https://drive.google.com/file/d/1abc123/view"
+        assert events[0].distances_km == [6.0]
+        mock_upload.assert_not_called()
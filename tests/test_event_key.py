@@ -0,0 +1,104 @@
+"""
+Tests for the normalized event key and the batched existence lookup.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from scraper.db.supabase_client import SupabaseManager
+from scraper.models.event import Event, canonical_title, make_event_key
+from scraper.models.operation import Operation
+from scraper.scrapers.base import BaseScraper
+from scraper.utils.parsers import parse_location
+from tests.test_registry import FakeScraper
+
+
+def make_event(title, date="01/05/2026", location="Bergamo (BG)"):
+    return Event(title=title, date=date, location=parse_location(location), source="FAKE", distances=[])
+
+
+class TestEventKey:
+    """Tests for canonical_title and make_event_key."""
+
+    @pytest.mark.parametrize("raw", [
+        "Camminata dei Colli",
+        "  CAMMINATA   DEI COLLI ",
+        "Camminata dei Colli!",
+        "Camminata dèi Colli",
+    ])
+    def test_title_variants_share_key(self, raw):
+        assert make_event_key(raw, "01/05/2026", "BG") == "camminata dei colli|2026-05-01|BG"
+
+    def test_apostrophes_and_ordinals(self):
+        assert canonical_title("38ª Camminata dell'Amicizia") == "38a camminata dell amicizia"
+
+    def test_date_formats_share_key(self):
+        assert make_event_key("A", "1/5/2026", "BG") == make_event_key("A", "2026-05-01", "BG") == "a|2026-05-01|BG"
+
+    def test_event_key_includes_province(self):
+        assert make_event("Camminata").event_key != make_event("Camminata", location="Como (CO)").event_key
+
+
+class TestBatchedSave:
+    """Tests for BaseScraper.save with a single batched lookup."""
+
+    def test_single_lookup_for_all_events(self, monkeypatch):
+        lookups = []
+        calls = []
+
+        def fetch_event_ids(keys):
+            lookups.append(keys)
+            return {"camminata dei colli|2026-05-01|BG": 7}
+
+        def upsert_event(**kwargs):
+            calls.append(kwargs)
+            ids = kwargs["event_ids"]
+            if kwargs["event_key"] in ids:
+                return Operation.UPDATED
+            ids[kwargs["event_key"]] = 8
+            return Operation.INSERTED
+
+        monkeypatch.setattr(SupabaseManager, "fetch_event_ids", fetch_event_ids)
+        monkeypatch.setattr(SupabaseManager, "upsert_location", lambda **kwargs: 1)
+        monkeypatch.setattr(SupabaseManager, "upsert_event", upsert_event)
+
+        events = [make_event("CAMMINATA DEI COLLI"), make_event("Notturna"), make_event("notturna!")]
+        inserted, updated = BaseScraper.save(FakeScraper(), events)
+
+        assert len(lookups) == 1
+        assert (inserted, updated) == (1, 2)
+        assert [call["event_key"] for call in calls] == [event.event_key for event in events]
+
+
+class TestBackfillEventKeys:
+    """Tests for SupabaseManager.backfill_event_keys."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        return client
+
+    def rows(self, client, rows):
+        query = client.table.return_value.select.return_value.is_.return_value.order.return_value
+        query.range.return_value.execute.return_value = SimpleNamespace(data=rows, count=None)
+
+    def test_province_derived_from_city(self, client, monkeypatch):
+        # Salvato prima di user-033 con la provincia di default BG
+        self.rows(client, [{"id": 1, "name": "Camminata", "date": "2026-05-01", "location": {"city": "Cormons", "province": "BG"}}])
+        monkeypatch.setattr(SupabaseManager, "fetch_event_ids", classmethod(lambda cls, keys: {}))
+
+        assert SupabaseManager.backfill_event_keys() == 1
+        update = client.table.return_value.update
+        assert update.call_args.args[0] == {"event_key": "camminata|2026-05-01|GO"}
+
+    def test_duplicates_removed_instead_of_retried(self, client, monkeypatch):
+        self.rows(client, [
+            {"id": 1, "name": "Camminata", "date": "2026-05-01", "location": {"city": "Bergamo", "province": "BG"}},
+            {"id": 2, "name": "Notturna", "date": "2026-05-01", "location": {"city": "Bergamo", "province": "BG"}},
+            {"id": 3, "name": "NOTTURNA", "date": "2026-05-01", "location": {"city": "Bergamo", "province": "BG"}},
+        ])
+        monkeypatch.setattr(SupabaseManager, "fetch_event_ids",
+                            classmethod(lambda cls, keys: {"camminata|2026-05-01|BG": 9}))
+
+        assert SupabaseManager.backfill_event_keys() == 1
+        client.table.return_value.delete.return_value.in_.assert_called_once_with("id", [1, 3])
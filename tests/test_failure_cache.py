@@ -0,0 +1,105 @@
+"""
+Tests for the persistent failure cache and its use in the HTTP layer.
+"""
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from scraper.utils import http
+from scraper.utils.failure_cache import FailureCache
+
+URL = "https://www.csibergamo.it/images/broken.jpg"
+
+
+class TestFailureCache:
+    """Tests for FailureCache."""
+
+    def test_unknown_url_not_skipped(self):
+        assert FailureCache().should_skip(URL) is False
+
+    def test_failed_url_skipped(self):
+        cache = FailureCache(base_interval=3600)
+        cache.record_failure(URL, "HTTPError 404")
+        assert cache.should_skip(URL) is True
+        assert cache.skipped == 1
+
+    def test_interval_doubles_and_is_capped(self):
+        cache = FailureCache(base_interval=10, max_interval=35)
+        intervals = []
+        for _ in range(4):
+            cache.record_failure(URL, "HTTPError 404")
+            intervals.append(round(cache.retry_at(URL) - cache._entries[URL]["last_failed"]))
+        assert intervals == [10, 20, 35, 35]
+
+    def test_reprobe_after_interval(self):
+        cache = FailureCache(base_interval=0)
+        cache.record_failure(URL, "HTTPError 404")
+        assert cache.should_skip(URL) is False
+
+    @pytest.mark.parametrize("error", ["ReadTimeout", "ConnectionError", "HTTPError 503", "HTTPError 429"])
+    def test_transient_error_short_fixed_interval(self, error):
+        cache = FailureCache(base_interval=3600, transient_interval=60)
+        for _ in range(3):
+            cache.record_failure(URL, error)
+        assert round(cache.retry_at(URL) - cache._entries[URL]["last_failed"]) == 60
+        assert cache._entries[URL]["failures"] == 0
+
+    def test_transient_errors_do_not_grow_backoff(self):
+        cache = FailureCache(base_interval=10, transient_interval=1)
+        cache.record_failure(URL, "ReadTimeout")
+        cache.record_failure(URL, "HTTPError 404")
+        assert round(cache.retry_at(URL) - cache._entries[URL]["last_failed"]) == 10
+
+    def test_success_clears_entry(self):
+        cache = FailureCache(base_interval=3600)
+        cache.record_failure(URL, "HTTPError 404")
+        cache.record_success(URL)
+        assert cache.should_skip(URL) is False
+        assert len(cache) == 0
+
+    def test_entry_records_error_and_times(self):
+        cache = FailureCache()
+        cache.record_failure(URL, "HTTPError 404")
+        cache.record_failure(URL, "HTMLResponse")
+        entry = cache._entries[URL]
+        assert entry["error"] == "HTMLResponse"
+        assert entry["failures"] == 2
+        assert entry["first_failed"] <= entry["last_failed"] <= time.time()
+
+    def test_persisted(self, tmp_path):
+        path = tmp_path / "failures.json"
+        cache = FailureCache(path, base_interval=3600)
+        cache.record_failure(URL, "HTTPError 404")
+        cache.save()
+        assert FailureCache(path, base_interval=3600).should_skip(URL) is True
+
+
+class TestHttpNegativeCache:
+    """Tests for http.get with skip_known_failures."""
+
+    @pytest.fixture(autouse=True)
+    def cache(self, monkeypatch):
+        cache = FailureCache(base_interval=3600)
+        monkeypatch.setattr(http, "failures", cache)
+        return cache
+
+    @patch('scraper.utils.http.requests.get')
+    def test_404_recorded_then_skipped(self, mock_get, cache):
+        mock_get.return_value = MagicMock(status_code=404)
+        http.get(URL, skip_known_failures=True)
+        with pytest.raises(http.SkippedURLError):
+            http.get(URL, skip_known_failures=True)
+        assert mock_get.call_count == 1
+        assert cache._entries[URL]["error"] == "HTTPError 404"
+
+    @patch('scraper.utils.http.requests.get', side_effect=TimeoutError("timed out"))
+    def test_exception_recorded(self, mock_get, cache):
+        with pytest.raises(TimeoutError):
+            http.get(URL, skip_known_failures=True)
+        assert cache._entries[URL]["error"] == "TimeoutError"
+
+    @patch('scraper.utils.http.requests.get')
+    def test_not_used_without_flag(self, mock_get, cache):
+        cache.record_failure(URL, "HTTPError 404")
+        mock_get.return_value = MagicMock(status_code=200)
+        http.get(URL)
+        mock_get.assert_called_once()
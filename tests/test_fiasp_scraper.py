@@ -87,6 +87,7 @@ class TestFIASPScraperParsing:
 
         assert len(events) == 1
         assert len(events[0].distances) >= 2
+        assert events[0].distances_km == [5.0, 10.0, 15.0]
 
     @patch.object(FIASPScraper, '_download_and_upload_poster',
                   return_value="https://xyz.supabase.co/storage/v1/object/public/posters/fiasp-test-event-2026-03-01.pdf")
@@ -112,8 +113,14 @@ class TestFIASPScraperParsing:
         events = scraper._parse_html(html)
 
         assert len(events) == 1
-        assert events[0].poster is not None
-        assert "supabase.co" in str(events[0].poster)
+        # L'evento è salvato senza poster: il download avviene nel backfill
+        assert events[0].poster is None
+        mock_upload.assert_not_called()
+        assert events[0].poster_job.urls == ["https://drive.google.com/file/d/1abc123/view"]
+
+        columns = scraper.build_poster(events[0])
+        assert "supabase.co" in columns["poster"]
+        assert columns["poster_source"] == "https://drive.google.com/file/d/1abc123/view"
         mock_upload.assert_called_once_with(
             "https://drive.google.com/file/d/1abc123/view", "Test Event", "01/03/2026"
         )
@@ -261,7 +268,7 @@ class TestFIASPPosterUpload:
         fid = scraper._extract_gdrive_file_id("https://example.com/poster.pdf")
         assert fid is None
 
-    @patch('scraper.scrapers.fiasp_scraper.requests.get')
+    @patch('scraper.utils.http.requests.get')
     @patch('scraper.db.supabase_client.SupabaseManager.upload_poster',
            return_value="https://xyz.supabase.co/storage/v1/object/public/posters/fiasp-test-event-2026-03-01.pdf")
     def test_download_and_upload_poster_gdrive_pdf(self, mock_upload, mock_get):
@@ -286,7 +293,7 @@ class TestFIASPPosterUpload:
         assert "1abc123XYZ" in called_url
         mock_upload.assert_called_once_with("fiasp-test-event-2026-03-01.pdf", b"%PDF-1.4 fake content")
 
-    @patch('scraper.scrapers.fiasp_scraper.requests.get')
+    @patch('scraper.utils.http.requests.get')
     def test_download_and_upload_poster_returns_none_on_html_response(self, mock_get):
         """Ritorna None se il server risponde con HTML (es. pagina di virus scan)."""
         mock_resp = MagicMock()
@@ -303,7 +310,7 @@ class TestFIASPPosterUpload:
         )
         assert result is None
 
-    @patch('scraper.scrapers.fiasp_scraper.requests.get', side_effect=Exception("connection error"))
+    @patch('scraper.utils.http.requests.get', side_effect=Exception("connection error"))
     def test_download_and_upload_poster_returns_none_on_network_error(self, mock_get):
         """Ritorna None in caso di errore di rete."""
         scraper = FIASPScraper()
@@ -314,7 +321,7 @@ class TestFIASPPosterUpload:
         )
         assert result is None
 
-    @patch('scraper.scrapers.fiasp_scraper.requests.get')
+    @patch('scraper.utils.http.requests.get')
     @patch('scraper.db.supabase_client.SupabaseManager.upload_poster',
            return_value="https://xyz.supabase.co/storage/v1/object/public/posters/fiasp-test-event-2026-03-01.pdf")
     def test_download_and_upload_poster_accepts_octet_stream(self, mock_upload, mock_get):
@@ -333,3 +340,100 @@ class TestFIASPPosterUpload:
         )
         assert result is not None
         mock_upload.assert_called_once()
+
+
+class TestFIASPPosterDelta:
+    """Tests for reusing already uploaded posters when the source link is unchanged."""
+
+    STORAGE_URL = "https://xyz.supabase.co/storage/v1/object/public/posters/fiasp-test-event-2026-03-01.pdf"
+    HTML = """
+    <html><body>
+        <table>
+            <tr><th>Data</th><th>Titolo</th><th>Località</th><th>D1</th><th>D2</th><th>D3</th><th>Volantino</th></tr>
+            <tr>
+                <td>01/03/2026</td>
+                <td>Test Event</td>
+                <td>Bergamo (BG)</td>
+                <td></td>
+                <td></td>
+                <td></td>
+                <td><a href="https://example.com/flyer.pdf">PDF</a></td>
+            </tr>
+        </table>
+    </body></html>
+    """
+
+    def _scraper(self, poster_source, fingerprint="abc"):
+        scraper = FIASPScraper()
+        scraper._known_posters = {
+            ("Test Event", "2026-03-01"): {
+                "poster": self.STORAGE_URL,
+                "poster_source": poster_source,
+                "poster_fingerprint": fingerprint,
+            }
+        }
+        return scraper
+
+    @patch('scraper.utils.http.requests.get')
+    def test_unchanged_link_reuses_poster_without_network(self, mock_get):
+        scraper = self._scraper("https://example.com/flyer.pdf")
+        events = scraper._parse_html(self.HTML)
+
+        mock_get.assert_not_called()
+        assert str(events[0].poster) == self.STORAGE_URL
+        assert events[0].poster_source == "https://example.com/flyer.pdf"
+        assert events[0].poster_fingerprint == "abc"
+
+    @patch('scraper.utils.http.requests.get')
+    @patch('scraper.db.supabase_client.SupabaseManager.upload_poster', return_value=STORAGE_URL)
+    def test_changed_link_downloads_and_stores_fingerprint(self, mock_upload, mock_get):
+        mock_resp = MagicMock()
+        mock_resp.content = b"%PDF-1.4 new content"
+        mock_resp.headers = {'Content-Type': 'application/pdf'}
+        mock_get.return_value = mock_resp
+
+        scraper = self._scraper("https://example.com/old-flyer.pdf")
+        events = scraper._parse_html(self.HTML)
+        mock_get.assert_not_called()
+        columns = scraper.build_poster(events[0])
+
+        mock_get.assert_called_once()
+        mock_upload.assert_called_once()
+        assert columns["poster_source"] == "https://example.com/flyer.pdf"
+        assert len(columns["poster_fingerprint"]) == 64
+
+    @patch('scraper.utils.http.requests.get')
+    @patch('scraper.db.supabase_client.SupabaseManager.upload_poster')
+    def test_same_content_skips_upload(self, mock_upload, mock_get):
+        import hashlib
+        content = b"%PDF-1.4 same content"
+        mock_resp = MagicMock()
+        mock_resp.content = content
+        mock_resp.headers = {'Content-Type': 'application/pdf'}
+        mock_get.return_value = mock_resp
+
+        scraper = self._scraper("https://example.com/old-flyer.pdf", hashlib.sha256(content).hexdigest())
+        events = scraper._parse_html(self.HTML)
+        columns = scraper.build_poster(events[0])
+
+        mock_upload.assert_not_called()
+        assert columns["poster"] == self.STORAGE_URL
+
+    def test_poster_index_paged_and_upcoming_only(self, monkeypatch):
+        from types import SimpleNamespace
+        from scraper.db.supabase_client import SupabaseManager
+
+        client = MagicMock()
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        monkeypatch.setattr("scraper.db.supabase_client.DB_PAGE_SIZE", 1)
+        query = client.table.return_value.select.return_value.eq.return_value.gte.return_value.not_.is_.return_value.order.return_value
+        query.range.return_value.execute.side_effect = [
+            SimpleNamespace(data=[{"name": "A", "date": "2026-05-01", "poster": "p1"}], count=None),
+            SimpleNamespace(data=[{"name": "B", "date": "2026-05-02", "poster": "p2"}], count=None),
+            SimpleNamespace(data=[], count=None),
+        ]
+
+        index = SupabaseManager.fetch_poster_index("FIASP Italia")
+
+        assert set(index) == {("A", "2026-05-01"), ("B", "2026-05-02")}
+        assert query.range.call_count == 3
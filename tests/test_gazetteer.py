@@ -0,0 +1,62 @@
+"""
+Tests for the offline comuni gazetteer.
+"""
+import pytest
+from scraper.utils.gazetteer import Gazetteer, get_gazetteer, normalize_name
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer([
+        ("Bergamo", "BG"),
+        ("Villa d'Almè", "BG"),
+        ("Castro", "BG"),
+        ("Castro", "LE"),
+        ("Cormons", "GO"),
+        ("Forlì", "FC"),
+    ])
+
+
+class TestNormalizeName:
+    """Tests for normalize_name."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("Bergamo", "bergamo"),
+        ("  BERGAMO  ", "bergamo"),
+        ("Villa d'Almè", "villa d alme"),
+        ("FORLÌ", "forli"),
+        ("Carvico [Tensostruttura]", "carvico"),
+        ("Sant'Omobono Terme", "sant omobono terme"),
+    ])
+    def test_normalize(self, raw, expected):
+        assert normalize_name(raw) == expected
+
+
+class TestGazetteer:
+    """Tests for exact and fuzzy resolution."""
+
+    def test_exact_lookup_ignores_case_and_accents(self, gazetteer):
+        assert gazetteer.lookup("VILLA D'ALME") == ["BG"]
+        assert gazetteer.lookup("forli") == ["FC"]
+
+    def test_fuzzy_match_typo(self, gazetteer):
+        name, provinces, score = gazetteer.fuzzy("Cormonss")
+        assert name == "cormons"
+        assert provinces == ["GO"]
+        assert score >= 0.75
+
+    def test_fuzzy_rejects_unrelated(self, gazetteer):
+        assert gazetteer.fuzzy("Palermo") is None
+
+    def test_ambiguous_name_needs_preference(self, gazetteer):
+        assert gazetteer.resolve("Castro") is None
+        assert gazetteer.resolve("Castro", prefer="LE") == "LE"
+
+    def test_unknown_city(self, gazetteer):
+        assert gazetteer.resolve("Xyzzy") is None
+
+    def test_bundled_gazetteer_loads(self):
+        gazetteer = get_gazetteer()
+        assert len(gazetteer) > 100
+        assert gazetteer.resolve("Spinone al Lago") == "BG"
+        assert gazetteer.resolve("Roma") == "RM"
@@ -0,0 +1,103 @@
+"""
+Tests for the Google Drive fetcher (no real HTTP requests).
+"""
+from unittest.mock import patch, MagicMock
+import pytest
+from scraper.utils import http
+from scraper.utils.failure_cache import FailureCache
+from scraper.utils.gdrive import GoogleDriveFetcher, _confirm_url, download_url
+
+CONFIRM_PAGE = b"""
+<html><body>
+<p>Google Drive can't scan this file for viruses.</p>
+<form id="download-form" action="https://drive.usercontent.google.com/download" method="get">
+  <input type="submit" value="Download anyway">
+  <input type="hidden" name="id" value="BIGFILE">
+  <input type="hidden" name="export" value="download">
+  <input type="hidden" name="confirm" value="t">
+  <input type="hidden" name="uuid" value="1234-abcd">
+</form>
+</body></html>
+"""
+
+
+def response(content, content_type):
+    resp = MagicMock()
+    resp.content = content
+    resp.headers = {'Content-Type': content_type}
+    return resp
+
+
+class TestConfirmUrl:
+    """Tests for the virus-scan interstitial parsing."""
+
+    def test_download_form(self):
+        url = _confirm_url(CONFIRM_PAGE.decode(), "BIGFILE")
+        assert url.startswith("https://drive.usercontent.google.com/download?")
+        assert "confirm=t" in url
+        assert "uuid=1234-abcd" in url
+
+    def test_legacy_confirm_token(self):
+        html = '<a href="/uc?export=download&amp;confirm=AbC_1&amp;id=X">Download</a>'
+        url = _confirm_url(html, "X")
+        assert "confirm=AbC_1" in url
+        assert "id=X" in url
+
+    def test_no_token(self):
+        assert _confirm_url("<html>Access denied</html>", "X") is None
+
+
+@pytest.fixture
+def failures(monkeypatch):
+    """Cache dei fallimenti condivisa, solo in memoria."""
+    cache = FailureCache()
+    monkeypatch.setattr(http, "failures", cache)
+    return cache
+
+
+class TestGoogleDriveFetcher:
+    """Tests for GoogleDriveFetcher.fetch."""
+
+    @patch('scraper.utils.http.requests.get')
+    def test_follows_confirm_page(self, mock_get):
+        mock_get.side_effect = [
+            response(CONFIRM_PAGE, "text/html; charset=utf-8"),
+            response(b"%PDF-1.4 big", "application/pdf"),
+        ]
+        fetcher = GoogleDriveFetcher()
+        assert fetcher.fetch("BIGFILE") == (b"%PDF-1.4 big", "application/pdf")
+        assert "uuid=1234-abcd" in mock_get.call_args_list[1][0][0]
+
+    @patch('scraper.utils.http.requests.get')
+    def test_confirm_token_resolved_every_time(self, mock_get):
+        mock_get.side_effect = [
+            response(CONFIRM_PAGE, "text/html"),
+            response(b"%PDF", "application/pdf"),
+            response(CONFIRM_PAGE, "text/html"),
+            response(b"%PDF", "application/pdf"),
+        ]
+        fetcher = GoogleDriveFetcher()
+        fetcher.fetch("BIGFILE")
+        fetcher.fetch("BIGFILE")
+        # Il token di conferma vale una sola volta: si riparte sempre dall'URL di download
+        assert mock_get.call_args_list[2][0][0] == download_url("BIGFILE")
+
+    @patch('scraper.utils.http.requests.get')
+    def test_failed_file_skipped_by_failure_cache(self, mock_get, failures):
+        mock_get.return_value = response(b"<html>denied</html>", "text/html")
+        fetcher = GoogleDriveFetcher()
+        assert fetcher.fetch("BROKEN") is None
+        calls = mock_get.call_count
+        assert fetcher.fetch("BROKEN") is None
+        assert mock_get.call_count == calls
+        assert failures.skipped == 1
+        assert failures.retry_at(download_url("BROKEN")) is not None
+
+    @patch('scraper.utils.http.requests.get')
+    def test_success_clears_failure(self, mock_get, failures, monkeypatch):
+        mock_get.side_effect = [Exception("timeout"), response(b"%PDF", "application/pdf")]
+        fetcher = GoogleDriveFetcher()
+        assert fetcher.fetch("FLAKY") is None
+        monkeypatch.setattr(failures, "should_skip", lambda url: False)
+        assert fetcher.fetch("FLAKY") == (b"%PDF", "application/pdf")
+        assert len(failures) == 0
@@ -0,0 +1,74 @@
+"""
+Tests for offline geocoding of locations.
+"""
+import pytest
+from scraper.models.event import Event
+from scraper.models.provinces import Province
+from scraper.utils.geocoder import Geocoder, enrich_events, geocode_location, get_geocoder
+from scraper.utils.parsers import parse_location
+
+
+@pytest.fixture
+def geocoder():
+    return Geocoder([
+        ("Bergamo", "BG", 45.698, 9.677, True),
+        ("Villa d'Almè", "BG", 45.748, 9.617, False),
+        ("Gorizia", "GO", 45.941, 13.622, True),
+    ])
+
+
+class TestGeocoder:
+    """Tests for Geocoder.locate."""
+
+    def test_exact_match_normalizes_name(self, geocoder):
+        coordinates = geocoder.locate("VILLA D'ALME", "BG")
+        assert (coordinates.lat, coordinates.lon) == (45.748, 9.617)
+        assert coordinates.exact
+
+    def test_unknown_city_falls_back_to_capital(self, geocoder):
+        coordinates = geocoder.locate("Paesinventato", "BG")
+        assert (coordinates.lat, coordinates.lon) == (45.698, 9.677)
+        assert not coordinates.exact
+
+    def test_same_name_other_province_is_not_matched(self, geocoder):
+        coordinates = geocoder.locate("Villa d'Almè", "GO")
+        assert (coordinates.lat, coordinates.lon) == (45.941, 13.622)
+        assert not coordinates.exact
+
+    def test_province_alias(self, geocoder):
+        assert geocoder.locate("Cormons", "GOR").lat == 45.941
+
+    def test_unknown_province(self, geocoder):
+        assert geocoder.locate("Roma", "RM") is None
+
+
+class TestBundledCoordinates:
+    """Tests for the bundled coordinate table and enrichment stage."""
+
+    def test_every_province_has_a_capital(self):
+        geocoder = get_geocoder()
+        for province in Province:
+            assert geocoder.locate("", province.value) is not None, province
+
+    def test_geocode_location(self):
+        location = geocode_location(parse_location("Spinone al Lago (BG)"))
+        assert location.lat == pytest.approx(45.77, abs=0.05)
+        assert location.lon == pytest.approx(9.92, abs=0.05)
+        assert not location.approximate
+
+    def test_capital_fallback_marked_approximate(self):
+        location = geocode_location(parse_location("Frazione Inesistente (BG)"))
+        assert location.lat is not None
+        assert location.approximate
+
+    def test_enrich_events(self):
+        event = Event(
+            title="Camminata",
+            date="01/05/2026",
+            location=parse_location("Roma (RM)"),
+            source="TEST",
+            distances=[],
+        )
+        [enriched] = enrich_events([event])
+        assert enriched.location.lat == pytest.approx(41.9, abs=0.05)
+        assert event.location.lat is None
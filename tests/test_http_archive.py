@@ -0,0 +1,124 @@
+"""
+Tests for the HTTP record/replay archive and its use in the HTTP layer.
+"""
+import zipfile
+import pytest
+import requests
+from unittest.mock import patch
+from scraper.utils import http
+from scraper.utils.http_archive import ArchiveMissError, ArchiveMode, HttpArchive
+
+PAGE = "https://www.csibergamo.it/avvisi/prossime-marce.html"
+IMAGE = "https://www.csibergamo.it/images/volantino.jpg"
+
+
+def make_response(url, content, status=200, content_type="text/html; charset=utf-8"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = "OK" if status < 400 else "Not Found"
+    resp.url = url
+    resp.headers["Content-Type"] = content_type
+    resp.encoding = "utf-8" if content_type.startswith("text/") else None
+    resp._content = content
+    return resp
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    return tmp_path / "run.zip"
+
+
+@pytest.fixture(autouse=True)
+def no_archive():
+    yield
+    http.close_archive()
+
+
+class TestHttpArchive:
+    """Tests for HttpArchive."""
+
+    def test_round_trip(self, archive_path):
+        with HttpArchive(archive_path, ArchiveMode.RECORD) as archive:
+            archive.record(PAGE, make_response(PAGE, "<ul>Città</ul>".encode("utf-8")))
+            archive.record(IMAGE, make_response(IMAGE, b"\xff\xd8jpeg", content_type="image/jpeg"))
+
+        with HttpArchive(archive_path, ArchiveMode.REPLAY) as archive:
+            page = archive.replay(PAGE)
+            image = archive.replay(IMAGE)
+            assert len(archive) == 2
+
+        assert page.status_code == 200
+        assert page.text == "<ul>Città</ul>"
+        assert image.content == b"\xff\xd8jpeg"
+        assert image.headers["content-type"] == "image/jpeg"
+        assert list(image.iter_content(2)) == [b"\xff\xd8", b"jp", b"eg"]
+
+    def test_identical_bodies_stored_once(self, archive_path):
+        with HttpArchive(archive_path, ArchiveMode.RECORD) as archive:
+            archive.record(IMAGE, make_response(IMAGE, b"same"))
+            archive.record(IMAGE + "?v=2", make_response(IMAGE + "?v=2", b"same"))
+
+        with zipfile.ZipFile(archive_path) as zf:
+            assert len([name for name in zf.namelist() if name.startswith("bodies/")]) == 1
+
+    def test_repeated_requests_replayed_in_order(self, archive_path):
+        with HttpArchive(archive_path, ArchiveMode.RECORD) as archive:
+            archive.record(PAGE, make_response(PAGE, b"first"))
+            archive.record(PAGE, make_response(PAGE, b"second"))
+
+        with HttpArchive(archive_path, ArchiveMode.REPLAY) as archive:
+            assert [archive.replay(PAGE).content for _ in range(3)] == [b"first", b"second", b"second"]
+
+    def test_recorded_error_is_raised(self, archive_path):
+        with HttpArchive(archive_path, ArchiveMode.RECORD) as archive:
+            archive.record_error(IMAGE, requests.Timeout("read timed out"))
+
+        with HttpArchive(archive_path, ArchiveMode.REPLAY) as archive:
+            with pytest.raises(requests.ConnectionError, match="Timeout: read timed out"):
+                archive.replay(IMAGE)
+
+    def test_missing_url_raises_and_is_counted(self, archive_path):
+        HttpArchive(archive_path, ArchiveMode.RECORD).close()
+
+        with HttpArchive(archive_path, ArchiveMode.REPLAY) as archive:
+            with pytest.raises(ArchiveMissError):
+                archive.replay(PAGE)
+            assert archive.misses == 1
+
+    def test_key_includes_params(self):
+        assert HttpArchive.key(PAGE, {"page": 2}) == PAGE + "?page=2"
+        assert HttpArchive.key(PAGE) == PAGE
+
+
+class TestHttpGetWithArchive:
+    """Tests for http.get in record and replay mode."""
+
+    @patch("scraper.utils.http.requests.get")
+    def test_record_then_replay_without_network(self, mock_get, archive_path):
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, b"<html>ok</html>")
+        http.enable_archive(archive_path, ArchiveMode.RECORD)
+        recorded = http.get(PAGE)
+        http.close_archive()
+
+        mock_get.reset_mock()
+        http.enable_archive(archive_path, ArchiveMode.REPLAY)
+        assert http.is_replaying()
+        replayed = http.get(PAGE)
+
+        mock_get.assert_not_called()
+        assert replayed.text == recorded.text
+
+    @patch("scraper.utils.http.requests.get", side_effect=requests.ConnectionError("down"))
+    def test_network_error_recorded(self, mock_get, archive_path):
+        http.enable_archive(archive_path, ArchiveMode.RECORD)
+        with pytest.raises(requests.ConnectionError):
+            http.get(IMAGE)
+        http.close_archive()
+
+        http.enable_archive(archive_path, ArchiveMode.REPLAY)
+        with pytest.raises(requests.ConnectionError, match="down"):
+            http.get(IMAGE)
+        assert mock_get.call_count == 1
+
+    def test_not_replaying_by_default(self):
+        assert http.is_replaying() is False
@@ -0,0 +1,49 @@
+"""
+Import-time budget for parse-only tooling, measured with `python -X importtime`.
+Heavy dependencies (supabase SDK, img2pdf) must be imported lazily at first use.
+"""
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+# Moduli usati da test e strumenti di parsing, che non toccano Storage né il database
+PARSE_ONLY_MODULES = ["scraper.utils.parsers", "scraper.scrapers.base", "scraper.db.supabase_client"]
+
+# Dipendenze pesanti che devono restare fuori dall'avvio
+HEAVY_MODULES = ["supabase", "img2pdf", "PIL", "httpx", "postgrest", "storage3"]
+
+# Budget generoso per runner lenti: prima delle import lazy superava i 500 ms
+IMPORT_BUDGET_US = 400_000
+
+
+def importtime(module: str) -> dict:
+    """Esegue `python -X importtime -c "import module"` e ritorna {modulo: tempo cumulativo in µs}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+
+@pytest.mark.parametrize("module", PARSE_ONLY_MODULES)
+class TestImportTime:
+    """Tests for lazy imports of heavy dependencies."""
+
+    def test_heavy_dependencies_not_imported(self, module):
+        timings = importtime(module)
+        loaded = {name.split(".")[0] for name in timings}
+        assert not loaded & set(HEAVY_MODULES)
+
+    def test_within_budget(self, module):
+        timings = importtime(module)
+        assert timings[module] < IMPORT_BUDGET_US
@@ -0,0 +1,96 @@
+"""
+Tests for the queued structured logging layer.
+"""
+import io
+import json
+import logging
+import pytest
+from scraper.utils.log import JsonFormatter, SamplingFilter, SourceCounter, setup_logging, shutdown_logging
+from scraper.utils.parsers import parse_location
+
+
+def make_record(msg, *args, level=logging.WARNING, source=None, name="scraper.test"):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    if source:
+        record.source = source
+    return record
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+
+
+class TestSamplingFilter:
+    """Tests for SamplingFilter."""
+
+    def test_first_then_every_nth(self):
+        sampler = SamplingFilter(first=2, every=3)
+        passed = [sampler.filter(make_record("Unknown province '%s'", i)) for i in range(8)]
+        assert passed == [True, True, False, False, True, False, False, True]
+        assert sum(sampler.suppressed.values()) == 4
+
+    def test_passing_record_carries_suppressed_count(self):
+        sampler = SamplingFilter(first=1, every=3)
+        records = [make_record("Unknown province '%s'", i) for i in range(4)]
+        for record in records:
+            sampler.filter(record)
+        assert records[3].suppressed == 2
+
+    def test_templates_and_sources_sampled_separately(self):
+        sampler = SamplingFilter(first=1, every=0)
+        assert sampler.filter(make_record("a %s", 1, source="CSI"))
+        assert sampler.filter(make_record("a %s", 1, source="FIASP"))
+        assert sampler.filter(make_record("b %s", 1, source="CSI"))
+        assert not sampler.filter(make_record("a %s", 2, source="CSI"))
+
+    def test_other_levels_never_sampled(self):
+        sampler = SamplingFilter(first=0, every=0)
+        assert sampler.filter(make_record("failed %s", 1, level=logging.ERROR))
+        assert sampler.filter(make_record("inserted %s", 1, level=logging.INFO))
+
+
+class TestFormattingAndCounters:
+    """Tests for the JSON formatter and per-source counters."""
+
+    def test_json_formatter(self):
+        record = make_record("⚠️ Unknown province '%s'", "XX", source="FIASP")
+        record.suppressed = 3
+        data = json.loads(JsonFormatter().format(record))
+        assert data["message"] == "⚠️ Unknown province 'XX'"
+        assert (data["level"], data["source"], data["suppressed"]) == ("WARNING", "FIASP", 3)
+
+    def test_counter_by_source_and_level(self):
+        counter = SourceCounter()
+        for record in (make_record("x", source="CSI"), make_record("x", source="CSI"), make_record("y", level=logging.ERROR)):
+            counter.filter(record)
+        assert counter.by_source() == {"-": {"ERROR": 1}, "CSI": {"WARNING": 2}}
+
+
+class TestSetupLogging:
+    """Tests for the queued handler configuration."""
+
+    def test_records_flushed_on_shutdown(self, stream):
+        setup_logging("INFO", stream=stream)
+        logging.getLogger("scraper.test").info("🚀 Starting %s", "run")
+        logging.getLogger("scraper.test").debug("hidden")
+        shutdown_logging()
+        assert stream.getvalue() == "🚀 Starting run\n"
+
+    def test_unknown_province_warnings_sampled(self, stream):
+        session = setup_logging("INFO", stream=stream, sample_first=2, sample_every=0)
+        for _ in range(10):
+            parse_location("Paese (XX)")
+        shutdown_logging()
+
+        assert stream.getvalue().count("Unknown province") == 2
+        assert session.counter.by_source()["-"]["WARNING"] == 10
+
+    def test_json_output(self, stream):
+        setup_logging("INFO", json_format=True, stream=stream)
+        logging.LoggerAdapter(logging.getLogger("scraper.test"), {"source": "CSI"}).error("❌ boom")
+        shutdown_logging()
+        data = json.loads(stream.getvalue())
+        assert (data["level"], data["source"], data["message"]) == ("ERROR", "CSI", "❌ boom")
@@ -0,0 +1,94 @@
+"""
+Tests for the opt-in memory profiler and its scraper hooks.
+No HTTP requests or database operations.
+"""
+import pytest
+from unittest.mock import patch
+from scraper.main import format_memory
+from scraper.models.source_result import SourceResult
+from scraper.scrapers.base import BaseScraper
+from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.sharding import ShardMode, ShardReport, merge_reports
+from scraper.utils import memory
+from scraper.utils.memory import MB, MemoryProfiler
+from tests.test_registry import FakeScraper, make_event
+
+
+@pytest.fixture
+def profiler():
+    yield memory.enable_profiling(poster_threshold_mb=1)
+    memory.disable_profiling()
+
+
+class TestMemoryProfiler:
+    """Tests for MemoryProfiler."""
+
+    def test_stage_measures_peak_and_retained(self, profiler):
+        with profiler.stage("FAKE", "collect"):
+            buffer = bytearray(4 * MB)
+            del buffer
+            kept = bytearray(MB)
+
+        stage = profiler.stages[0]
+        assert (stage.source, stage.stage) == ("FAKE", "collect")
+        assert stage.peak >= 4 * MB
+        assert MB <= stage.retained < 2 * MB
+        assert stage.rss is None or stage.rss > 0
+        assert kept
+
+    def test_poster_above_threshold_flagged(self, profiler, caplog):
+        profiler.poster("FIASP", "Small", "01/05/2026", MB // 2)
+        profiler.poster("FIASP", "Huge", "01/05/2026", 3 * MB)
+
+        assert [poster.title for poster in profiler.posters] == ["Huge"]
+        assert [record.source for record in caplog.records] == ["FIASP"]
+        assert "Huge" in caplog.text
+
+    def test_source_peaks_take_max_over_stages(self):
+        profiler = MemoryProfiler(top=0)
+        profiler.stages += [
+            memory.StageMemory("CSI", "collect", 5, 0, 100, []),
+            memory.StageMemory("CSI", "save", 3, 0, 120, []),
+        ]
+        assert profiler.source_peaks() == {"CSI": (5, 120)}
+
+    def test_hooks_are_noop_when_disabled(self):
+        assert memory.profiler is None
+        with memory.stage("FAKE", "collect"):
+            pass
+        memory.record_poster("FAKE", "Huge", "01/05/2026", 100 * MB)
+
+
+class TestScraperHooks:
+    """Tests for the stage and poster hooks in the scrapers."""
+
+    def test_collect_and_save_are_measured(self, profiler):
+        scraper = FakeScraper(events=[make_event("A")])
+        scraper.collect()
+        BaseScraper.save(scraper, [])
+
+        assert [(s.source, s.stage) for s in profiler.stages] == [("FAKE", "collect"), ("FAKE", "save")]
+
+    @patch("scraper.scrapers.fiasp_scraper.SupabaseManager.upload_poster", return_value="https://x/poster.pdf")
+    def test_fiasp_poster_bytes_recorded(self, mock_upload, profiler):
+        scraper = FIASPScraper()
+        with patch.object(scraper, "_download_poster_bytes", return_value=(b"x" * 2 * MB, "application/pdf")):
+            scraper._download_and_upload_poster("https://example.com/p.pdf", "Big Poster", "01/05/2026")
+
+        assert profiler.posters == [memory.PosterMemory("FIASP", "Big Poster", "01/05/2026", 2 * MB)]
+
+
+class TestMergeMemory:
+    """Tests for memory figures in shard merges."""
+
+    def test_merge_takes_max(self):
+        reports = [
+            ShardReport(shard="1/2", mode=ShardMode.ROW, results=[SourceResult(source="CSI", peak_rss=100, memory_peak=7)]),
+            ShardReport(shard="2/2", mode=ShardMode.ROW, results=[SourceResult(source="CSI", peak_rss=150)]),
+        ]
+        merged = merge_reports(reports)[0]
+        assert (merged.peak_rss, merged.memory_peak) == (150, 7)
+
+    def test_rss_labelled_as_process_peak(self):
+        result = SourceResult(source="CSI", peak_rss=150 * MB, memory_peak=7 * MB)
+        assert format_memory(result) == " (traced peak 7.0 MB, process peak RSS so far 150.0 MB)"
@@ -0,0 +1,98 @@
+"""
+Tests for the OpenMetrics/Prometheus run metrics.
+No HTTP requests or database operations.
+"""
+from unittest.mock import MagicMock, patch
+import pytest
+from scraper.utils import http, metrics
+from scraper.utils.metrics import MetricsRegistry
+
+URL = "https://www.csibergamo.it/avvisi/prossime-marce.html"
+
+
+class TestRender:
+    """Tests for the text exposition."""
+
+    def test_counter_openmetrics(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.inc("events_inserted", 3, source="CSI")
+        registry.inc("events_inserted", 2, source="CSI")
+        text = registry.render()
+
+        assert "# TYPE t_events_inserted counter\n" in text
+        assert 't_events_inserted_total{source="CSI"} 5\n' in text
+        assert text.endswith("# EOF\n")
+
+    def test_counter_prometheus_format(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.inc("events_inserted", source="CSI")
+        text = registry.render(openmetrics=False)
+
+        assert "# TYPE t_events_inserted_total counter\n" in text
+        assert "# EOF" not in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry(prefix="t")
+        for value in (0.01, 0.3, 7, 5000):
+            registry.observe("http_request_duration_seconds", value, host="a")
+        lines = registry.render().splitlines()
+
+        assert 't_http_request_duration_seconds_bucket{host="a",le="0.05"} 1' in lines
+        assert 't_http_request_duration_seconds_bucket{host="a",le="0.5"} 2' in lines
+        assert 't_http_request_duration_seconds_bucket{host="a",le="10"} 3' in lines
+        assert 't_http_request_duration_seconds_bucket{host="a",le="+Inf"} 4' in lines
+        assert 't_http_request_duration_seconds_count{host="a"} 4' in lines
+
+    def test_label_values_escaped(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.set("source_up", 1, source='a"b\\c')
+        assert 't_source_up{source="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_unused_metrics_omitted(self):
+        assert MetricsRegistry(prefix="t").render() == "# EOF\n"
+
+
+class TestExport:
+    """Tests for the textfile and pushgateway exports."""
+
+    def test_write_textfile(self, tmp_path):
+        registry = MetricsRegistry(prefix="t")
+        registry.set("run_duration_seconds", 12.5)
+        path = tmp_path / "textfile" / "scraper.prom"
+        registry.write_textfile(path)
+
+        assert "t_run_duration_seconds 12.5\n" in path.read_text(encoding="utf-8")
+        assert [p.name for p in path.parent.iterdir()] == ["scraper.prom"]
+
+    @patch("requests.put")
+    def test_push_uses_job_and_grouping(self, mock_put):
+        registry = MetricsRegistry(prefix="t")
+        registry.inc("events_scraped", source="CSI")
+        registry.push("http://localhost:9091/", job="scraper", grouping={"shard": "1-4"})
+
+        url = mock_put.call_args.args[0]
+        assert url == "http://localhost:9091/metrics/job/scraper/shard/1-4"
+        assert b't_events_scraped_total{source="CSI"} 1' in mock_put.call_args.kwargs["data"]
+        mock_put.return_value.raise_for_status.assert_called_once()
+
+
+class TestInstrumentation:
+    """Tests for the metrics recorded by the HTTP layer."""
+
+    @patch("scraper.utils.http.requests.get")
+    def test_http_get_counts_bytes_and_status(self, mock_get):
+        mock_get.return_value = MagicMock(status_code=200, content=b"x" * 100)
+        before = metrics.registry.value("http_bytes", host="www.csibergamo.it")
+        requests_before = metrics.registry.value("http_requests", host="www.csibergamo.it", status="200")
+
+        http.get(URL)
+
+        assert metrics.registry.value("http_bytes", host="www.csibergamo.it") == before + 100
+        assert metrics.registry.value("http_requests", host="www.csibergamo.it", status="200") == requests_before + 1
+
+    @patch("scraper.utils.http.requests.get", side_effect=ConnectionError("down"))
+    def test_http_error_counted(self, mock_get):
+        before = metrics.registry.value("http_requests", host="www.csibergamo.it", status="error")
+        with pytest.raises(ConnectionError):
+            http.get(URL)
+        assert metrics.registry.value("http_requests", host="www.csibergamo.it", status="error") == before + 1
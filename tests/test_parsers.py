@@ -2,7 +2,9 @@
 Tests for parsing utilities.
 """
 import pytest
-from scraper.utils.parsers import extract_province_str, parse_location, parse_distances
+from scraper.utils.parsers import (
+    Distance, extract_province_str, parse_location, parse_distances, parse_distances_km, tokenize_distances,
+)
 from scraper.models.provinces import Province
 
 
@@ -130,6 +132,27 @@ class TestGORProvince:
         assert loc.region != "Sconosciuta"
 
 
+class TestProvinceLookup:
+    """Verifica la tabella piatta sigla → (provincia, nome, regione)."""
+
+    def test_lookup_matches_mappers(self):
+        from scraper.utils.region_mapper import lookup_province, get_name_from_province, get_region_from_province
+        for province in Province:
+            info = lookup_province(province.value)
+            assert info.province is province
+            assert info.name == get_name_from_province(province)
+            assert info.region == get_region_from_province(province)
+
+    def test_lookup_invalid_code_returns_none(self):
+        from scraper.utils.region_mapper import lookup_province
+        assert lookup_province("XX") is None
+        assert lookup_province("bg") is None
+
+    def test_lookup_returns_shared_record(self):
+        from scraper.utils.region_mapper import lookup_province
+        assert lookup_province("BG") is lookup_province("".join(["B", "G"]))
+
+
 class TestParseLocation:
     """Tests for parse_location function."""
     
@@ -165,11 +188,46 @@ class TestParseLocation:
         assert loc.city == "Lecco"
         assert loc.province == Province.LC
     
-    def test_invalid_province_uses_default(self):
-        """Test invalid province falls back to default."""
+    def test_invalid_province_resolved_from_city(self):
+        """Test invalid province is resolved from the city name via the gazetteer."""
         loc = parse_location("Como XX")
-        assert "Como" in loc.city
+        assert loc.city == "Como"
+        assert loc.province == Province.CO
+        assert loc.region == "Lombardia"
+
+    def test_invalid_province_unknown_city_uses_default(self):
+        """Test invalid province with unknown city falls back to default."""
+        loc = parse_location("Paesinventato XX")
+        assert "Paesinventato" in loc.city
         assert loc.province == Province.BG  # default
+
+    def test_missing_province_resolved_from_city(self):
+        """Test missing province suffix is resolved from the city name."""
+        loc = parse_location("San Giovanni Bianco")
+        assert loc.city == "San Giovanni Bianco"
+        assert loc.province == Province.BG
+
+        loc = parse_location("CORMONS")
+        assert loc.province == Province.GO
+        assert loc.region == "Friuli-Venezia Giulia"
+
+    @pytest.mark.parametrize("location_str", ["Castelfranco Emilia", "San Giovanni Lupatoto"])
+    def test_multiword_city_not_in_gazetteer_kept_whole(self, location_str):
+        """Test a comune missing from the gazetteer keeps its full name and the default province."""
+        loc = parse_location(location_str)
+        assert loc.city == location_str
+        assert loc.province == Province.BG  # default, non la provincia di un comune omonimo troncato
+
+    def test_missing_province_misspelled_city(self):
+        """Test fuzzy match resolves a misspelled city."""
+        loc = parse_location("Treviglo")
+        assert loc.province == Province.BG
+
+    def test_missing_province_unknown_city_uses_default(self):
+        """Test unknown city without province still uses the default."""
+        loc = parse_location("Xyzzy")
+        assert loc.city == "Xyzzy"
+        assert loc.province == Province.BG
     
     @pytest.mark.parametrize("location_str,expected_city,expected_province,expected_region", [
         ("Milano (MI)", "Milano", Province.MI, "Lombardia"),
@@ -247,3 +305,38 @@ class TestParseDistances:
         """Test that correct number of distances are parsed."""
         distances = parse_distances(input_str)
         assert len(distances) >= min_expected_count
+
+
+class TestTokenizeDistances:
+    """Tests for the structured distance tokenizer."""
+
+    def test_labels_and_km(self):
+        assert tokenize_distances("5 - 10,5 e 15 km") == (
+            Distance("5", 5.0), Distance("10.5", 10.5), Distance("15 km", 15.0),
+        )
+
+    def test_meters_converted_to_km(self):
+        assert tokenize_distances("800 m - 3 km")[0].km == 0.8
+
+    def test_label_without_number(self):
+        assert tokenize_distances("Percorso libero") == (Distance("Percorso libero", None),)
+
+    def test_parse_distances_km_skips_labels_without_number(self):
+        assert parse_distances_km("6 km - ludico - 12 km") == [6.0, 12.0]
+        assert parse_distances_km("") == []
+
+    def test_repeated_inputs_are_cached(self):
+        tokenize_distances.cache_clear()
+        for _ in range(3):
+            parse_distances("6 - 12 - 18 km")
+        assert tokenize_distances.cache_info().hits == 2
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("5  e  10", ["5", "10"]),
+        ("km 6 - 12 e 20", ["km 6", "12", "20"]),
+        ("5 – 10", ["5", "10"]),
+        ("  7 E 14  ", ["7", "14"]),
+        ("Ludico motoria 6 km", ["Ludico motoria 6 km"]),
+    ])
+    def test_labels_match_previous_behaviour(self, raw, expected):
+        assert parse_distances(raw) == expected
@@ -0,0 +1,136 @@
+"""
+Tests for the two-phase save: events first, posters attached by the backfill.
+No HTTP requests or database operations.
+"""
+from unittest.mock import MagicMock, patch
+import pytest
+from scraper.db.supabase_client import SupabaseManager
+from scraper.models.event import PosterJob
+from scraper.posters import backfill_posters
+from scraper.scheduler import run_scrapers
+from scraper.utils.dedup import merge_events
+from tests.test_registry import FakeScraper, make_event
+
+
+class PosterScraper(FakeScraper):
+    """Scraper finto il cui poster è l'URL del primo file del job."""
+
+    def __init__(self, fail=(), **kwargs):
+        super().__init__(**kwargs)
+        self.fail = set(fail)
+        self.built = []
+        self.finished = False
+
+    def _build_poster(self, event):
+        self.built.append(event.title)
+        if event.title in self.fail:
+            raise RuntimeError("upload failed")
+        return {"poster": event.poster_job.urls[0], "poster_source": None, "poster_fingerprint": None}
+
+    def finish_posters(self):
+        self.finished = True
+
+
+def pending(title, source="FAKE"):
+    return make_event(title).model_copy(update={"poster_job": PosterJob(source=source, urls=[f"https://x/{title}.pdf"])})
+
+
+class TestBackfillPosters:
+    """Tests for backfill_posters."""
+
+    @patch.object(SupabaseManager, "patch_posters", side_effect=len)
+    def test_patches_in_batches(self, mock_patch):
+        scraper = PosterScraper()
+        events = [pending("A"), pending("B"), pending("C")]
+
+        attached = backfill_posters([scraper], events, workers=2, batch_size=2)
+
+        assert attached == {"FAKE": 3}
+        assert [len(call.args[0]) for call in mock_patch.call_args_list] == [2, 1]
+        rows = [row for call in mock_patch.call_args_list for row in call.args[0]]
+        assert {row["event_key"] for row in rows} == {event.event_key for event in events}
+        assert scraper.finished
+
+    @patch.object(SupabaseManager, "patch_posters", side_effect=len)
+    def test_failed_poster_not_patched(self, mock_patch):
+        scraper = PosterScraper(fail={"B"})
+
+        attached = backfill_posters([scraper], [pending("A"), pending("B")])
+
+        assert attached == {"FAKE": 1}
+        assert [row["poster"] for row in mock_patch.call_args.args[0]] == ["https://x/A.pdf"]
+
+    @patch.object(SupabaseManager, "patch_posters", return_value=1)
+    def test_counts_rows_updated_by_database(self, mock_patch):
+        scraper = PosterScraper()
+
+        attached = backfill_posters([scraper], [pending("A"), pending("B")])
+
+        assert attached == {"FAKE": 1}
+
+    def test_one_call_per_source(self):
+        other = type("OtherScraper", (PosterScraper,), {"source_id": "OTHER"})()
+        fake = PosterScraper()
+        events = [pending("A"), pending("B", source="OTHER"), pending("C")]
+
+        with patch.object(SupabaseManager, "patch_posters", side_effect=len) as mock_patch:
+            attached = backfill_posters([fake, other], events)
+
+        assert attached == {"FAKE": 2, "OTHER": 1}
+        assert sorted(len(call.args[0]) for call in mock_patch.call_args_list) == [1, 2]
+
+    @patch.object(SupabaseManager, "patch_posters")
+    def test_events_without_pending_poster_skipped(self, mock_patch):
+        scraper = PosterScraper()
+        events = [make_event("A"), make_event("B", poster="https://x/b.pdf").model_copy(
+            update={"poster_job": PosterJob(source="FAKE", urls=["https://x/B.pdf"])})]
+
+        assert backfill_posters([scraper], events) == {}
+        assert scraper.built == []
+        mock_patch.assert_not_called()
+        assert scraper.finished
+
+
+class TestPatchPosters:
+    """Tests for SupabaseManager.patch_posters."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        client.rpc.return_value.execute.return_value.data = 1
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        return client
+
+    def test_null_posters_never_sent(self, client, monkeypatch):
+        monkeypatch.setattr("scraper.db.supabase_client.POSTER_PATCH_BATCH_SIZE", 2)
+        patches = [{"event_key": k, "poster": f"https://x/{k}.pdf"} for k in "abc"] + [{"event_key": "d", "poster": None}]
+
+        SupabaseManager.patch_posters(patches)
+
+        sent = [call.args[1]["patches"] for call in client.rpc.call_args_list]
+        assert [len(batch) for batch in sent] == [2, 1]
+        assert all(row["poster"] for batch in sent for row in batch)
+
+
+class TestTwoPhaseRun:
+    """Tests for events saved before their posters are built."""
+
+    def test_events_saved_without_waiting_for_posters(self):
+        scraper = PosterScraper(events=[pending("A")])
+        order = []
+        scraper.save = lambda events: order.append(("save", events[0].poster)) or (1, 0)
+
+        with patch.object(SupabaseManager, "patch_posters", side_effect=lambda rows: order.append(("patch", rows[0]["poster"])) or len(rows)):
+            results = run_scrapers([scraper])
+
+        assert order == [("save", None), ("patch", "https://x/A.pdf")]
+        assert results[0].posters == 1
+
+    def test_duplicate_hands_pending_poster_to_primary(self):
+        primary = make_event("Camminata")
+        duplicate = pending("Camminata", source="FIASP")
+
+        merged = merge_events(primary, duplicate)
+
+        assert merged.poster_job.source == "FIASP"
+        assert merge_events(pending("Camminata"), duplicate).poster_job.source == "FAKE"
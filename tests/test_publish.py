@@ -0,0 +1,212 @@
+"""
+Tests for the static JSON publish stage.
+"""
+import gzip
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from scraper.db.supabase_client import SupabaseManager
+from scraper.publish import (
+    build_publication, event_record, partition, prune_publication, slugify, upload_publication, write_publication,
+)
+
+
+def make_row(name, date, region="Lombardia", city="Bergamo", province="BG"):
+    return {
+        "name": name,
+        "date": date,
+        "organizer": "CSI Bergamo",
+        "poster": None,
+        "distances": ["6 km"],
+        "location": {
+            "city": city, "province": province, "province_name": "Bergamo",
+            "region": region, "lat": 45.7, "lon": 9.67,
+        },
+    }
+
+
+@pytest.fixture
+def records():
+    return [event_record(row) for row in [
+        make_row("Camminata B", "2026-05-10"),
+        make_row("Camminata A", "2026-05-03"),
+        make_row("Marcia", "2026-06-01"),
+        make_row("Corsa", "2026-05-20", region="Friuli-Venezia Giulia", city="Cormons", province="GO"),
+    ]]
+
+
+class TestPartition:
+    """Tests for region/month partitioning."""
+
+    def test_slugify(self):
+        assert slugify("Friuli-Venezia Giulia") == "friuli-venezia-giulia"
+        assert slugify("Valle d'Aosta") == "valle-d-aosta"
+
+    def test_event_record_matches_frontend_shape(self, records):
+        record = records[0]
+        assert record["title"] == "Camminata B"
+        assert record["source"] == "CSI Bergamo"
+        assert record["location"]["lat"] == 45.7
+
+    def test_partition_by_region_and_month(self, records):
+        shards = partition(records)
+        assert set(shards) == {
+            ("Lombardia", "2026-05"), ("Lombardia", "2026-06"), ("Friuli-Venezia Giulia", "2026-05"),
+        }
+        assert [r["title"] for r in shards[("Lombardia", "2026-05")]] == ["Camminata A", "Camminata B"]
+
+
+class TestBuildPublication:
+    """Tests for shard files and manifest."""
+
+    def test_manifest_describes_shards(self, records):
+        files, manifest = build_publication(records)
+        assert manifest["total"] == 4
+        assert manifest["months"] == ["2026-05", "2026-06"]
+        paths = {entry["path"]: entry for entry in manifest["shards"]}
+        assert set(paths) | {manifest["snapshot"]["path"]} == set(files)
+        entry = paths["lombardia/2026-05.json.gz"]
+        assert entry["count"] == 2
+        assert entry["bytes"] == len(files[entry["path"]])
+
+    def test_shards_are_gzip_json(self, records):
+        files, _ = build_publication(records)
+        events = json.loads(gzip.decompress(files["friuli-venezia-giulia/2026-05.json.gz"]))
+        assert [e["location"]["city"] for e in events] == ["Cormons"]
+
+    def test_output_is_deterministic(self, records):
+        generated_at = datetime(2026, 5, 1, tzinfo=timezone.utc)
+        assert build_publication(records, generated_at) == build_publication(list(reversed(records)), generated_at)
+
+    def test_write_removes_stale_shards(self, records, tmp_path):
+        stale = tmp_path / "lombardia" / "2026-04.json.gz"
+        stale.parent.mkdir()
+        stale.write_bytes(b"old")
+
+        files, manifest = build_publication(records)
+        write_publication(files, manifest, tmp_path)
+
+        assert not stale.exists()
+        assert (tmp_path / "lombardia" / "2026-06.json.gz").exists()
+        assert json.loads((tmp_path / "manifest.json").read_text())["total"] == 4
+
+
+class TestSnapshot:
+    """Tests for the versioned full snapshot."""
+
+    def test_snapshot_contains_all_events(self, records):
+        files, manifest = build_publication(records)
+        snapshot = manifest["snapshot"]
+        events = json.loads(gzip.decompress(files[snapshot["path"]]))
+        assert snapshot["count"] == len(events) == 4
+        assert [e["date"] for e in events] == sorted(e["date"] for e in events)
+
+    def test_snapshot_name_follows_content(self, records):
+        _, manifest = build_publication(records)
+        _, changed = build_publication(records[:-1])
+        snapshot = manifest["snapshot"]
+        assert snapshot["path"] == f"snapshots/events-{snapshot['sha256'][:16]}.json.gz"
+        assert snapshot["etag"] == f'"{snapshot["sha256"]}"'
+        assert changed["snapshot"]["path"] != snapshot["path"]
+
+    def test_snapshot_uploaded_with_long_cache(self, records, monkeypatch):
+        uploads = []
+        monkeypatch.setattr(
+            "scraper.publish.SupabaseManager.upload_public_file",
+            lambda path, data, content_type, cache_control: uploads.append((path, cache_control)) or path,
+        )
+        monkeypatch.setattr("scraper.publish.SupabaseManager.list_public_files", lambda: [])
+        files, manifest = build_publication(records)
+        assert upload_publication(files, manifest) == len(files) + 1
+
+        cache = dict(uploads)
+        assert cache[manifest["snapshot"]["path"]] == "31536000"
+        assert cache["manifest.json"] == "300"
+        assert uploads[-1][0] == "manifest.json"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """Bucket di pubblicazione finto: file caricati, file presenti e file cancellati."""
+    state = SimpleNamespace(uploads=[], existing=[], deleted=[], fail=set())
+
+    def upload(path, data, content_type, cache_control):
+        state.uploads.append(path)
+        return None if path in state.fail else path
+
+    def delete(paths):
+        state.deleted.extend(paths)
+        return paths
+
+    monkeypatch.setattr(SupabaseManager, "upload_public_file", classmethod(lambda cls, *args: upload(*args)))
+    monkeypatch.setattr(SupabaseManager, "list_public_files", classmethod(
+        lambda cls: [{"name": path, "updated_at": f"2026-05-{day:02d}T00:00:00Z"} for day, path in enumerate(state.existing, 1)]
+    ))
+    monkeypatch.setattr(SupabaseManager, "delete_public_files", classmethod(lambda cls, paths: delete(paths)))
+    return state
+
+
+class TestUploadPublication:
+    """Tests for upload_publication."""
+
+    def test_failed_shard_keeps_previous_manifest(self, records, bucket):
+        files, manifest = build_publication(records)
+        bucket.fail = {"lombardia/2026-05.json.gz"}
+
+        assert upload_publication(files, manifest) == len(files) - 1
+        assert "manifest.json" not in bucket.uploads
+        assert bucket.deleted == []
+
+    def test_stale_shards_removed_after_manifest(self, records, bucket):
+        files, manifest = build_publication(records)
+        bucket.existing = list(files) + ["manifest.json", "lombardia/2025-12.json.gz", "snapshots/events-old.json.gz"]
+
+        assert upload_publication(files, manifest) == len(files) + 1
+        assert bucket.deleted == ["lombardia/2025-12.json.gz"]
+
+    def test_failed_snapshot_keeps_previous_manifest(self, records, bucket):
+        files, manifest = build_publication(records)
+        bucket.fail = {manifest["snapshot"]["path"]}
+
+        upload_publication(files, manifest)
+
+        assert "manifest.json" not in bucket.uploads
+
+    def test_only_recent_snapshots_kept(self, records, bucket):
+        files, manifest = build_publication(records)
+        # Elencati dal più vecchio al più recente
+        bucket.existing = [f"snapshots/events-{n}.json.gz" for n in range(6)] + [manifest["snapshot"]["path"]]
+
+        prune_publication(files, keep_snapshots=3)
+
+        assert sorted(bucket.deleted) == [f"snapshots/events-{n}.json.gz" for n in range(4)]
+
+
+class TestSupabasePublishQueries:
+    """Tests for the SupabaseManager queries used by the publish stage."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        return client
+
+    def test_upcoming_events_paged(self, client, monkeypatch):
+        monkeypatch.setattr("scraper.db.supabase_client.DB_PAGE_SIZE", 2)
+        query = client.table.return_value.select.return_value.gte.return_value.order.return_value.order.return_value
+        query.range.return_value.execute.side_effect = [
+            SimpleNamespace(data=[{"name": "A"}, {"name": "B"}], count=None),
+            SimpleNamespace(data=[{"name": "C"}], count=None),
+        ]
+
+        assert [row["name"] for row in SupabaseManager.fetch_upcoming_events()] == ["A", "B", "C"]
+
+    def test_list_public_files_descends_into_folders(self, client):
+        client.storage.from_.return_value.list.side_effect = lambda folder, options: {
+            "": [{"name": "lombardia", "id": None}, {"name": "manifest.json", "id": "1"}],
+            "lombardia": [{"name": "2026-05.json.gz", "id": "2"}],
+        }[folder]
+
+        assert [entry["name"] for entry in SupabaseManager.list_public_files()] == ["lombardia/2026-05.json.gz", "manifest.json"]
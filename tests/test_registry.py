@@ -0,0 +1,173 @@
+"""
+Tests for the scraper plugin registry and the parallel scheduler.
+No HTTP requests or database operations.
+"""
+import threading
+import time
+import pytest
+from scraper.models.event import Event
+from scraper.scrapers.base import BaseScraper
+from scraper.scrapers.csi_scraper import CSIScraper
+from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.scrapers import registry as registry_module
+from scraper.scrapers.registry import discover_scrapers, load_scrapers, register_scraper
+from scraper.scheduler import run_scrapers
+from scraper.utils.http import HostLimiter
+from scraper.utils.parsers import parse_location
+
+
+def make_event(title, poster=None):
+    return Event(
+        title=title, date="01/05/2026", location=parse_location("Spinone al Lago (BG)"),
+        poster=poster, source="FAKE", distances=[],
+    )
+
+
+class FakeScraper(BaseScraper):
+    """Scraper finto che non tocca rete né database."""
+
+    source_id = "FAKE"
+    hosts = ("fake.example.com",)
+
+    def __init__(self, result=(1, 2), delay=0.0, error=None, events=None):
+        super().__init__()
+        self._result = result
+        self._delay = delay
+        self._error = error
+        self._events = events or []
+        self.saved = None
+
+    @property
+    def source_name(self) -> str:
+        return f"Fake {self.source_id}"
+
+    @property
+    def organizer(self) -> str:
+        return "Fake"
+
+    def _fetch_events(self):
+        time.sleep(self._delay)
+        if self._error:
+            raise self._error
+        return self._events
+
+    def save(self, events):
+        self.saved = events
+        return self._result
+
+
+class TestRegistry:
+    """Tests for plugin discovery."""
+
+    def test_builtin_scrapers_discovered(self):
+        registry = discover_scrapers()
+        assert registry["CSI"] is CSIScraper
+        assert registry["FIASP"] is FIASPScraper
+
+    def test_load_all_scrapers(self):
+        source_ids = [scraper.source_id for scraper in load_scrapers()]
+        assert "CSI" in source_ids
+        assert "FIASP" in source_ids
+
+    def test_load_selected_scrapers(self):
+        scrapers = load_scrapers(["FIASP"])
+        assert len(scrapers) == 1
+        assert isinstance(scrapers[0], FIASPScraper)
+
+    def test_load_unknown_source_raises(self):
+        with pytest.raises(ValueError):
+            load_scrapers(["NOPE"])
+
+    def test_duplicate_source_id_rejected(self):
+        class OtherCSI(FakeScraper):
+            source_id = "CSI"
+
+        with pytest.raises(ValueError):
+            register_scraper(OtherCSI)
+
+    def test_env_plugins_loaded(self, monkeypatch):
+        monkeypatch.setattr(registry_module, "_REGISTRY", dict(registry_module._REGISTRY))
+        monkeypatch.setenv("TAPASCIATE_SCRAPERS", "tests.test_registry:FakeScraper")
+        assert discover_scrapers()["FAKE"] is FakeScraper
+
+    def test_scrapers_declare_hosts(self):
+        assert CSIScraper.hosts == ("www.csibergamo.it",)
+        assert FIASPScraper.hosts == ("servizi.fiaspitalia.it",)
+
+
+class TestScheduler:
+    """Tests for run_scrapers."""
+
+    def test_results_keep_input_order(self):
+        results = run_scrapers([FakeScraper((1, 0), delay=0.05), FakeScraper((2, 3))])
+        assert [(r.inserted, r.updated) for r in results] == [(1, 0), (2, 3)]
+
+    def test_sources_run_in_parallel(self):
+        start = time.monotonic()
+        run_scrapers([FakeScraper(delay=0.2) for _ in range(4)], max_parallel=4)
+        assert time.monotonic() - start < 0.6
+
+    def test_failing_source_is_isolated(self):
+        results = run_scrapers([FakeScraper(error=RuntimeError("boom")), FakeScraper((5, 0))])
+        assert results[0].error == "boom"
+        assert results[1].inserted == 5
+
+    def test_empty_list(self):
+        assert run_scrapers([]) == []
+
+    def test_duplicates_dropped_before_save(self):
+        first = FakeScraper(events=[make_event("38ª Camminata di Spinone al Lago")])
+        second = FakeScraper(events=[make_event("Camminata Spinone", poster="https://example.com/p.pdf")])
+
+        results = run_scrapers([first, second])
+
+        assert second.saved == []
+        assert results[1].duplicates == 1
+        assert str(first.saved[0].poster) == "https://example.com/p.pdf"
+
+    def test_dedup_disabled(self):
+        first = FakeScraper(events=[make_event("Camminata")])
+        second = FakeScraper(events=[make_event("Camminata")])
+        run_scrapers([first, second], dedup=False)
+        assert len(second.saved) == 1
+
+
+class TestHostLimiter:
+    """Tests for per-host concurrency limits."""
+
+    def _max_concurrent(self, limiter, url, threads=6):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal active, peak
+            with limiter.slot(url):
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                time.sleep(0.02)
+                with lock:
+                    active -= 1
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return peak
+
+    def test_per_host_limit(self):
+        limiter = HostLimiter(global_limit=10, default_per_host=5)
+        limiter.configure("a.example.com", 2)
+        assert self._max_concurrent(limiter, "https://a.example.com/x") <= 2
+
+    def test_global_limit(self):
+        limiter = HostLimiter(global_limit=1, default_per_host=5)
+        assert self._max_concurrent(limiter, "https://b.example.com/x") == 1
+
+    def test_lowest_declared_limit_wins(self):
+        limiter = HostLimiter(global_limit=10, default_per_host=5)
+        limiter.configure("c.example.com", 1)
+        limiter.configure("c.example.com", 3)
+        assert self._max_concurrent(limiter, "https://c.example.com/x") == 1
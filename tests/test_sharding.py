@@ -0,0 +1,125 @@
+"""
+Tests for deterministic sharding and merging of shard results.
+"""
+from unittest.mock import MagicMock, patch
+import pytest
+from scraper.main import parse_args
+from scraper.models.provinces import Province
+from scraper.models.source_result import SourceResult
+from scraper.scrapers.csi_scraper import CSIScraper
+from scraper.scrapers.fiasp_scraper import FIASPScraper
+from scraper.sharding import Shard, ShardMode, ShardReport, merge_reports, missing_shards
+
+
+def fiasp_html(locations):
+    rows = "".join(
+        f"<tr><td>01/03/2026</td><td>Event {i}</td><td>{loc}</td></tr>"
+        for i, loc in enumerate(locations)
+    )
+    return f"<html><body><table><tr><th>Data</th></tr>{rows}</table></body></html>"
+
+
+class TestShard:
+    """Tests for Shard parsing and assignment."""
+
+    def test_parse(self):
+        shard = Shard.parse("2/4", ShardMode.ROW)
+        assert (shard.index, shard.total, shard.mode) == (2, 4, ShardMode.ROW)
+        assert str(shard) == "2/4"
+
+    @pytest.mark.parametrize("spec", ["0/4", "5/4", "1", "a/b", "1/0", "-1/4", "1/"])
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            Shard.parse(spec)
+
+    def test_every_key_owned_by_exactly_one_shard(self):
+        shards = [Shard(index=i, total=3) for i in range(1, 4)]
+        for key in ["CSI", "FIASP", "BG", "MI", "GOR"]:
+            assert sum(shard.owns(key) for shard in shards) == 1
+
+    def test_slices_cover_all_rows_without_overlap(self):
+        rows = list(range(10))
+        slices = [Shard(index=i, total=3).slice(rows) for i in range(1, 4)]
+        assert sum(slices, []) == rows
+
+    def test_fiasp_row_sharding(self):
+        html = fiasp_html(["Bergamo (BG)"] * 4)
+        scraper = FIASPScraper()
+        scraper.shard = Shard(index=2, total=2, mode=ShardMode.ROW)
+        events = scraper._parse_html(html)
+        assert [e.title for e in events] == ["Event 2", "Event 3"]
+
+    def test_fiasp_province_sharding(self):
+        html = fiasp_html(["Bergamo (BG)", "Milano (MI)", "Roma (RM)", "Torino (TO)"])
+        provinces = []
+        for i in range(1, 4):
+            scraper = FIASPScraper()
+            scraper.shard = Shard(index=i, total=3, mode=ShardMode.PROVINCE)
+            provinces += [e.location.province for e in scraper._parse_html(html)]
+        assert sorted(provinces) == sorted([Province.BG, Province.MI, Province.RM, Province.TO])
+
+    def test_csi_province_sharding_fetches_details_once(self):
+        html = "<ul class='latestnews-items'>" + "<li><a href='/e'>E</a></li>" * 3 + "</ul>"
+        fetched = []
+        for i in range(1, 4):
+            scraper = CSIScraper()
+            scraper.shard = Shard(index=i, total=3, mode=ShardMode.PROVINCE)
+            with patch("scraper.scrapers.csi_scraper.http.get", return_value=MagicMock(text=html)), \
+                    patch.object(scraper, "_parse_event_item", side_effect=lambda li: fetched.append(i)), \
+                    patch("scraper.scrapers.csi_scraper.time.sleep"):
+                list(scraper._iter_events())
+        owner = next(i for i in range(1, 4) if Shard(index=i, total=3).owns(Province.BG.value))
+        assert fetched == [owner] * 3
+
+
+class TestMerge:
+    """Tests for merging shard reports."""
+
+    def test_merge_sums_per_source(self):
+        reports = [
+            ShardReport(shard="1/2", mode=ShardMode.ROW, results=[
+                SourceResult(source="CSI", inserted=1, updated=2),
+                SourceResult(source="FIASP", inserted=10),
+            ]),
+            ShardReport(shard="2/2", mode=ShardMode.ROW, results=[
+                SourceResult(source="CSI", inserted=3),
+                SourceResult(source="FIASP", error="timeout"),
+            ]),
+        ]
+        merged = {r.source: r for r in merge_reports(reports)}
+        assert (merged["CSI"].inserted, merged["CSI"].updated) == (4, 2)
+        assert merged["FIASP"].inserted == 10
+        assert merged["FIASP"].error == "[2/2] timeout"
+
+    def test_report_roundtrip(self, tmp_path):
+        report = ShardReport(shard="1/3", mode=ShardMode.SOURCE, results=[SourceResult(source="CSI", inserted=1)])
+        path = tmp_path / "shard-1.json"
+        report.write(path)
+        assert ShardReport.read(path) == report
+
+    def test_missing_shards(self):
+        reports = [ShardReport(shard=s, mode=ShardMode.SOURCE, results=[]) for s in ["1/3", "3/3"]]
+        assert missing_shards(reports) == ["2/3"]
+
+    @pytest.mark.parametrize("specs,modes", [
+        (["1/2", "2/3"], [ShardMode.SOURCE, ShardMode.SOURCE]),
+        (["1/2", "2/2"], [ShardMode.SOURCE, ShardMode.ROW]),
+    ])
+    def test_missing_shards_rejects_mixed_splits(self, specs, modes):
+        reports = [ShardReport(shard=s, mode=m, results=[]) for s, m in zip(specs, modes)]
+        with pytest.raises(ValueError, match="different splits"):
+            missing_shards(reports)
+
+
+class TestShardArgument:
+    """Tests for the --shard command line argument."""
+
+    def test_valid_shard(self):
+        assert parse_args(["--shard", "2/4"]).shard == "2/4"
+
+    @pytest.mark.parametrize("spec", ["a/b", "3/2", "4"])
+    def test_invalid_shard_is_usage_error(self, spec, capsys):
+        with pytest.raises(SystemExit) as exc:
+            parse_args(["--shard", spec])
+        assert exc.value.code == 2
+        assert "Invalid shard" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+"""
+Tests for the concurrent Storage uploader.
+No HTTP requests: the uploader session is replaced by a mock.
+"""
+from unittest.mock import MagicMock
+import pytest
+import requests
+from scraper.db.storage import StorageUploader
+
+
+def response(status=200, headers=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.reason = "OK" if status < 400 else "Error"
+    resp.text = ""
+    resp.headers = headers or {}
+    return resp
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def uploader():
+    sleeps = []
+    uploader = StorageUploader(
+        "https://xyz.supabase.co", "key", workers=2, tus_threshold=10, chunk_size=4, sleep=sleeps.append,
+    )
+    uploader.session = MagicMock()
+    uploader.sleeps = sleeps
+    yield uploader
+    uploader.close()
+
+
+class TestStorageUploader:
+    """Tests for StorageUploader."""
+
+    def test_public_url_computed_locally(self, uploader):
+        url = uploader.public_url("posters", "csi camminata.pdf")
+        assert url == "https://xyz.supabase.co/storage/v1/object/public/posters/csi%20camminata.pdf"
+        uploader.session.assert_not_called()
+
+    def test_small_file_single_request(self, uploader):
+        uploader.session.post.return_value = response(200)
+
+        url = uploader.upload("events", "manifest.json", b"{}", "application/json", "300")
+
+        assert url == "https://xyz.supabase.co/storage/v1/object/public/events/manifest.json"
+        call = uploader.session.post.call_args
+        assert call.args[0] == "https://xyz.supabase.co/storage/v1/object/events/manifest.json"
+        assert call.kwargs["headers"]["x-upsert"] == "true"
+        assert call.kwargs["headers"]["Cache-Control"] == "max-age=300"
+
+    def test_transient_failure_retried_with_backoff(self, uploader):
+        uploader.session.post.side_effect = [response(503), requests.ConnectionError("reset"), response(200)]
+
+        assert uploader.upload("posters", "a.pdf", b"pdf", "application/pdf") is not None
+        assert uploader.sleeps == [1, 2]
+        assert uploader.stats().retries == 2
+
+    def test_permanent_failure_not_retried(self, uploader):
+        uploader.session.post.return_value = response(400)
+
+        assert uploader.upload("posters", "a.pdf", b"pdf", "application/pdf") is None
+        assert uploader.session.post.call_count == 1
+        assert uploader.stats().failed == 1
+
+    def test_large_file_resumed_from_server_offset(self, uploader):
+        data = b"0123456789AB"  # 12 byte: oltre la soglia, 3 blocchi da 4
+        location = "https://xyz.supabase.co/storage/v1/upload/resumable/abc"
+        uploader.session.post.return_value = response(201, {"Location": location})
+        # Il secondo blocco fallisce dopo essere arrivato al server: si riprende da 8
+        uploader.session.patch.side_effect = [
+            response(204, {"Upload-Offset": "4"}),
+            requests.ConnectionError("reset"),
+            response(204, {"Upload-Offset": "12"}),
+        ]
+        uploader.session.head.return_value = response(200, {"Upload-Offset": "8"})
+
+        assert uploader.upload("posters", "big.pdf", data, "application/pdf") is not None
+
+        headers = uploader.session.post.call_args.kwargs["headers"]
+        assert headers["Upload-Length"] == "12"
+        sent = [(call.kwargs["headers"]["Upload-Offset"], call.kwargs["data"]) for call in uploader.session.patch.call_args_list]
+        assert sent == [("0", b"0123"), ("4", b"4567"), ("8", b"89AB")]
+
+    def test_throughput_over_busy_time(self):
+        clock = FakeClock()
+        uploader = StorageUploader("https://xyz.supabase.co", "key", clock=clock)
+        uploader._begin()
+        clock.now = 2.0
+        uploader._end(4 * 1024 * 1024, ok=True)
+        clock.now = 100.0  # tempo senza upload in corso: non conta
+        uploader._begin()
+        clock.now = 102.0
+        uploader._end(4 * 1024 * 1024, ok=True)
+        uploader.close()
+
+        stats = uploader.stats()
+        assert stats.files == 2
+        assert stats.seconds == 4.0
+        assert stats.mb_per_s == 2.0
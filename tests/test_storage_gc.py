@@ -0,0 +1,146 @@
+"""
+Tests for the garbage collection of orphaned posters.
+No database or Storage operations: SupabaseManager is patched.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from scraper.db.storage_gc import StorageObject, collect_garbage, find_orphans
+from scraper.db.supabase_client import IncompleteQueryError, SupabaseManager
+
+NOW = datetime(2026, 5, 10, 12, 0, tzinfo=timezone.utc)
+PUBLIC = "https://xyz.supabase.co/storage/v1/object/public/posters/"
+
+
+def listing(name, size=1024, age_hours=48):
+    stamp = (NOW - timedelta(hours=age_hours)).isoformat().replace("+00:00", "Z")
+    return {"id": name, "name": name, "updated_at": stamp, "metadata": {"size": size}}
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """Bucket finto: file elencati, URL referenziati e file cancellati."""
+    state = SimpleNamespace(files=[], posters=set(), deleted=[])
+
+    def delete(names):
+        state.deleted.append(names)
+        return names
+
+    monkeypatch.setattr(SupabaseManager, "list_posters", classmethod(lambda cls: iter(state.files)))
+    monkeypatch.setattr(SupabaseManager, "fetch_poster_urls", classmethod(lambda cls: state.posters))
+    monkeypatch.setattr(SupabaseManager, "delete_posters", classmethod(lambda cls, names: delete(names)))
+    return state
+
+
+class TestFindOrphans:
+    """Tests for find_orphans."""
+
+    def test_unreferenced_old_files_only(self):
+        objects = [
+            StorageObject("used.pdf", 1, NOW - timedelta(days=3)),
+            StorageObject("old.pdf", 1, NOW - timedelta(days=3)),
+            StorageObject("fresh.pdf", 1, NOW - timedelta(hours=1)),
+            StorageObject("undated.pdf", 1, None),
+        ]
+        orphans = find_orphans(objects, {"used.pdf"}, timedelta(hours=24), NOW)
+        assert [obj.name for obj in orphans] == ["old.pdf"]
+
+
+class TestCollectGarbage:
+    """Tests for collect_garbage."""
+
+    def test_deletes_orphans_in_batches(self, storage):
+        storage.files = [listing("used.pdf"), listing("a.pdf", 2048), listing("b.pdf", 1024), listing("c.pdf", 1024)]
+        storage.posters = {PUBLIC + "used.pdf"}
+
+        report = collect_garbage(batch_size=2, now=NOW)
+
+        assert storage.deleted == [["a.pdf", "b.pdf"], ["c.pdf"]]
+        assert report.listed == 4 and report.referenced == 1 and report.orphans == 3
+        assert report.deleted == 3
+        assert report.reclaimed == 4096
+
+    def test_dry_run_deletes_nothing(self, storage):
+        storage.files = [listing("used.pdf"), listing("old.pdf")]
+        storage.posters = {PUBLIC + "used.pdf"}
+
+        report = collect_garbage(dry_run=True, now=NOW)
+
+        assert storage.deleted == []
+        assert report.orphans == 1 and report.reclaimed == 0
+
+    def test_recent_uploads_kept(self, storage):
+        storage.files = [listing("used.pdf"), listing("just-uploaded.pdf", age_hours=1)]
+        storage.posters = {PUBLIC + "used.pdf"}
+
+        assert collect_garbage(now=NOW).orphans == 0
+        assert storage.deleted == []
+
+    def test_no_references_skips_collection(self, storage):
+        storage.files = [listing("a.pdf"), listing("b.pdf")]
+
+        report = collect_garbage(now=NOW)
+
+        assert storage.deleted == []
+        assert report.deleted == 0
+
+    def test_incomplete_references_skip_collection(self, storage, monkeypatch):
+        storage.files = [listing("used.pdf"), listing("old.pdf")]
+
+        def incomplete(cls):
+            raise IncompleteQueryError("read 1000 rows, expected 1001")
+
+        monkeypatch.setattr(SupabaseManager, "fetch_poster_urls", classmethod(incomplete))
+
+        report = collect_garbage(now=NOW)
+
+        assert storage.deleted == []
+        assert report.listed == 2 and report.deleted == 0
+
+
+def page(rows, count):
+    return SimpleNamespace(data=rows, count=count)
+
+
+class TestFetchPosterUrls:
+    """Tests for SupabaseManager.fetch_poster_urls pagination."""
+
+    @pytest.fixture
+    def query(self, monkeypatch):
+        client = MagicMock()
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+        monkeypatch.setattr("scraper.db.supabase_client.DB_PAGE_SIZE", 2)
+        return client.table.return_value.select.return_value.not_.is_.return_value.order.return_value
+
+    def test_pages_past_max_rows(self, query):
+        query.range.return_value.execute.side_effect = [
+            page([{"poster": "a"}, {"poster": "b"}], 3), page([{"poster": "c"}], 3),
+        ]
+
+        assert SupabaseManager.fetch_poster_urls() == {"a", "b", "c"}
+        assert [call.args for call in query.range.call_args_list] == [(0, 1), (2, 3)]
+
+    def test_count_mismatch_raises(self, query):
+        query.range.return_value.execute.side_effect = [page([{"poster": "a"}], 2)]
+
+        with pytest.raises(IncompleteQueryError):
+            SupabaseManager.fetch_poster_urls()
+
+
+class TestListPosters:
+    """Tests for SupabaseManager.list_posters pagination."""
+
+    def test_pages_until_short_page(self, monkeypatch):
+        client = MagicMock()
+        bucket = client.storage.from_.return_value
+        bucket.list.side_effect = [[{"name": "a"}, {"name": "b"}], [{"name": "c"}]]
+        monkeypatch.setattr(SupabaseManager, "get_client", classmethod(lambda cls: client))
+
+        names = [entry["name"] for entry in SupabaseManager.list_posters(page_size=2)]
+
+        assert names == ["a", "b", "c"]
+        assert [call.args[1]["offset"] for call in bucket.list.call_args_list] == [0, 2]
+
+    def test_poster_filename_from_public_url(self):
+        assert SupabaseManager.poster_filename(PUBLIC + "csi-camminata-2026-05-01.pdf?") == "csi-camminata-2026-05-01.pdf"
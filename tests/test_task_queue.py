@@ -0,0 +1,186 @@
+"""
+Tests for the SQLite task queue.
+"""
+import multiprocessing
+import sqlite3
+import threading
+import pytest
+from scraper.db.task_queue import TaskQueue, run_worker
+from scraper.models.task import TaskKind, TaskStatus
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = TaskQueue(tmp_path / "tasks.sqlite3")
+    yield q
+    q.close()
+
+
+def _claim_all(path, worker):
+    """Reclama task finché la coda non è vuota, ritorna gli ID ottenuti."""
+    q = TaskQueue(path)
+    claimed = []
+    while True:
+        task = q.claim(worker)
+        if task is None:
+            break
+        claimed.append(task.id)
+        q.complete(task)
+    q.close()
+    return claimed
+
+
+class TestTaskQueue:
+    """Tests for enqueue, claim, complete and fail."""
+
+    def test_enqueue_and_claim(self, queue):
+        task_id = queue.enqueue(TaskKind.DOWNLOAD_POSTER, {"url": "https://x/a.pdf"})
+        task = queue.claim("w1")
+        assert task.id == task_id
+        assert task.kind == TaskKind.DOWNLOAD_POSTER
+        assert task.payload == {"url": "https://x/a.pdf"}
+        assert task.attempts == 1
+        assert queue.claim("w2") is None
+
+    def test_dedupe_key(self, queue):
+        assert queue.enqueue(TaskKind.DOWNLOAD_POSTER, {}, dedupe_key="url-1") is not None
+        assert queue.enqueue(TaskKind.DOWNLOAD_POSTER, {}, dedupe_key="url-1") is None
+        assert queue.stats() == {"download_poster": {"pending": 1}}
+
+    def test_claim_filters_by_kind(self, queue):
+        queue.enqueue(TaskKind.DOWNLOAD_POSTER, {})
+        assert queue.claim("w1", [TaskKind.FETCH_DETAIL]) is None
+        assert queue.claim("w1", [TaskKind.DOWNLOAD_POSTER]) is not None
+
+    def test_complete(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {})
+        queue.complete(queue.claim("w1"))
+        assert queue.stats() == {"fetch_detail": {"done": 1}}
+        assert queue.purge_done() == 1
+
+    def test_fail_retries_with_backoff_then_fails(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {}, max_attempts=2)
+        queue.fail(queue.claim("w1"), "boom", retry_delay=0)
+        task = queue.claim("w1")
+        assert task.attempts == 2
+        assert task.last_error == "boom"
+        queue.fail(task, "boom again", retry_delay=0)
+        assert queue.stats() == {"fetch_detail": {TaskStatus.FAILED.value: 1}}
+        assert queue.claim("w1") is None
+
+    def test_backoff_delays_retry(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {})
+        queue.fail(queue.claim("w1"), "boom", retry_delay=60)
+        assert queue.claim("w1") is None
+
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        q = TaskQueue(tmp_path / "tasks.sqlite3", lease_seconds=-1)
+        q.enqueue(TaskKind.FETCH_DETAIL, {})
+        first = q.claim("dead-worker")
+        second = q.claim("w2")
+        assert second.id == first.id
+        assert second.attempts == 2
+
+    def test_expired_lease_without_attempts_fails(self, tmp_path):
+        q = TaskQueue(tmp_path / "tasks.sqlite3", lease_seconds=-1)
+        q.enqueue(TaskKind.FETCH_DETAIL, {}, max_attempts=1)
+        q.claim("dead-worker")
+        assert q.claim("w2") is None
+        assert q.stats() == {"fetch_detail": {"failed": 1}}
+
+    def test_stale_worker_cannot_finish_reclaimed_task(self, tmp_path):
+        q = TaskQueue(tmp_path / "tasks.sqlite3", lease_seconds=-1)
+        q.enqueue(TaskKind.DOWNLOAD_POSTER, {})
+        stale = q.claim("slow-worker")
+        current = q.claim("w2")
+        assert not q.complete(stale)
+        assert not q.fail(stale, "late", retry_delay=0)
+        assert q.complete(current)
+        assert q.stats() == {"download_poster": {"done": 1}}
+
+    def test_finished_task_can_be_enqueued_again(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {}, dedupe_key="url-1")
+        queue.complete(queue.claim("w1"))
+        assert queue.enqueue(TaskKind.FETCH_DETAIL, {}, dedupe_key="url-1") is not None
+        assert queue.enqueue(TaskKind.FETCH_DETAIL, {}, dedupe_key="url-1") is None
+
+    def test_claim_filters_by_key_prefix(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {}, dedupe_key="CSI:a")
+        queue.enqueue(TaskKind.FETCH_DETAIL, {}, dedupe_key="FIASP:b")
+        assert queue.claim("w1", key_prefix="FIASP:").id == 2
+        assert queue.claim("w1", key_prefix="FIASP:") is None
+
+    def test_unique_dedupe_key_migrated(self, tmp_path):
+        path = tmp_path / "tasks.sqlite3"
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            "CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " dedupe_key TEXT UNIQUE, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL, last_error TEXT, worker TEXT, available_at REAL NOT NULL,"
+            " leased_until REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+            "INSERT INTO tasks (kind, payload, dedupe_key, status, max_attempts, available_at, created_at, updated_at)"
+            " VALUES ('download_poster', '{}', 'url-1', 'done', 3, 0, 0, 0);"
+        )
+        conn.close()
+
+        q = TaskQueue(path)
+        assert q.enqueue(TaskKind.DOWNLOAD_POSTER, {}, dedupe_key="url-1") == 2
+        assert q.stats() == {"download_poster": {"done": 1, "pending": 1}}
+        q.close()
+
+
+    def test_close_closes_every_thread_connection(self, queue):
+        opened = []
+        thread = threading.Thread(target=lambda: opened.append(queue._connection()))
+        thread.start()
+        thread.join()
+
+        queue.close()
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+        assert queue.stats() == {}  # la coda resta utilizzabile con una nuova connessione
+
+
+class TestWorkers:
+    """Tests for concurrent workers."""
+
+    def test_run_worker_follow_ups(self, queue):
+        queue.enqueue(TaskKind.FETCH_DETAIL, {"url": "u"})
+        handlers = {
+            TaskKind.FETCH_DETAIL: lambda p: [(TaskKind.DOWNLOAD_POSTER, {"from": p["url"]}, None)],
+            TaskKind.DOWNLOAD_POSTER: lambda p: None,
+        }
+        assert run_worker(queue, handlers) == 2
+        assert queue.stats() == {"download_poster": {"done": 1}, "fetch_detail": {"done": 1}}
+
+    def test_run_worker_records_failures(self, queue):
+        queue.enqueue(TaskKind.DOWNLOAD_POSTER, {}, max_attempts=1)
+
+        def broken(payload):
+            raise RuntimeError("storage down")
+
+        run_worker(queue, {TaskKind.DOWNLOAD_POSTER: broken})
+        assert queue.stats() == {"download_poster": {"failed": 1}}
+
+    def test_threads_claim_each_task_once(self, queue):
+        for i in range(50):
+            queue.enqueue(TaskKind.FETCH_DETAIL, {"i": i})
+        results = []
+        threads = [
+            threading.Thread(target=lambda w=w: results.extend(_claim_all(queue.path, f"t{w}")))
+            for w in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(results) == list(range(1, 51))
+
+    def test_processes_claim_each_task_once(self, queue):
+        for i in range(40):
+            queue.enqueue(TaskKind.FETCH_DETAIL, {"i": i})
+        with multiprocessing.get_context("spawn").Pool(3) as pool:
+            results = pool.starmap(_claim_all, [(queue.path, f"p{w}") for w in range(3)])
+        claimed = sorted(task_id for ids in results for task_id in ids)
+        assert claimed == list(range(1, 41))